@@ -1,20 +1,15 @@
 from __future__ import annotations
 
 import asyncio
-import logging
 import os
+import sys
 from aiohttp import web
 
+from .bot.logsetup import setup_logging
+from .bot.startup import StartupTimer
 from .config import load_config
 from .discord_bot import DiscordBot
-from .telegram_bot import TelegramBridge  # <-- ВАЖНО
-
-
-def setup_logging():
-    logging.basicConfig(
-        level="INFO",
-        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-    )
+from .telegram_bot import TelegramBot
 
 
 async def start_web_server():
@@ -38,7 +33,9 @@ async def start_web_server():
 
 async def main():
     setup_logging()
-    cfg = load_config()
+    timer = StartupTimer()
+    with timer.phase("config"):
+        cfg = load_config()
 
     discord_bot = None
 
@@ -48,11 +45,11 @@ async def main():
             return
         if not cfg.bridge_discord_channel_id:
             return
-        ch = discord_bot.get_channel(cfg.bridge_discord_channel_id)
+        ch = await discord_bot.channels.resolve(cfg.bridge_discord_channel_id)
         if ch:
             await ch.send(f"📩 TG {author}: {text}")
 
-    tg = TelegramBridge(cfg, on_text_from_tg=tg_to_discord)
+    tg = TelegramBot(cfg, discord_bridge_send=tg_to_discord)
 
     # Discord -> TG
     async def discord_to_tg(text: str, author: str):
@@ -66,12 +63,26 @@ async def main():
             text=f"💬 Discord {author}: {text}"
         )
 
-    await tg.start()
+    # оба бота создаём сразу, логинимся параллельно (раньше Discord ждал старта Telegram)
+    # --sync-commands / FORCE_COMMAND_SYNC=1 — синхронизировать слэш-команды, даже если хеш не поменялся
+    force_sync = "--sync-commands" in sys.argv[1:] or os.getenv("FORCE_COMMAND_SYNC", "") in ("1", "true", "yes")
+    discord_bot = DiscordBot(cfg, tg_bridge_send=discord_to_tg, force_command_sync=force_sync)
+    timer.mark("wired")
+
+    async def tg_start():
+        await tg.start()
+        timer.mark("telegram_ready")
+
+    async def report_when_ready():
+        if "discord_ready" not in timer.phases:  # on_ready бывает и после реконнекта
+            timer.mark("discord_ready")
+            timer.report()
 
-    discord_bot = DiscordBot(cfg, tg_bridge_send=discord_to_tg)
+    discord_bot.add_listener(report_when_ready, "on_ready")
 
     await asyncio.gather(
         start_web_server(),
+        tg_start(),
         discord_bot.start(cfg.discord_token),
     )
 
@@ -1,94 +1,250 @@
 import asyncio
+import importlib
 import logging
-from aiohttp import web
+import os
 
 from .config import load_config
-from .discord_bot import DiscordBridge
-from .telegram_bot import TelegramBridge
+from .logsetup import setup_logging
+from .msgmap import open_message_map
+from .outbox import open_outbox
+from .ratelimit import TokenBucket
+from .relay import RelayPool
+from .routing import DISCORD, TELEGRAM, load_routes
+from .startup import StartupTimer
+from .web import TELEGRAM_WEBHOOK_PATH, create_app, late_route, start_web_server
 
 # Если scheduler.py у тебя есть — оставь. Если нет, просто удали 2 строки ниже (import + создание scheduler)
 from .scheduler import Scheduler
 
+# discord.py / python-telegram-bot / новости импортируются в main(), когда health-сервер
+# уже слушает порт (Render ждёт порт при холодном старте)
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()  # JSON через очередь, форматирование и вывод — в отдельном потоке
 log = logging.getLogger("bot")
 
 
-# =========================
-# Health server (для Render)
-# =========================
-async def health(request):
-    return web.Response(text="OK")
-
-
-async def start_health_server():
-    app = web.Application()
-    app.router.add_get("/", health)  # ВАЖНО: только GET (HEAD не добавляем вручную)
-
-    runner = web.AppRunner(app)
-    await runner.setup()
-
-    port = int(10000)  # Render обычно ок на 10000
-    site = web.TCPSite(runner, "0.0.0.0", port)
-    await site.start()
-
-    log.info("[HTTP] Health server started on port %s", port)
+def _import(name: str, timer: StartupTimer):
+    # по очереди и в главном потоке: модули делят bot.* (метрики, конфиг, маршруты),
+    # параллельный импорт из потоков рискует блокировками importlib и ничего не даёт под GIL.
+    # Порт к этому моменту уже открыт — входящие health-запросы просто подождут в backlog
+    with timer.phase(f"import:{name}"):
+        return importlib.import_module(f"{__package__}.{name}")
 
 
 # =========================
 # Main
 # =========================
 async def main():
-    cfg = load_config()
+    timer = StartupTimer()
+    with timer.phase("config"):
+        cfg = load_config()
+
+    # HTTP: health сразу; webhook Telegram (если включён) — роут заранее, обработчик после импорта PTB
+    app = create_app()
+    tg_webhook = late_route(app, "POST", TELEGRAM_WEBHOOK_PATH) if cfg.telegram_webhook_url else None
+    with timer.phase("web"):
+        await start_web_server(app)
+
+    discord_mod = _import("discord_bot", timer)
+    telegram_mod = _import("telegram_bot", timer)
 
     discord = None
     telegram = None
 
+    # Реальная отправка (её делают воркеры очередей, не входящие хендлеры)
+    async def send_to_discord_channel(channel_id: int, text: str):
+        if discord:
+            return await discord.send_to_channel(channel_id, text)
+
+    async def send_to_telegram_chat(chat_id: int, text: str):
+        if telegram:
+            return await telegram.send_to_chat(chat_id, text)
+
+    # Связи «оригинал -> копии» для синхронизации правок/удалений (BRIDGE_EDIT_SYNC=0 — выключить)
+    msgmap = None
+    if os.getenv("BRIDGE_EDIT_SYNC", "1").strip().lower() not in ("0", "false", "no", "off"):
+        msgmap = open_message_map()
+
+    def on_sent(platform: str):
+        if not msgmap:
+            return None  # ref всё равно передаём: по нему ключ идемпотентности в outbox
+
+        def _link(refs, dest: int, message_id):
+            # склеенная пачка — одна копия на несколько оригиналов
+            if message_id:
+                for ref in refs:
+                    msgmap.link(ref, (platform, dest, message_id), merged=len(refs))
+        return _link
+
+    # Журнал исходящих (OUTBOX=0 — выключить): что не успели доставить до рестарта, отправим после
+    outbox = open_outbox()
+    backlog = outbox.pending() if outbox else []  # снимок до старта: новые сообщения в него не попадут
+
+    # Очереди по адресатам: хендлеры только кладут, воркеры шлют; лимиты — на каждый канал/чат
+    relay_kwargs = dict(
+        maxsize=cfg.relay_queue_size,
+        overflow=cfg.relay_overflow,
+        workers=cfg.relay_workers,
+        coalesce_window=cfg.relay_coalesce_sec,
+        # с синхронизацией правок копия = один оригинал, иначе правка затрёт соседей по пачке
+        merge_refs=msgmap is None,
+    )
+    relays = {
+        DISCORD: RelayPool(
+            "to_discord",
+            send_to_discord_channel,
+            bucket_factory=lambda: TokenBucket(cfg.discord_send_rate, cfg.discord_send_burst),
+            max_len=2000,
+            on_sent=on_sent(DISCORD),
+            outbox=outbox,
+            **relay_kwargs,
+        ),
+        TELEGRAM: RelayPool(
+            "to_telegram",
+            send_to_telegram_chat,
+            bucket_factory=lambda: TokenBucket(cfg.telegram_send_rate, cfg.telegram_send_burst),
+            max_len=4000,
+            on_sent=on_sent(TELEGRAM),
+            outbox=outbox,
+            **relay_kwargs,
+        ),
+    }
+
+    async def relay(text: str, routes, ref=None):
+        # один входящий -> все адресаты его маршрутов (1:N); ref — ключ outbox и связь с копиями
+        for r in routes:
+            await relays[r.dst_platform].put(r.dst_id, text, ref=ref)
+
     # Telegram -> Discord
-    async def on_text_from_tg(text: str, author: str):
-        if not discord:
-            return
-        try:
-            # если у DiscordBridge есть send_to_bridge(text)
-            if hasattr(discord, "send_to_bridge"):
-                await discord.send_to_bridge(f"📨 TG | {author}: {text}")
-            # если у DiscordBridge другой метод — не упадём, просто залогируем
-            else:
-                log.warning("Discord bridge has no send_to_bridge()")
-        except Exception:
-            log.exception("TG -> Discord failed")
-
-    # Discord -> Telegram
-    async def on_text_from_discord(text: str, author: str):
-        if not telegram:
-            return
-        try:
-            # если у TelegramBridge есть send_to_bridge(text) — используем его
-            if hasattr(telegram, "send_to_bridge"):
-                await telegram.send_to_bridge(f"💬 Discord | {author}: {text}")
-            # иначе fallback на send_to_admin (как в твоём классе выше)
-            elif hasattr(telegram, "send_to_admin"):
-                await telegram.send_to_admin(f"💬 Discord | {author}: {text}")
-            else:
-                log.warning("Telegram bridge has no send_to_bridge() / send_to_admin()")
-        except Exception:
-            log.exception("Discord -> TG failed")
-
-    # ВАЖНО: создаём мосты с коллбеками
-    telegram = TelegramBridge(cfg, on_text_from_tg)
-    discord = DiscordBridge(cfg, on_text_from_discord)
+    async def on_text_from_tg(text: str, author: str, routes, ref):
+        await relay(telegram.format_for_discord(author, text), routes, ref)
+
+    # Discord -> Telegram (текст уже отформатирован в DiscordBridge.on_message)
+    async def on_text_from_discord(text: str, routes, ref):
+        await relay(text, routes, ref)
+
+    # Правки/удаления оригинала -> те же действия с копиями (копии на оригинал не влияют).
+    # Склеенную копию не трогаем: в ней и чужие сообщения, правка/удаление одного их затрёт.
+    async def _each_copy(ref, action: str, *args):
+        for (platform, chat_id, message_id), merged in msgmap.copies(ref):
+            if merged > 1:
+                log.debug("[Bridge] Skipping %s of merged copy %s:%s:%s", action, platform, chat_id, message_id)
+                continue
+            target = discord if platform == DISCORD else telegram
+            try:
+                await getattr(target, action)(chat_id, message_id, *args)
+            except Exception as e:
+                log.warning("[Bridge] %s of %s:%s:%s failed: %s", action, platform, chat_id, message_id, e)
+
+    async def on_source_edit(ref, text: str):
+        await _each_copy(ref, "edit_message", text)
+
+    async def on_source_delete(ref):
+        await _each_copy(ref, "delete_message")
+        msgmap.forget(ref)
+
+    # ВАЖНО: создаём мосты с коллбеками; таблица маршрутов общая
+    routes = load_routes(cfg)
+    telegram = telegram_mod.TelegramBridge(cfg, on_text_from_tg, routes)
+    discord = discord_mod.DiscordBridge(cfg, routes)
+    discord.set_telegram_sender(on_text_from_discord)
+    if msgmap:
+        discord.set_sync_handlers(on_source_edit, on_source_delete)
+        telegram.set_sync_handlers(on_source_edit)
 
     # Scheduler (если есть)
-    scheduler = Scheduler(cfg, telegram, discord)
+    scheduler = Scheduler(
+        cfg.sched_every_seconds,
+        send_to_discord=discord.send_to_bridge,
+        send_to_telegram=telegram.send_to_admin,
+        build_stats_text=discord.build_stats_text,
+    )
 
-    # Стартуем всё
-    await start_health_server()
+    # Новости: отдельная задача планировщика, если заданы ленты (иначе модуль даже не грузим)
+    news_session = None
+    if cfg.news_feeds.strip():
+        import aiohttp
 
-    await asyncio.gather(
-        discord.start(),
-        telegram.start(),
-        scheduler.start(),
-    )
+        from .news_watch import NewsWatcher
+
+        news = NewsWatcher()
+        news_session = aiohttp.ClientSession()
+
+        async def poll_news():
+            for post in await news.poll(news_session):
+                await scheduler.post(f"{post.title}\n{post.url}")
+
+        scheduler.add_job(
+            "news",
+            poll_news,
+            every=int(os.getenv("NEWS_POLL_SECONDS", "300") or 300),
+            jitter=10,
+            run_on_start=True,
+        )
+
+    if msgmap:
+        # новые связи копятся в памяти — раз в минуту сбрасываем пачкой в SQLite
+        async def flush_msgmap():
+            msgmap.flush()
+
+        scheduler.add_job("msgmap_flush", flush_msgmap, every=60)
+
+    if tg_webhook:
+        telegram.bind_webhook(tg_webhook)
+
+    # Стартуем всё: логины в Discord и Telegram идут параллельно
+    for pool in relays.values():
+        await pool.start()
+    timer.mark("wired")
+
+    telegram_ready = asyncio.Event()
+
+    async def telegram_start():
+        await telegram.start()
+        telegram_ready.set()
+        timer.mark("telegram_ready")
+
+    async def replay_outbox(platform: str, ready: asyncio.Event):
+        # до логина отправка всё равно не пройдёт — ждём готовности адресата
+        await ready.wait()
+        await relays[platform].replay(backlog)
+
+    replay_tasks = []
+    if backlog:
+        replay_tasks = [
+            asyncio.create_task(replay_outbox(DISCORD, discord.ready)),
+            asyncio.create_task(replay_outbox(TELEGRAM, telegram_ready)),
+        ]
+
+    async def report_when_ready():
+        try:
+            await asyncio.wait_for(discord.ready.wait(), timeout=120)
+        except asyncio.TimeoutError:
+            log.warning("[Startup] Discord is not ready after 120s")
+            return
+        timer.mark("discord_ready")
+        timer.report()
+
+    report_task = asyncio.create_task(report_when_ready())
+
+    try:
+        await asyncio.gather(
+            discord.start(),
+            telegram_start(),
+            scheduler.start(),
+        )
+    finally:
+        report_task.cancel()
+        for t in replay_tasks:
+            t.cancel()
+        # досылаем то, что в очередях; недоставленное останется в outbox до следующего старта
+        await asyncio.gather(*(pool.stop(5.0) for pool in relays.values()))
+        if outbox:
+            await outbox.close()
+        if news_session:
+            await news_session.close()
+        if msgmap:
+            msgmap.close()
 
 
 if __name__ == "__main__":
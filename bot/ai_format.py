@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Tuple
+from functools import lru_cache
+from typing import Dict, Tuple
 
 
 # --- словарик для "псевдо-перевода" игровых новостей ---
@@ -62,15 +63,44 @@ CATEGORY_EMOJI = [
 ]
 
 
+_WS_RE = re.compile(r"\s+")
+_SITE_SUFFIX_RE = re.compile(r"\s*\|\s*[^|]{2,40}$")
+
+_NEVER_RE = re.compile(r"(?!x)x")  # ничего не матчит (пустой словарь)
+
+# собираются из TRANSLATE / STOPWORDS в reload_dictionaries()
+_TRANSLATE_RE: re.Pattern = _NEVER_RE
+_TRANSLATE_MAP: Dict[str, str] = {}
+_STOPWORDS_RE: re.Pattern = _NEVER_RE
+
+
+def _alternation(words) -> str:
+    # длинные сначала: "battle pass" раньше "pass", "announced" раньше "announce"
+    return "|".join(re.escape(w) for w in sorted(words, key=lambda w: -len(w)))
+
+
+def reload_dictionaries():
+    """
+    Пересобрать регулярки после изменения TRANSLATE / STOPWORDS.
+    Один regex на весь словарь — перевод за один проход при любом размере словаря.
+    """
+    global _TRANSLATE_RE, _TRANSLATE_MAP, _STOPWORDS_RE
+    _TRANSLATE_MAP = {en.lower(): ru for en, ru in TRANSLATE.items()}
+    _TRANSLATE_RE = re.compile(rf"\b(?:{_alternation(_TRANSLATE_MAP)})\b", re.I) if _TRANSLATE_MAP else _NEVER_RE
+    _STOPWORDS_RE = re.compile(rf"^(?:\s*(?:{_alternation(STOPWORDS)})\s*)+", re.I) if STOPWORDS else _NEVER_RE
+    _clean_title.cache_clear()
+    _pseudo_translate_en_ru.cache_clear()
+
+
+@lru_cache(maxsize=4096)
 def _clean_title(title: str) -> str:
     t = (title or "").strip()
     # убираем мусорные префиксы
-    for w in STOPWORDS:
-        t = re.sub(rf"^\s*{re.escape(w)}\s*", "", t, flags=re.I)
+    t = _STOPWORDS_RE.sub("", t)
     # нормализуем пробелы
-    t = re.sub(r"\s+", " ", t).strip()
+    t = _WS_RE.sub(" ", t).strip()
     # иногда заголовки с " | site"
-    t = re.sub(r"\s*\|\s*[^|]{2,40}$", "", t).strip()
+    t = _SITE_SUFFIX_RE.sub("", t).strip()
     return t
 
 
@@ -88,18 +118,18 @@ def _detect_category(title: str) -> Tuple[str, str]:
     return "📰", "Новости"
 
 
-def _pseudo_translate_en_ru(text: str) -> str:
-    # Очень лёгкий "перевод" по словарю + сохранение брендов
-    t = text
+def _translate_word(m: re.Match) -> str:
+    return _TRANSLATE_MAP[m.group(0).lower()]
 
-    # устойчивые фразы сначала
-    pairs = sorted(TRANSLATE.items(), key=lambda x: -len(x[0]))
-    for en, ru in pairs:
-        t = re.sub(rf"\b{re.escape(en)}\b", ru, t, flags=re.I)
+
+@lru_cache(maxsize=4096)
+def _pseudo_translate_en_ru(text: str) -> str:
+    # Очень лёгкий "перевод" по словарю + сохранение брендов (один проход по тексту)
+    t = _TRANSLATE_RE.sub(_translate_word, text)
 
     # косметика
     t = t.replace("’", "'")
-    t = re.sub(r"\s+", " ", t).strip()
+    t = _WS_RE.sub(" ", t).strip()
     return t
 
 
@@ -120,6 +150,9 @@ def _make_summary(title_ru: str) -> str:
     return "Коротко: подробности по ссылке."
 
 
+reload_dictionaries()
+
+
 @dataclass
 class FreeAIFormatter:
     """
@@ -0,0 +1,535 @@
+"""
+Нагрузочный бенчмарк хендлеров без сети: поддельные discord.Message / telegram Update,
+заглушки вместо отправки, настоящие хендлеры и очереди моста.
+
+    python -m bot.bench                       # все сценарии, максимум скорости
+    python -m bot.bench -s telegram -r 500    # 500 сообщений/сек
+    python -m bot.bench --json --max-p99-ms 5 # для CI: JSON и код 1 при регрессии
+
+Сценарии:
+- discord_bridge — DiscordBridge.on_message -> маршруты -> RelayPool (заглушка TG);
+- telegram — TelegramBridge._on_text -> маршруты -> RelayPool (заглушка Discord);
+- legacy_discord — DiscordBot.on_message из корневого пакета (спам, рейды, ключевые слова,
+  мост) + ModerationQueue с поддельным REST. Корень репозитория должен быть пакетом.
+
+Печатает пропускную способность, p50/p99/max задержку хендлера и прирост памяти (tracemalloc).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import gc
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+from .outbox import Outbox
+from .relay import RelayPool
+from .routing import DISCORD, TELEGRAM, Route, RoutingTable
+
+log = logging.getLogger(__name__)
+
+GUILD_ID = 1000
+BRIDGE_CHANNEL_ID = 2000
+OTHER_CHANNEL_ID = 2001
+BRIDGE_CHAT_ID = -1003000
+
+# ---------- поддельные объекты ----------
+
+
+class FakeSender:
+    """
+    Заглушка отправки: считает вызовы, по желанию «тормозит» как API.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._next_id = 1
+
+    async def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._next_id += 1
+        return self._next_id
+
+
+class FakeChannel:
+    def __init__(self, channel_id: int, sender: FakeSender):
+        self.id = channel_id
+        self.sender = sender
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, *args, **kwargs):
+        return SimpleNamespace(id=await self.sender())
+
+    async def delete_messages(self, messages, *, reason=None):
+        await self.sender()
+
+    def get_partial_message(self, message_id: int):
+        return SimpleNamespace(id=message_id, delete=self.sender, edit=self.sender)
+
+
+class FakeUser:
+    bot = False
+
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.name = name
+        self.global_name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMember(discord.Member):
+    """
+    Настоящий подкласс discord.Member (isinstance-проверки модерации проходят),
+    но без состояния клиента: REST-методы — заглушки.
+    """
+
+    def __init__(self, user: FakeUser, guild, sender: FakeSender):
+        self._user = user
+        self.guild = guild
+        self.nick = None
+        self._sender = sender
+
+    @property
+    def display_name(self) -> str:
+        return self._user.name
+
+    @property
+    def bot(self) -> bool:
+        return False
+
+    async def timeout(self, *args, **kwargs):
+        await self._sender()
+
+    def __str__(self):
+        return self._user.name
+
+
+class FakeMessage:
+    """
+    То, что хендлеры читают из discord.Message.
+    """
+
+    def __init__(self, message_id: int, content: str, author, channel: FakeChannel, guild, state=None):
+        self.id = message_id
+        self._state = state  # ConnectionState клиента (нужен commands.Context)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = guild
+        self.attachments: list = []
+        self.embeds: list = []
+        self.mentions: list = []
+        self.role_mentions: list = []
+        self.type = discord.MessageType.default
+        self.webhook_id = None
+
+    async def reply(self, *args, **kwargs):
+        return await self.channel.send(*args, **kwargs)
+
+
+def fake_update(update_id: int, chat_id: int, user_id: int, name: str, text: str, sender: FakeSender):
+    """
+    Минимальный telegram Update: effective_message / effective_user / effective_chat.
+    """
+    async def reply_text(*args, **kwargs):
+        return await sender()
+
+    msg = SimpleNamespace(message_id=update_id, text=text, chat_id=chat_id, reply_text=reply_text)
+    return SimpleNamespace(
+        update_id=update_id,
+        effective_message=msg,
+        message=msg,
+        edited_message=None,
+        effective_user=SimpleNamespace(id=user_id, full_name=name),
+        effective_chat=SimpleNamespace(id=chat_id, type="supergroup"),
+    )
+
+
+# ---------- поток сообщений ----------
+
+_WORDS = (
+    "привет всем кто сегодня играет вечером турнир карта патч обнова сервер лагает "
+    "го катку ребята кто в войс ставлю на мид спасибо за игру gg wp lol nice"
+).split()
+_KEYWORD_HINTS = ("донат", "стим", "дискорд", "цели", "donate", "steam", "discord")
+_RAID_TEXT = "FREE NITRO 👉 discord-gift.example/claim 👈 заходи быстрее"
+
+
+def message_stream(n: int, seed: int, users: int = 200):
+    """
+    Детерминированная смесь: обычный чат, ключевые слова, флуд одного пользователя,
+    рейд одинаковым текстом с разных аккаунтов. Отдаёт (i, user_id, text).
+    """
+    rnd = random.Random(seed)
+    for i in range(n):
+        roll = rnd.random()
+        if roll < 0.03:
+            # рейд: много аккаунтов, один текст
+            yield i, 900_000 + rnd.randrange(50), _RAID_TEXT
+        elif roll < 0.08:
+            # флудер
+            yield i, 777, " ".join(rnd.choices(_WORDS, k=3))
+        elif roll < 0.15:
+            yield i, rnd.randrange(users), f"а где {rnd.choice(_KEYWORD_HINTS)} ссылка?"
+        else:
+            yield i, rnd.randrange(users), " ".join(rnd.choices(_WORDS, k=rnd.randint(2, 20)))
+
+
+# ---------- измерение ----------
+
+
+@dataclasses.dataclass
+class Result:
+    scenario: str
+    messages: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p99_ms: float
+    max_ms: float
+    errors: int
+    mem_growth_kb: float
+    mem_peak_kb: float
+    sends: int
+    extra: dict = dataclasses.field(default_factory=dict)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+async def drive(
+    handler: Callable[[object], Awaitable[None]],
+    events: List[object],
+    *,
+    rate: float,
+    concurrency: int,
+) -> tuple:
+    """
+    Каждое событие — отдельная задача (так их запускают discord.py и PTB).
+    rate > 0 — равномерно rate событий/сек; rate = 0 — как можно быстрее,
+    не больше concurrency хендлеров одновременно.
+    """
+    latencies: List[float] = []
+    errors = 0
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(ev):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            await handler(ev)
+        except Exception:
+            errors += 1
+            if errors <= 3:
+                log.exception("[Bench] handler failed")
+        finally:
+            latencies.append(time.perf_counter() - t0)
+            sem.release()
+
+    tasks = []
+    start = time.perf_counter()
+    for i, ev in enumerate(events):
+        if rate > 0:
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await sem.acquire()
+        tasks.append(asyncio.create_task(one(ev)))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - start, latencies, errors
+
+
+async def measure(name: str, handler, events: List[object], args, *, sends: Callable[[], int], drain=None, extra=None) -> Result:
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    elapsed, latencies, errors = await drive(handler, events, rate=args.rate, concurrency=args.concurrency)
+    if drain is not None:
+        await drain()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return Result(
+        scenario=name,
+        messages=len(events),
+        seconds=round(elapsed, 3),
+        throughput=round(len(events) / elapsed, 1) if elapsed else 0.0,
+        p50_ms=round(_percentile(latencies, 0.50) * 1000, 3),
+        p99_ms=round(_percentile(latencies, 0.99) * 1000, 3),
+        max_ms=round((latencies[-1] if latencies else 0.0) * 1000, 3),
+        errors=errors,
+        mem_growth_kb=round((current - base) / 1024, 1),
+        mem_peak_kb=round((peak - base) / 1024, 1),
+        sends=sends(),
+        extra=extra() if extra else {},
+    )
+
+
+# ---------- сценарии ----------
+
+
+def _bench_config(tmp: str):
+    """
+    Config пакета bot/ без настоящих токенов (сеть не используется).
+    """
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("DISCORD_GUILD_ID", str(GUILD_ID))
+    from .config import load_config
+
+    return dataclasses.replace(
+        load_config(),
+        discord_guild_id=GUILD_ID,
+        bridge_discord_channel_id=BRIDGE_CHANNEL_ID,
+        bridge_telegram_chat_id=BRIDGE_CHAT_ID,
+        telegram_admin_chat_id=BRIDGE_CHAT_ID,
+    )
+
+
+def _routes() -> RoutingTable:
+    return RoutingTable([
+        Route(DISCORD, BRIDGE_CHANNEL_ID, TELEGRAM, BRIDGE_CHAT_ID, "bench"),
+        Route(TELEGRAM, BRIDGE_CHAT_ID, DISCORD, BRIDGE_CHANNEL_ID, "bench"),
+    ])
+
+
+def _relay_pool(name: str, sender: FakeSender, args, tmp: str) -> RelayPool:
+    outbox = Outbox(os.path.join(tmp, f"{name}.outbox")) if args.outbox else None
+    return RelayPool(name, sender, max_len=4000, maxsize=args.queue_size, outbox=outbox)
+
+
+def _pool_stats(pool: RelayPool) -> dict:
+    queues = pool.queues.values()
+    out = {
+        "relay_sent": sum(q.sent for q in queues),
+        "relay_dropped": sum(q.dropped for q in queues),
+        "relay_coalesced": sum(q.coalesced for q in queues),
+    }
+    if pool.outbox:
+        out["outbox"] = pool.outbox.stats()
+    return out
+
+
+async def _stop_pool(pool: RelayPool):
+    await pool.stop(timeout=30)
+    if pool.outbox:
+        await pool.outbox.close()
+
+
+async def bench_discord_bridge(args, tmp: str) -> Result:
+    from .discord_bot import DiscordBridge
+
+    cfg = _bench_config(tmp)
+    api = FakeSender(args.send_latency)
+    bridge = DiscordBridge(cfg, _routes())
+    pool = _relay_pool("bench_to_telegram", api, args, tmp)
+    await pool.start()
+
+    async def tg_send(text, routes, ref):
+        for r in routes:
+            await pool.put(r.dst_id, text, ref=ref)
+
+    bridge.set_telegram_sender(tg_send)
+
+    guild = SimpleNamespace(id=GUILD_ID)
+    channels = [FakeChannel(BRIDGE_CHANNEL_ID, api), FakeChannel(OTHER_CHANNEL_ID, api)]
+    users: Dict[int, FakeUser] = {}
+    events = []
+    for i, uid, text in message_stream(args.messages, args.seed):
+        user = users.get(uid) or users.setdefault(uid, FakeUser(uid, f"user{uid}"))
+        events.append(FakeMessage(10_000 + i, text, user, channels[i % 5 == 0], guild))
+
+    return await measure(
+        "discord_bridge", bridge.on_message, events, args,
+        sends=lambda: api.calls, drain=lambda: _stop_pool(pool), extra=lambda: _pool_stats(pool),
+    )
+
+
+async def bench_telegram(args, tmp: str) -> Result:
+    from .telegram_bot import TelegramBridge
+
+    cfg = _bench_config(tmp)
+    api = FakeSender(args.send_latency)
+    pool = _relay_pool("bench_to_discord", api, args, tmp)
+    await pool.start()
+
+    async def on_text(text, author, routes, ref):
+        for r in routes:
+            await pool.put(r.dst_id, TelegramBridge.format_for_discord(author, text), ref=ref)
+
+    bridge = TelegramBridge(cfg, on_text, _routes())
+    context = SimpleNamespace(bot=None)
+    events = [
+        fake_update(50_000 + i, BRIDGE_CHAT_ID, uid, f"tg user {uid}", text, api)
+        for i, uid, text in message_stream(args.messages, args.seed)
+    ]
+
+    async def handler(update):
+        await bridge._on_text(update, context)
+
+    return await measure(
+        "telegram", handler, events, args,
+        sends=lambda: api.calls, drain=lambda: _stop_pool(pool), extra=lambda: _pool_stats(pool),
+    )
+
+
+def _legacy_module(name: str):
+    """
+    Модуль корневого пакета (старый вход: DiscordBot со спамом/рейдами/ключевыми словами).
+    """
+    parent = (__package__ or "").rpartition(".")[0]
+    if not parent:
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if not os.path.exists(os.path.join(root, "__init__.py")):
+            return None
+        sys.path.insert(0, os.path.dirname(root))
+        parent = os.path.basename(root)
+    return importlib.import_module(f"{parent}.{name}")
+
+
+async def bench_legacy_discord(args, tmp: str) -> Optional[Result]:
+    try:
+        legacy_bot = _legacy_module("discord_bot")
+        legacy_config = _legacy_module("config")
+    except ImportError as e:
+        log.warning("[Bench] legacy_discord skipped: %s", e)
+        return None
+    if legacy_bot is None:
+        log.warning("[Bench] legacy_discord skipped: repository root is not a package")
+        return None
+
+    os.environ.setdefault("DISCORD_TOKEN", "bench")
+    os.environ.setdefault("TELEGRAM_TOKEN", "bench")
+    os.environ.setdefault("DISCORD_GUILD_ID", str(GUILD_ID))
+    cfg = dataclasses.replace(
+        legacy_config.load_config(),
+        discord_guild_id=GUILD_ID,
+        bridge_discord_channel_id=BRIDGE_CHANNEL_ID,
+        discord_log_channel_id=None,
+        tickets_db=os.path.join(tmp, "tickets.sqlite3"),
+    )
+
+    api = FakeSender(args.send_latency)
+    bot = legacy_bot.DiscordBot(cfg, api)
+    bot._connection.user = SimpleNamespace(id=1, bot=True)  # get_context сравнивает автора с ботом
+    bot.moderation.flush_interval = 0.05
+    bot.moderation.start()
+
+    guild = SimpleNamespace(id=GUILD_ID)
+    channels = [FakeChannel(BRIDGE_CHANNEL_ID, api), FakeChannel(OTHER_CHANNEL_ID, api)]
+    members: Dict[int, FakeMember] = {}
+    events = []
+    for i, uid, text in message_stream(args.messages, args.seed):
+        member = members.get(uid) or members.setdefault(uid, FakeMember(FakeUser(uid, f"user{uid}"), guild, api))
+        events.append(FakeMessage(10_000 + i, text, member, channels[i % 5 == 0], guild, bot._connection))
+
+    async def drain():
+        while bot.moderation.pending():
+            await asyncio.sleep(0.05)
+        await bot.moderation.stop()
+
+    return await measure(
+        "legacy_discord", bot.on_message, events, args,
+        sends=lambda: api.calls, drain=drain,
+        extra=lambda: {
+            "moderation": {k: v for k, v in bot.moderation.stats().items() if k != "bucket"},
+            "spam": bot.spam.stats(),
+            "raids": bot.raids.stats(),
+        },
+    )
+
+
+SCENARIOS = {
+    "discord_bridge": bench_discord_bridge,
+    "telegram": bench_telegram,
+    "legacy_discord": bench_legacy_discord,
+}
+
+
+# ---------- CLI ----------
+
+
+def _print(result: Result):
+    print(
+        f"{result.scenario:<16} {result.messages:>7} msgs  {result.throughput:>10.1f} msg/s  "
+        f"p50 {result.p50_ms:>7.3f} ms  p99 {result.p99_ms:>7.3f} ms  max {result.max_ms:>8.3f} ms  "
+        f"mem +{result.mem_growth_kb:.0f} KiB (peak +{result.mem_peak_kb:.0f})  sends {result.sends}  errors {result.errors}"
+    )
+    for key, value in result.extra.items():
+        print(f"{'':<16} {key}: {value}")
+
+
+async def run(args) -> List[Result]:
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="avcbot-bench-") as tmp:
+        for name in names:
+            res = await SCENARIOS[name](args, tmp)
+            if res is not None:
+                results.append(res)
+                if not args.json:
+                    _print(res)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bot.bench", description="Offline handler load benchmark")
+    p.add_argument("-s", "--scenario", choices=["all", *SCENARIOS], default="all")
+    p.add_argument("-n", "--messages", type=int, default=5000)
+    p.add_argument("-r", "--rate", type=float, default=0.0, help="messages/sec (0 = as fast as possible)")
+    p.add_argument("-c", "--concurrency", type=int, default=64, help="max handlers in flight")
+    p.add_argument("--send-latency", type=float, default=0.0, help="stub API latency, seconds")
+    p.add_argument("--queue-size", type=int, default=500, help="relay queue size per destination")
+    p.add_argument("--outbox", action="store_true", help="put relay sends through the durable outbox")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", action="store_true", help="print results as JSON")
+    p.add_argument("--max-p99-ms", type=float, default=0.0, help="exit 1 if any scenario's p99 exceeds this")
+    p.add_argument("--min-throughput", type=float, default=0.0, help="exit 1 if any scenario is slower")
+    p.add_argument("--log-level", default="ERROR")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s %(name)s: %(message)s")
+    results = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps([dataclasses.asdict(r) for r in results], ensure_ascii=False, indent=2))
+
+    failed = [
+        r.scenario for r in results
+        if r.errors
+        or (args.max_p99_ms and r.p99_ms > args.max_p99_ms)
+        or (args.min_throughput and r.throughput < args.min_throughput)
+    ]
+    if failed:
+        print(f"regression: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
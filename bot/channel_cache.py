@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class ChannelCache:
+    """
+    Кэш «id канала -> объект канала» для всех, кто шлёт в Discord (мост, планировщик, легаси-бот).
+
+    - сначала get_channel (память discord.py), и только если там нет — REST fetch_channel;
+    - найденный канал живёт ttl секунд, НЕ найденный — negative_ttl секунд,
+      поэтому отсутствующий канал не превращает каждое сообщение в REST-запрос;
+    - одновременные промахи по одному id делят один fetch;
+    - on_guild_channel_delete/update/create сразу сбрасывают запись.
+    """
+
+    def __init__(self, client: discord.Client, ttl: float = 600.0, negative_ttl: float = 60.0):
+        self.client = client
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: Dict[int, Tuple[Optional[discord.abc.Messageable], float]] = {}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    async def resolve(self, channel_id: int) -> Optional[discord.abc.Messageable]:
+        channel_id = int(channel_id)
+        entry = self._entries.get(channel_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        fut = self._inflight.get(channel_id)
+        if fut is not None:
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[channel_id] = fut
+        try:
+            ch = await self._lookup(channel_id)
+            self._store(channel_id, ch)
+            fut.set_result(ch)
+            return ch
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        finally:
+            self._inflight.pop(channel_id, None)
+
+    async def _lookup(self, channel_id: int) -> Optional[discord.abc.Messageable]:
+        ch = self.client.get_channel(channel_id)
+        if ch is not None:
+            return ch
+
+        self.fetches += 1
+        try:
+            return await self.client.fetch_channel(channel_id)
+        except (discord.NotFound, discord.Forbidden):
+            log.warning("[Discord] Channel %s not found or not accessible", channel_id)
+            return None
+        except Exception:
+            log.exception("[Discord] Failed to fetch channel id=%s", channel_id)
+            return None
+
+    def _store(self, channel_id: int, ch: Optional[discord.abc.Messageable]):
+        ttl = self.ttl if ch is not None else self.negative_ttl
+        self._entries[channel_id] = (ch, time.monotonic() + ttl)
+
+    # ---------- инвалидация ----------
+
+    def invalidate(self, channel_id: Optional[int] = None):
+        if channel_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(int(channel_id), None)
+
+    def on_channel_delete(self, channel: discord.abc.GuildChannel):
+        # канала больше нет — запоминаем это, а не ходим за ним в REST
+        self._store(channel.id, None)
+
+    def on_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if after.id in self._entries:
+            self._store(after.id, after)
+
+    def on_channel_create(self, channel: discord.abc.GuildChannel):
+        # канал появился (или снова стал виден боту) — отрицательная запись больше не верна
+        entry = self._entries.get(channel.id)
+        if entry is not None and entry[0] is None:
+            del self._entries[channel.id]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+        }
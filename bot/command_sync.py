@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Optional
+
+import discord
+from discord import app_commands
+
+log = logging.getLogger(__name__)
+
+
+def tree_fingerprint(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """
+    Хеш того, что мы отправили бы в Discord при sync: имена, описания, параметры,
+    права, локализации. Меняется только при реальном изменении команд.
+    """
+    payload = [cmd.to_dict(tree) for cmd in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CommandSyncState:
+    """
+    Последние синхронизированные хеши по гильдиям — JSON-файл на диске
+    (COMMAND_SYNC_FILE). Файл потерян — просто один лишний sync.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._hashes: Dict[str, str] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._hashes = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            log.warning("[Discord] Can't read %s, commands will be synced", path)
+
+    def get(self, scope: str) -> Optional[str]:
+        return self._hashes.get(scope)
+
+    def set(self, scope: str, fingerprint: str):
+        self._hashes[scope] = fingerprint
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._hashes, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+async def sync_if_changed(
+    tree: app_commands.CommandTree,
+    guild: Optional[discord.abc.Snowflake] = None,
+    *,
+    force: bool = False,
+    path: Optional[str] = None,
+) -> bool:
+    """
+    tree.sync только если дерево команд поменялось с прошлого успешного sync.
+    True — синхронизировали. Ошибка sync не роняет старт: бот работает со старыми командами.
+    """
+    state = CommandSyncState(path or os.getenv("COMMAND_SYNC_FILE", "") or "data/command_sync.json")
+    scope = str(guild.id) if guild else "global"
+    fingerprint = tree_fingerprint(tree, guild)
+
+    if not force and state.get(scope) == fingerprint:
+        log.info("[Discord] Slash commands unchanged (%s), sync skipped", fingerprint[:12])
+        return False
+
+    try:
+        synced = await tree.sync(guild=guild)
+    except discord.HTTPException:
+        log.exception("[Discord] Slash command sync failed, keeping previous commands")
+        return False
+
+    state.set(scope, fingerprint)
+    log.info("[Discord] Synced %s slash commands (%s)", len(synced), fingerprint[:12])
+    return True
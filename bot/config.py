@@ -2,6 +2,8 @@ import os
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+from .ratelimit import DISCORD_CHANNEL_LIMIT, TELEGRAM_CHAT_LIMIT
+
 load_dotenv()
 
 
@@ -15,6 +17,16 @@ def _int(name: str, default=None):
         return default
 
 
+def _float(name: str, default: float) -> float:
+    v = os.getenv(name)
+    if v is None or v == "":
+        return default
+    try:
+        return float(v)
+    except ValueError:
+        return default
+
+
 def _str(name: str, default=""):
     v = os.getenv(name)
     if v is None:
@@ -35,10 +47,33 @@ class Config:
 
     telegram_admin_chat_id: int
 
+    # telegram ingestion: polling (по умолчанию) или webhook на нашем aiohttp сервере
+    telegram_webhook_url: str
+    telegram_webhook_secret: str
+    telegram_concurrency: int
+
+    # адреса API (пусто — настоящие сервисы; для нагрузочных тестов — python -m bot.mockapi)
+    telegram_api_url: str
+    discord_api_url: str
+    discord_gateway_url: str
+
+    # presence intent (привилегированный): живой онлайн в !stats ценой всех presence-событий гильдии
+    discord_presence_intent: bool
+
     # bridge
     bridge_discord_channel_id: int | None
     bridge_telegram_chat_id: int | None
 
+    # relay queue (очередь исходящих сообщений моста)
+    relay_queue_size: int
+    relay_overflow: str
+    relay_workers: int
+    relay_coalesce_sec: float
+    telegram_send_rate: float
+    telegram_send_burst: int
+    discord_send_rate: float
+    discord_send_burst: int
+
     # spam (optional)
     spam_max_msgs: int
     spam_window_sec: int
@@ -81,9 +116,28 @@ def load_config() -> Config:
 
         telegram_admin_chat_id=_int("TELEGRAM_ADMIN_CHAT_ID") or 0,
 
+        telegram_webhook_url=_str("TELEGRAM_WEBHOOK_URL").strip().rstrip("/"),
+        telegram_webhook_secret=_str("TELEGRAM_WEBHOOK_SECRET").strip(),
+        telegram_concurrency=_int("TELEGRAM_CONCURRENCY", 16),
+
+        telegram_api_url=_str("TELEGRAM_API_URL").strip().rstrip("/"),
+        discord_api_url=_str("DISCORD_API_URL").strip().rstrip("/"),
+        discord_gateway_url=_str("DISCORD_GATEWAY_URL").strip(),
+
+        discord_presence_intent=_str("DISCORD_PRESENCE_INTENT", "0").strip().lower() in ("1", "true", "yes", "on"),
+
         bridge_discord_channel_id=_int("BRIDGE_DISCORD_CHANNEL_ID"),
         bridge_telegram_chat_id=_int("BRIDGE_TELEGRAM_CHAT_ID"),
 
+        relay_queue_size=_int("RELAY_QUEUE_SIZE", 500),
+        relay_overflow=_str("RELAY_OVERFLOW", "drop_oldest").strip().lower(),
+        relay_workers=_int("RELAY_WORKERS", 1),
+        relay_coalesce_sec=_float("RELAY_COALESCE_SEC", 0.5),
+        telegram_send_rate=_float("TELEGRAM_SEND_RATE", TELEGRAM_CHAT_LIMIT[0]),
+        telegram_send_burst=_int("TELEGRAM_SEND_BURST", TELEGRAM_CHAT_LIMIT[1]),
+        discord_send_rate=_float("DISCORD_SEND_RATE", DISCORD_CHANNEL_LIMIT[0]),
+        discord_send_burst=_int("DISCORD_SEND_BURST", DISCORD_CHANNEL_LIMIT[1]),
+
         spam_max_msgs=int(_str("SPAM_MAX_MSGS", "5")),
         spam_window_sec=int(_str("SPAM_WINDOW_SEC", "8")),
         spam_timeout_sec=int(_str("SPAM_TIMEOUT_SEC", "300")),
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import datetime as dt
+from typing import FrozenSet
+
+# алиасы как в обычном cron
+_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+def _parse_field(spec: str, lo: int, hi: int) -> FrozenSet[int]:
+    values = set()
+    for part in spec.split(","):
+        step = 1
+        if "/" in part:
+            part, step_s = part.split("/", 1)
+            step = int(step_s)
+            if step <= 0:
+                raise ValueError(f"bad step in {spec!r}")
+        if part in ("*", ""):
+            start, end = lo, hi
+        elif "-" in part:
+            a, b = part.split("-", 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(part)
+            end = hi if step != 1 else start
+        if start < lo or end > hi or start > end:
+            raise ValueError(f"{spec!r} out of range {lo}-{hi}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpr:
+    """
+    Классический cron из 5 полей: "минута час день месяц день_недели"
+    (* , - / и алиасы @hourly/@daily/...). День недели 0-6, 0 (и 7) = воскресенье.
+    Время — локальное время процесса (на Render это UTC).
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        fields = _ALIASES.get(self.expr, self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron needs 5 fields: {expr!r}")
+        m, h, dom, mon, dow = fields
+        self.minutes = _parse_field(m, 0, 59)
+        self.hours = _parse_field(h, 0, 23)
+        self.days = _parse_field(dom, 1, 31)
+        self.months = _parse_field(mon, 1, 12)
+        self.weekdays = frozenset(d % 7 for d in _parse_field(dow, 0, 7))
+        # как в cron: если заданы и день месяца, и день недели — подходит любой из них.
+        # Поле «задано», если не начинается с * (*/2 — тоже «любой», как в Vixie cron)
+        self._dom_any = dom.startswith("*")
+        self._dow_any = dow.startswith("*")
+
+    def __repr__(self) -> str:
+        return f"CronExpr({self.expr!r})"
+
+    def _day_ok(self, d: dt.datetime) -> bool:
+        dom_ok = d.day in self.days
+        dow_ok = (d.isoweekday() % 7) in self.weekdays
+        if self._dom_any or self._dow_any:
+            return dom_ok and dow_ok
+        return dom_ok or dow_ok
+
+    def next_after(self, after: dt.datetime) -> dt.datetime:
+        """
+        Ближайший момент строго после after (с точностью до минуты).
+        Прыгаем сразу по месяцам/дням/часам, а не по минутам.
+        """
+        t = after.replace(second=0, microsecond=0) + dt.timedelta(minutes=1)
+        limit = after + dt.timedelta(days=366 * 5)
+        while t <= limit:
+            if t.month not in self.months:
+                year, month = (t.year + 1, 1) if t.month == 12 else (t.year, t.month + 1)
+                t = t.replace(year=year, month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_ok(t):
+                t = (t + dt.timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if t.hour not in self.hours:
+                t = (t + dt.timedelta(hours=1)).replace(minute=0)
+                continue
+            if t.minute not in self.minutes:
+                t += dt.timedelta(minutes=1)
+                continue
+            return t
+        raise ValueError(f"cron {self.expr!r} never fires")
@@ -1,110 +1,215 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Optional
 
 import discord
+import yarl
 
+from .channel_cache import ChannelCache
 from .config import Config
-from .stats import build_discord_stats
+from .metrics import HANDLER_ERRORS, HANDLER_SECONDS, SEND_ERRORS, SEND_SECONDS
+from .routing import DISCORD, RoutingTable, load_routes
+from .stats import GuildStatsTracker, build_discord_stats
 
 log = logging.getLogger(__name__)
 
+_ON_MESSAGE_SECONDS = HANDLER_SECONDS.labels("discord_on_message")
+_ON_MESSAGE_ERRORS = HANDLER_ERRORS.labels("discord_on_message")
+_BRIDGE_SEND_SECONDS = SEND_SECONDS.labels("discord_bridge")
+_BRIDGE_SEND_ERRORS = SEND_ERRORS.labels("discord_bridge")
+
+
+def use_api_urls(api_url: str = "", gateway_url: str = ""):
+    """
+    Свой REST / gateway вместо discord.com (локальный мок для нагрузочных тестов).
+    discord.py держит адреса в атрибутах классов — меняется для всего процесса.
+    """
+    if api_url:
+        discord.http.Route.BASE = api_url
+        log.warning("[Discord] Using REST API at %s", api_url)
+    if gateway_url:
+        discord.gateway.DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(gateway_url)
+        log.warning("[Discord] Using gateway at %s", gateway_url)
+
 
 class DiscordBridge:
     """
     Discord бот + мост:
-    - Discord -> TG: сообщения из bridge канала пересылаем в TG (через callback set_telegram_sender)
-    - TG -> Discord: send_to_bridge()
+    - Discord -> TG: сообщения из каналов-источников таблицы маршрутов отдаём в callback
+      set_telegram_sender вместе с маршрутами
+    - TG -> Discord: send_to_channel() / send_to_bridge()
     """
 
-    def __init__(self, cfg: Config):
+    def __init__(self, cfg: Config, routes: Optional[RoutingTable] = None):
         self.cfg = cfg
+        self.routes = routes if routes is not None else load_routes(cfg)
 
         intents = discord.Intents.default()
         intents.message_content = True  # важно для чтения сообщений
         intents.guilds = True
         intents.members = True  # нужно для статистики участников
+        # живой online в !stats (on_presence_update) — только по DISCORD_PRESENCE_INTENT=1:
+        # привилегированный intent (включить в Developer Portal, иначе логин упадёт)
+        # и самый тяжёлый поток событий шлюза; без него online — approximate_presence_count
+        self.presences = bool(getattr(cfg, "discord_presence_intent", False))
+        intents.presences = self.presences
 
         self.client = discord.Client(intents=intents)
 
-        self.bridge_channel: Optional[discord.abc.Messageable] = None
-        self._tg_send = None  # async func(text:str)
+        # общий кэш каналов: мост, планировщик и все, кто шлёт через этот клиент
+        self.channels = ChannelCache(self.client)
+        self._tg_send = None  # async func(text:str, routes, ref)
+        self._on_edit = None  # async func(ref, text) — правка сообщения-источника
+        self._on_delete = None  # async func(ref) — удаление сообщения-источника
+
+        self.ready = asyncio.Event()  # выставляется в on_ready (для замеров старта)
 
         # флаг из __main__.py
         self.enable_stats_command: bool = False
 
+        # счётчики участников по событиям (для !stats без прохода по всем members)
+        self.stats_tracker = GuildStatsTracker(int(cfg.discord_guild_id), track_online=self.presences)
+
         # events
         self.client.event(self.on_ready)
         self.client.event(self.on_message)
+        self.client.event(self.on_member_join)
+        self.client.event(self.on_member_remove)
+        if self.presences:
+            self.client.event(self.on_presence_update)
+        self.client.event(self.on_guild_channel_create)
+        self.client.event(self.on_guild_channel_delete)
+        self.client.event(self.on_guild_channel_update)
+        self.client.event(self.on_raw_message_edit)
+        self.client.event(self.on_raw_message_delete)
+        self.client.event(self.on_raw_bulk_message_delete)
 
     # ---------- wiring ----------
 
     def set_telegram_sender(self, tg_send_callable):
         """
-        tg_send_callable: async (text:str) -> None
+        tg_send_callable: async (text:str, routes: Tuple[Route, ...], ref: MsgRef) -> None
         """
         self._tg_send = tg_send_callable
 
+    def set_sync_handlers(self, on_edit, on_delete):
+        """
+        Правки/удаления в каналах-источниках: on_edit(ref, text), on_delete(ref).
+        text оформлен так же, как при пересылке.
+        """
+        self._on_edit = on_edit
+        self._on_delete = on_delete
+
     # ---------- lifecycle ----------
 
     async def start(self):
         if not self.cfg.discord_token:
             raise RuntimeError("DISCORD_TOKEN is empty")
+        use_api_urls(getattr(self.cfg, "discord_api_url", ""), getattr(self.cfg, "discord_gateway_url", ""))
         await self.client.start(self.cfg.discord_token)
 
     # ---------- helpers ----------
 
-    async def _resolve_bridge_channel(self):
+    @staticmethod
+    def format_for_tg(author: str, content: str) -> str:
+        text = f"💬 Discord • {author}: {content}" if content else f"💬 Discord • {author}: (без текста)"
+        return text[:4000]
+
+    async def send_to_bridge(self, text: str) -> Optional[int]:
         """
-        Ищем канал по BRIDGE_DISCORD_CHANNEL_ID.
+        Отправка текста в основной bridge-канал (BRIDGE_DISCORD_CHANNEL_ID): статистика, новости.
         """
         ch_id = getattr(self.cfg, "bridge_discord_channel_id", None)
         if not ch_id:
             log.warning("[Discord] BRIDGE_DISCORD_CHANNEL_ID is not set")
-            self.bridge_channel = None
-            return
-
-        # 1) пробуем get_channel (кэш)
-        ch = self.client.get_channel(int(ch_id))
+            return None
+        return await self.send_to_channel(int(ch_id), text)
 
-        # 2) если нет — fetch_channel
-        if ch is None:
-            try:
-                ch = await self.client.fetch_channel(int(ch_id))
-            except Exception:
-                log.exception("[Discord] Failed to fetch channel id=%s", ch_id)
-                ch = None
-
-        self.bridge_channel = ch
-        if ch:
-            log.info("[Discord] Bridge channel resolved: %s", ch_id)
-        else:
-            log.warning("[Discord] Bridge channel NOT found: %s", ch_id)
-
-    async def send_to_bridge(self, text: str):
+    async def send_to_channel(self, channel_id: int, text: str) -> Optional[int]:
         """
-        Отправка текста в Discord bridge-канал.
+        Отправка текста в любой канал (адресаты маршрутов моста). Возвращает id сообщения.
         """
-        if not self.bridge_channel:
-            await self._resolve_bridge_channel()
-        if not self.bridge_channel:
-            log.warning("[Discord] Can't send: bridge channel is None")
-            return
+        channel = await self.channels.resolve(channel_id)
+        if not channel:
+            log.warning("[Discord] Can't send: channel %s not found", channel_id)
+            return None
 
         try:
-            await self.bridge_channel.send(text[:2000])
-            log.info("[Discord] Sent to bridge channel: %s", text[:120])
+            with _BRIDGE_SEND_SECONDS.time():
+                sent = await channel.send(text[:2000])
+            log.info("[Discord] Sent to channel %s", channel_id, extra={"body": text[:120]})
+            return sent.id
+        except discord.NotFound:
+            # канал удалили между событиями — забываем, следующий вызов перепроверит
+            self.channels.invalidate(channel.id)
+            _BRIDGE_SEND_ERRORS.inc()
+            raise
         except Exception:
-            log.exception("[Discord] Failed to send message to bridge channel")
+            # вызывающий (очередь моста / fan-out) сам залогирует и решит, повторять ли
+            _BRIDGE_SEND_ERRORS.inc()
+            raise
+
+    async def edit_message(self, channel_id: int, message_id: int, text: str):
+        channel = await self.channels.resolve(channel_id)
+        if channel:
+            await channel.get_partial_message(message_id).edit(content=text[:2000])
+
+    async def delete_message(self, channel_id: int, message_id: int):
+        channel = await self.channels.resolve(channel_id)
+        if channel:
+            await channel.get_partial_message(message_id).delete()
 
     # ---------- events ----------
 
+    async def build_stats_text(self) -> str:
+        return await build_discord_stats(self.client, int(self.cfg.discord_guild_id), self.stats_tracker)
+
     async def on_ready(self):
-        await self._resolve_bridge_channel()
+        # после (ре)коннекта объекты каналов пересоздаются — старые ссылки не держим
+        self.channels.invalidate()
+        # прогреваем кэш всех каналов-адресатов маршрутов (и основного bridge-канала)
+        targets = set(self.routes.targets(DISCORD))
+        if getattr(self.cfg, "bridge_discord_channel_id", None):
+            targets.add(int(self.cfg.bridge_discord_channel_id))
+        found = await asyncio.gather(*(self.channels.resolve(ch_id) for ch_id in targets))
+        log.info("[Discord] Bridge channels resolved: %s/%s", sum(1 for ch in found if ch), len(targets))
         log.info("[Discord] Logged in as %s (id=%s)", self.client.user, self.client.user.id)
+        self.ready.set()
+
+        # после (ре)коннекта кэш members мог поменяться — пересчитаем счётчики
+        guild = self.client.get_guild(int(self.cfg.discord_guild_id))
+        if guild:
+            await self.stats_tracker.reconcile(guild)
+
+    async def on_member_join(self, member: discord.Member):
+        self.stats_tracker.on_member_join(member)
+
+    async def on_member_remove(self, member: discord.Member):
+        self.stats_tracker.on_member_remove(member)
+
+    async def on_presence_update(self, before: discord.Member, after: discord.Member):
+        self.stats_tracker.on_presence_update(before, after)
+
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.channels.on_channel_create(channel)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.channels.on_channel_delete(channel)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.channels.on_channel_update(before, after)
 
     async def on_message(self, message: discord.Message):
+        with _ON_MESSAGE_SECONDS.time():
+            try:
+                await self._handle_message(message)
+            except Exception:
+                _ON_MESSAGE_ERRORS.inc()
+                raise
+
+    async def _handle_message(self, message: discord.Message):
         # игнорим свои сообщения
         if message.author == self.client.user:
             return
@@ -114,20 +219,16 @@ class DiscordBridge:
         # ---- команда !stats ----
         if self.enable_stats_command and content.lower().startswith("!stats"):
             try:
-                text = await build_discord_stats(self.client, int(self.cfg.discord_guild_id))
+                text = await self.build_stats_text()
                 await message.channel.send(text[:2000])
             except Exception:
                 log.exception("[Discord] !stats failed")
                 await message.channel.send("❌ Не смог собрать статистику.")
             return
 
-        # ---- обычный мост Discord -> TG ----
-        bridge_id = getattr(self.cfg, "bridge_discord_channel_id", None)
-        if not bridge_id:
-            return
-
-        # только из нужного канала
-        if message.channel.id != int(bridge_id):
+        # ---- мост Discord -> TG: куда — по таблице маршрутов (O(1) по id канала) ----
+        routes = self.routes.destinations(DISCORD, message.channel.id)
+        if not routes:
             return
 
         if not self._tg_send:
@@ -136,10 +237,53 @@ class DiscordBridge:
 
         # формируем текст в TG
         author = getattr(message.author, "display_name", "unknown")
-        text = f"💬 Discord • {author}: {content}" if content else f"💬 Discord • {author}: (без текста)"
+        text = self.format_for_tg(author, content)
 
         try:
-            await self._tg_send(text[:4000])
-            log.info("[Bridge] Discord -> TG: %s", text[:120])
+            await self._tg_send(text, routes, (DISCORD, message.channel.id, message.id))
+            log.info("[Bridge] Discord -> TG", extra={"body": text[:120]})
         except Exception:
             log.exception("[Bridge] Discord -> TG failed")
+
+    # ---------- правки / удаления (raw: приходят и для сообщений не из кэша) ----------
+
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if not self._on_edit or not self.routes.is_source(DISCORD, payload.channel_id):
+            return
+        data = payload.data
+        if "content" not in data:
+            return  # подгрузился embed и т.п. — текст не менялся
+        author = data.get("author") or {}
+        if self.client.user and str(author.get("id")) == str(self.client.user.id):
+            return
+        before = payload.cached_message
+        if before is not None and before.content == data["content"]:
+            return
+
+        member = data.get("member") or {}
+        name = member.get("nick") or author.get("global_name") or author.get("username") or "unknown"
+        text = self.format_for_tg(name, (data["content"] or "").strip())
+        try:
+            await self._on_edit((DISCORD, payload.channel_id, payload.message_id), text)
+        except Exception:
+            log.exception("[Bridge] Discord edit sync failed")
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not self._on_delete or not self.routes.is_source(DISCORD, payload.channel_id):
+            return
+        try:
+            await self._on_delete((DISCORD, payload.channel_id, payload.message_id))
+        except Exception:
+            log.exception("[Bridge] Discord delete sync failed")
+
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        """
+        /purge и прочие массовые удаления: удаляем копии каждого удалённого оригинала.
+        """
+        if not self._on_delete or not self.routes.is_source(DISCORD, payload.channel_id):
+            return
+        for message_id in payload.message_ids:
+            try:
+                await self._on_delete((DISCORD, payload.channel_id, message_id))
+            except Exception:
+                log.exception("[Bridge] Discord delete sync failed")
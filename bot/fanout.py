@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence
+
+from .metrics import SEND_ERRORS, SEND_SECONDS
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class Destination:
+    """
+    Куда постим: имя (для логов/метрик) + async send(text).
+    Несколько TG-чатов / Discord-каналов = несколько Destination.
+    """
+    name: str
+    send: Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class SendResult:
+    name: str
+    ok: bool
+    attempts: int
+    elapsed: float
+    error: Optional[str] = None
+
+
+async def _send_one(dest: Destination, text: str, timeout: float, retries: int, backoff: float) -> SendResult:
+    t0 = time.monotonic()
+    attempts = 0
+    error: Optional[str] = None
+    m_seconds = SEND_SECONDS.labels(f"fanout:{dest.name}")
+
+    while attempts <= retries:
+        attempts += 1
+        try:
+            with m_seconds.time():
+                await asyncio.wait_for(dest.send(text), timeout=timeout)
+            return SendResult(dest.name, True, attempts, time.monotonic() - t0)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            # отменённая отправка могла уже дойти — повтор дал бы дубликат поста
+            error = f"timeout after {timeout}s"
+            SEND_ERRORS.labels(f"fanout:{dest.name}").inc()
+            break
+        except Exception as e:
+            error = repr(e)
+            SEND_ERRORS.labels(f"fanout:{dest.name}").inc()
+            if attempts > retries:
+                break
+            # RetryAfter от Telegram говорит, сколько ждать; иначе экспоненциальная пауза
+            delay = getattr(e, "retry_after", None)
+            if hasattr(delay, "total_seconds"):
+                delay = delay.total_seconds()
+            if not isinstance(delay, (int, float)):
+                delay = backoff * 2 ** (attempts - 1)
+            await asyncio.sleep(delay)
+
+    return SendResult(dest.name, False, attempts, time.monotonic() - t0, error)
+
+
+async def fan_out(
+    destinations: Sequence[Destination],
+    text: str,
+    *,
+    timeout: float = 15.0,
+    retries: int = 2,
+    backoff: float = 1.0,
+) -> List[SendResult]:
+    """
+    Шлём text во все destinations параллельно: у каждого свой таймаут и ретраи,
+    падение одного не мешает остальным. Время поста ≈ самый медленный адресат, а не сумма.
+    """
+    if not destinations:
+        return []
+    results = await asyncio.gather(*(_send_one(d, text, timeout, retries, backoff) for d in destinations))
+
+    failed = [r for r in results if not r.ok]
+    for r in failed:
+        log.warning("[Fanout] %s failed after %s attempts: %s", r.name, r.attempts, r.error)
+    log.info("[Fanout] Sent to %s/%s destinations", len(results) - len(failed), len(results))
+    return list(results)
@@ -1,3 +1,14 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+log = logging.getLogger(__name__)
+
 KEYWORD_REPLIES = {
     "привет": "Привет! 👋",
     "донат": "Поддержать: /donate",
@@ -5,3 +16,161 @@ KEYWORD_REPLIES = {
     "steam": "Steam: /steam",
     "цель": "Цели: /goals",
 }
+
+
+@dataclass(frozen=True)
+class KeywordRule:
+    keyword: str
+    reply: str
+    priority: int = 0  # меньше = важнее; при равенстве побеждает тот, кто раньше в списке
+    whole_word: bool = False  # True — только целым словом ("цель" не сработает на "цели")
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick автомат по всем ключевым словам: один проход по сообщению
+    вместо `k in content` для каждого ключа. Строится один раз на старте
+    (и заново в reload_keywords(), в Discord — командой !reloadkeywords).
+    """
+
+    def __init__(self, rules: Iterable[KeywordRule]):
+        self.rules: List[KeywordRule] = [r for r in rules if r.keyword]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[tuple] = [()]
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _build(self):
+        goto, fail, out = self._goto, self._fail, self._out
+
+        # 1) trie
+        own: List[List[int]] = [[]]
+        for idx, rule in enumerate(self.rules):
+            node = 0
+            for ch in rule.keyword.lower():
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][ch] = nxt
+                    goto.append({})
+                    fail.append(0)
+                    own.append([])
+                node = nxt
+            own[node].append(idx)
+
+        # 2) fail-ссылки обходом в ширину; выходы сразу склеиваем с выходами fail-узла,
+        #    чтобы при поиске не ходить по цепочке fail
+        out.extend([()] * (len(goto) - 1))
+        queue = deque()
+        for child in goto[0].values():
+            out[child] = tuple(own[child])
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(ch, 0)
+                out[child] = tuple(own[child]) + out[fail[child]]
+                queue.append(child)
+
+    def _iter_matches(self, text: str):
+        goto, fail, out, rules = self._goto, self._fail, self._out, self.rules
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                rule = rules[idx]
+                if rule.whole_word:
+                    start = pos - len(rule.keyword) + 1
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if pos + 1 < len(text) and _is_word_char(text[pos + 1]):
+                        continue
+                yield idx
+
+    def find(self, text: str) -> Optional[KeywordRule]:
+        """
+        Самое приоритетное правило, которое встречается в тексте (или None).
+        """
+        if not text or not self.rules:
+            return None
+        best: Optional[tuple] = None
+        for idx in self._iter_matches(text.lower()):
+            key = (self.rules[idx].priority, idx)
+            if best is None or key < best:
+                best = key
+        return self.rules[best[1]] if best else None
+
+    def find_all(self, text: str) -> List[KeywordRule]:
+        if not text or not self.rules:
+            return []
+        found = sorted(set(self._iter_matches(text.lower())), key=lambda i: (self.rules[i].priority, i))
+        return [self.rules[i] for i in found]
+
+
+def load_rules() -> List[KeywordRule]:
+    """
+    KEYWORD_REPLIES + (опционально) JSON из KEYWORDS_FILE:
+    [{"keyword": "...", "reply": "...", "priority": 0, "whole_word": false}, ...]
+    или просто {"keyword": "reply", ...}.
+    """
+    rules = [KeywordRule(k.lower(), v) for k, v in KEYWORD_REPLIES.items()]
+
+    path = os.getenv("KEYWORDS_FILE", "").strip()
+    if not path:
+        return rules
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        log.exception("[Keywords] Failed to load %s", path)
+        return rules
+
+    if isinstance(data, dict):
+        data = [{"keyword": k, "reply": v} for k, v in data.items()]
+    for row in data:
+        try:
+            rules.append(KeywordRule(
+                keyword=str(row["keyword"]).lower(),
+                reply=str(row["reply"]),
+                priority=int(row.get("priority", 0)),
+                whole_word=bool(row.get("whole_word", False)),
+            ))
+        except Exception:
+            log.warning("[Keywords] Bad rule in %s: %r", path, row)
+    return rules
+
+
+_matcher: Optional[KeywordMatcher] = None
+
+
+def reload_keywords() -> KeywordMatcher:
+    global _matcher
+    _matcher = KeywordMatcher(load_rules())
+    log.info("[Keywords] Matcher built (%s rules)", len(_matcher))
+    return _matcher
+
+
+def get_matcher() -> KeywordMatcher:
+    if _matcher is None:
+        return reload_keywords()
+    return _matcher
+
+
+def match_reply(text: str) -> Optional[str]:
+    """
+    Ответ на сообщение по ключевым словам (общий для Discord и Telegram).
+    """
+    rule = get_matcher().find(text)
+    return rule.reply if rule else None
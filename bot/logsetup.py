@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from .metrics import REGISTRY
+
+_DROPPED = REGISTRY.counter(
+    "avcbot_log_dropped_total", "Log records dropped by sampling / rate limiting", ("category",)
+)
+
+# категория записи = тег из "[Bridge] ..." (или extra={"category": ...})
+_TAG_RE = re.compile(r"^\[([A-Za-z0-9_\-]+)\]")
+
+# стандартные поля LogRecord — всё остальное из extra попадает в JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "category", "body"}
+
+
+def _category(record: logging.LogRecord) -> str:
+    cat = getattr(record, "category", None)
+    if cat:
+        return str(cat)
+    m = _TAG_RE.match(record.msg) if isinstance(record.msg, str) else None
+    return m.group(1).lower() if m else record.name
+
+
+def _parse_rates(spec: str) -> Dict[str, float]:
+    """
+    "bridge=0.1,tg=0.5" -> {"bridge": 0.1, "tg": 0.5}
+    """
+    out: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            try:
+                out[name.strip().lower()] = float(value)
+            except ValueError:
+                pass
+    return out
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание INFO/DEBUG по категориям (WARNING и выше проходят всегда):
+    - sample: доля записей, которую оставляем (0.1 = каждая десятая);
+    - rate: не больше N записей категории в секунду (token bucket).
+    Стоит на QueueHandler, так что отброшенная запись не стоит ничего, кроме этой проверки.
+    """
+
+    def __init__(self, sample: Dict[str, float], rate: Dict[str, float], default_rate: float = 0.0):
+        super().__init__()
+        self.sample = sample
+        self.rate = rate
+        self.default_rate = default_rate
+        self._counters: Dict[str, float] = {}
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # cat -> (tokens, updated)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        cat = _category(record)
+
+        share = self.sample.get(cat)
+        if share is not None and share < 1.0:
+            # детерминированно: накапливаем долю и пропускаем, когда набралась единица
+            acc = self._counters.get(cat, 0.0) + max(0.0, share)
+            if acc < 1.0 - 1e-9:
+                self._counters[cat] = acc
+                _DROPPED.labels(cat).inc()
+                return False
+            self._counters[cat] = acc - 1.0
+
+        limit = self.rate.get(cat, self.default_rate)
+        if limit > 0:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(cat, (limit, now))
+            tokens = min(limit, tokens + (now - updated) * limit)
+            if tokens < 1.0:
+                self._buckets[cat] = (tokens, now)
+                _DROPPED.labels(cat).inc()
+                return False
+            self._buckets[cat] = (tokens - 1.0, now)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, bodies: bool = True):
+        super().__init__()
+        self.bodies = bodies
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "category": _category(record),
+            "msg": record.getMessage(),
+        }
+        body = getattr(record, "body", None)
+        if body is not None and self.bodies:
+            out["body"] = body
+        for k, v in vars(record).items():
+            if k not in _RESERVED and not k.startswith("_"):
+                out[k] = v if isinstance(v, (str, int, float, bool)) or v is None else repr(v)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, bodies: bool = True):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        self.bodies = bodies
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        body = getattr(record, "body", None)
+        if body is not None and self.bodies:
+            line = f"{line}: {body}"
+        return line
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    Стандартный QueueHandler форматирует запись целиком ещё в потоке loop (prepare()).
+    Очередь у нас в том же процессе — здесь только подставляем args в msg (они могут
+    поменяться, пока запись ждёт в очереди), а JSON/текст и traceback собирает поток listener.
+    extra-поля записи остаются как есть.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not record.args:
+            return record
+        record = copy.copy(record)  # оригинал могут увидеть другие хендлеры
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """
+    Логи через очередь: хендлеры в loop только кладут запись (после фильтра сэмплинга),
+    форматирует и пишет в stdout отдельный поток QueueListener.
+
+    LOG_LEVEL=INFO
+    LOG_FORMAT=json | text
+    LOG_BODIES=1 — писать тексты сообщений (0 — только метаданные, без содержимого чатов)
+    LOG_SAMPLE="bridge=0.1,tg=0.1" — доля INFO-записей категории
+    LOG_RATE="bridge=20" — не больше N записей/сек на категорию; LOG_RATE_DEFAULT — для остальных
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    bodies = os.getenv("LOG_BODIES", "1").strip().lower() not in ("0", "false", "no", "off")
+    if os.getenv("LOG_FORMAT", "json").strip().lower() == "text":
+        formatter: logging.Formatter = TextFormatter(bodies)
+    else:
+        formatter = JsonFormatter(bodies)
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(formatter)
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _InProcessQueueHandler(q)
+    try:
+        default_rate = float(os.getenv("LOG_RATE_DEFAULT", "0") or 0)
+    except ValueError:
+        default_rate = 0.0
+    handler.addFilter(
+        SamplingFilter(
+            _parse_rates(os.getenv("LOG_SAMPLE", "")),
+            _parse_rates(os.getenv("LOG_RATE", "")),
+            default_rate,
+        )
+    )
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+
+    _listener = QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Дописать всё из очереди (вызывается и при выходе из процесса).
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
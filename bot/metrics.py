@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+# секунды: от 1 мс до 30 с — хватает и для хендлеров, и для HTTP к API/лентам
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(v: float) -> str:
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if v == int(v):
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        Дочерняя метрика для набора лейблов. В горячем коде — сохранить в переменную
+        один раз и дальше дёргать её, без поиска по словарю.
+        """
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _render_samples(self, out: List[str]):
+        raise NotImplementedError
+
+    def render(self, out: List[str]):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        self._render_samples(out)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, n: float = 1.0):
+        self._children[()].value += n
+
+    def _render_samples(self, out: List[str]):
+        for key, c in self._children.items():
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_num(c.value)}")
+
+
+class _GaugeChild:
+    __slots__ = ("value", "fn")
+
+    def __init__(self):
+        self.value = 0.0
+        self.fn: Optional[Callable[[], float]] = None
+
+    def set(self, v: float):
+        self.value = v
+
+    def inc(self, n: float = 1.0):
+        self.value += n
+
+    def dec(self, n: float = 1.0):
+        self.value -= n
+
+    def set_function(self, fn: Callable[[], float]):
+        """
+        Значение считается в момент /metrics (глубина очереди и т.п.) — ноль работы в горячем пути.
+        """
+        self.fn = fn
+
+    def get(self) -> float:
+        if self.fn is not None:
+            try:
+                return float(self.fn())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, v: float):
+        self._children[()].set(v)
+
+    def set_function(self, fn: Callable[[], float]):
+        self._children[()].set_function(fn)
+
+    def _render_samples(self, out: List[str]):
+        for key, g in self._children.items():
+            out.append(f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_num(g.get())}")
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последний — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(self.buckets, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v: float):
+        self._children[()].observe(v)
+
+    def time(self) -> _Timer:
+        return self._children[()].time()
+
+    def _render_samples(self, out: List[str]):
+        for key, h in self._children.items():
+            labels = _fmt_labels(self.labelnames, key)
+            acc = 0
+            for le, n in zip(self.buckets, h.counts):
+                acc += n
+                le_label = _fmt_labels(self.labelnames, key, 'le="%s"' % le)
+                out.append(f"{self.name}_bucket{le_label} {acc}")
+            acc += h.counts[-1]
+            inf_label = _fmt_labels(self.labelnames, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{inf_label} {acc}")
+            out.append(f"{self.name}_sum{labels} {_fmt_num(h.sum)}")
+            out.append(f"{self.name}_count{labels} {h.count}")
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing  # повторный импорт / повторная регистрация — та же метрика
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        out: List[str] = []
+        for m in self._metrics.values():
+            m.render(out)
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------- общие метрики горячих путей ----------
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    "avcbot_handler_seconds", "Inbound handler duration", ("handler",)
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "avcbot_handler_errors_total", "Inbound handler failures", ("handler",)
+)
+SEND_SECONDS = REGISTRY.histogram(
+    "avcbot_send_seconds", "Outbound API send duration", ("target",)
+)
+SEND_ERRORS = REGISTRY.counter(
+    "avcbot_send_errors_total", "Outbound API send failures", ("target",)
+)
+JOB_SECONDS = REGISTRY.histogram(
+    "avcbot_job_seconds", "Scheduled job duration", ("job",)
+)
+JOB_ERRORS = REGISTRY.counter(
+    "avcbot_job_errors_total", "Scheduled job failures", ("job",)
+)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
@@ -0,0 +1,798 @@
+"""
+Локальные заглушки внешних API для нагрузочных тестов всего процесса `python -m bot`:
+Telegram Bot API (getUpdates/sendMessage/...), Discord REST + gateway (websocket) и RSS-ленты.
+Задержка ответа, лимиты с заголовками как у настоящих сервисов, случайные 429,
+генерация входящих сообщений с заданной частотой.
+
+    python -m bot.mockapi --port 8090 --latency 0.05 --tg-updates 20 --discord-messages 20
+
+Печатает переменные окружения, с которыми бот ходит в мок вместо настоящих сервисов
+(TELEGRAM_API_URL, DISCORD_API_URL, DISCORD_GATEWAY_URL, NEWS_FEEDS, id гильдии/канала/чата).
+Счётчики — GET /mock/stats.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import itertools
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+DISCORD_EPOCH_MS = 1420070400000
+BOT_USER_ID = 900000000000000001
+APP_ID = 900000000000000002
+
+_WORDS = (
+    "привет всем кто сегодня играет вечером турнир карта патч обнова сервер лагает "
+    "го катку ребята кто в войс ставлю на мид спасибо за игру gg wp"
+).split()
+
+
+@dataclasses.dataclass
+class MockSettings:
+    # общие
+    latency: float = 0.03  # секунды на ответ
+    jitter: float = 0.02  # + случайно 0..jitter
+    error_429: float = 0.0  # доля запросов отправки, получающих 429 без причины
+
+    # Telegram: глобально ~30 сообщений/сек, в одну группу 20 в минуту
+    tg_global_limit: Tuple[int, float] = (30, 1.0)
+    tg_chat_limit: Tuple[int, float] = (20, 60.0)
+    tg_chat_id: int = -1009000000001
+    tg_updates_per_sec: float = 0.0
+
+    # Discord: 5 сообщений за 5 сек в канал, 50 запросов/сек глобально
+    discord_channel_limit: Tuple[int, float] = (5, 5.0)
+    discord_global_limit: Tuple[int, float] = (50, 1.0)
+    discord_guild_id: int = 900000000000000010
+    discord_channel_ids: Tuple[int, ...] = (900000000000000101, 900000000000000102)
+    discord_messages_per_sec: float = 0.0
+
+    # входящие сообщения — от стольких разных пользователей
+    users: int = 200
+
+    # RSS: ленты и как часто в каждой появляется новость
+    rss_feeds: Tuple[str, ...] = ("news",)
+    rss_every: float = 60.0
+    rss_items: int = 20
+
+
+def _parse_limit(spec: str) -> Tuple[int, float]:
+    """
+    "5/5" -> (5, 5.0): не больше 5 запросов за 5 секунд.
+    """
+    count, _, per = spec.partition("/")
+    return int(count), float(per or 1)
+
+
+class FixedWindow:
+    """
+    Лимит «limit запросов за per секунд» по ключу — как считают Telegram и Discord.
+    """
+
+    def __init__(self, limit: int, per: float):
+        self.limit = max(1, int(limit))
+        self.per = max(0.001, float(per))
+        self._windows: Dict[Any, Tuple[float, int]] = {}  # key -> (начало окна, использовано)
+
+    def hit(self, key: Any) -> Tuple[bool, int, float]:
+        """
+        (разрешено, осталось, секунд до сброса окна)
+        """
+        now = time.monotonic()
+        start, used = self._windows.get(key, (now, 0))
+        if now - start >= self.per:
+            start, used = now, 0
+        reset_after = start + self.per - now
+        if used >= self.limit:
+            self._windows[key] = (start, used)
+            return False, 0, reset_after
+        used += 1
+        self._windows[key] = (start, used)
+        return True, self.limit - used, reset_after
+
+
+def _now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+_snowflake_seq = itertools.count()
+
+
+def snowflake() -> int:
+    # настоящий формат: время в старших битах (bulk delete проверяет возраст по id)
+    return ((int(time.time() * 1000) - DISCORD_EPOCH_MS) << 22) | (next(_snowflake_seq) % 4096)
+
+
+async def _params(request: web.Request) -> Dict[str, Any]:
+    params: Dict[str, Any] = dict(request.query)
+    if request.can_read_body:
+        if request.content_type == "application/json":
+            params.update(await request.json())
+        else:
+            params.update(await request.post())
+    return params
+
+
+class _Base:
+    def __init__(self, settings: MockSettings, stats: Counter):
+        self.s = settings
+        self.stats = stats
+        self.rnd = random.Random()
+
+    async def _latency(self):
+        delay = self.s.latency + (self.rnd.random() * self.s.jitter if self.s.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _random_429(self) -> bool:
+        return self.s.error_429 > 0 and self.rnd.random() < self.s.error_429
+
+    def _text(self) -> str:
+        return " ".join(self.rnd.choices(_WORDS, k=self.rnd.randint(2, 16)))
+
+
+# ---------- Telegram Bot API ----------
+
+
+class MockTelegram(_Base):
+    """
+    /telegram/bot<token>/<method>. Отправка проходит через лимиты (глобальный и на чат);
+    превышение — 429 с parameters.retry_after, как у Bot API.
+    Входящие: очередь для getUpdates (long polling) или POST на webhook, если он задан.
+    """
+
+    BOT_USER = {
+        "id": BOT_USER_ID, "is_bot": True, "first_name": "Mock Bot", "username": "mock_bot",
+        "can_join_groups": True, "can_read_all_group_messages": True, "supports_inline_queries": False,
+    }
+
+    def __init__(self, settings: MockSettings, stats: Counter):
+        super().__init__(settings, stats)
+        self.global_window = FixedWindow(*settings.tg_global_limit)
+        self.chat_window = FixedWindow(*settings.tg_chat_limit)
+        self.updates: Deque[dict] = deque(maxlen=10_000)
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._new_update = asyncio.Event()
+        self.webhook_url = ""
+        self.webhook_secret = ""
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def mount(self, app: web.Application):
+        app.router.add_route("*", "/telegram/bot{token}/{method}", self.handle)
+
+    @staticmethod
+    def ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    @staticmethod
+    def error(code: int, description: str, retry_after: Optional[int] = None) -> web.Response:
+        body: Dict[str, Any] = {"ok": False, "error_code": code, "description": description}
+        if retry_after is not None:
+            body["parameters"] = {"retry_after": retry_after}
+        return web.json_response(body, status=code)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.stats[f"telegram.{method}"] += 1
+        params = await _params(request)
+
+        if method == "getUpdates":
+            return await self._get_updates(params)  # long polling: задержка — это ожидание апдейтов
+
+        await self._latency()
+        if method == "getMe":
+            return self.ok(self.BOT_USER)
+        if method in ("sendMessage", "editMessageText"):
+            return self._send(method, params)
+        if method == "deleteMessage":
+            return self.ok(True)
+        if method == "setWebhook":
+            self.webhook_url = str(params.get("url", ""))
+            self.webhook_secret = str(params.get("secret_token", "") or "")
+            return self.ok(True)
+        if method == "deleteWebhook":
+            self.webhook_url = ""
+            if str(params.get("drop_pending_updates", "")).lower() == "true":
+                self.updates.clear()
+            return self.ok(True)
+        if method == "getWebhookInfo":
+            return self.ok({"url": self.webhook_url, "has_custom_certificate": False, "pending_update_count": len(self.updates)})
+        if method in ("setMyCommands", "deleteMyCommands", "close", "logOut", "answerCallbackQuery"):
+            return self.ok(True)
+        if method == "getMyCommands":
+            return self.ok([])
+        self.stats["telegram.unknown"] += 1
+        return self.error(404, "Not Found: method not found")
+
+    def _send(self, method: str, params: Dict[str, Any]) -> web.Response:
+        try:
+            chat_id = int(params.get("chat_id"))
+        except (TypeError, ValueError):
+            return self.error(400, "Bad Request: chat_id is empty")
+        text = str(params.get("text", ""))
+        if not text:
+            return self.error(400, "Bad Request: message text is empty")
+        if len(text) > 4096:
+            return self.error(400, "Bad Request: message is too long")
+
+        ok_global, _, reset_global = self.global_window.hit("global")
+        ok_chat, _, reset_chat = self.chat_window.hit(chat_id) if chat_id < 0 else (True, 0, 0.0)
+        if not (ok_global and ok_chat) or self._random_429():
+            retry_after = max(1, int(max(reset_global if not ok_global else 0, reset_chat if not ok_chat else 0) + 0.999))
+            self.stats["telegram.429"] += 1
+            return self.error(429, f"Too Many Requests: retry after {retry_after}", retry_after)
+
+        self.stats["telegram.delivered"] += 1
+        self.stats[f"telegram.chat.{chat_id}"] += 1
+        message_id = int(params.get("message_id") or 0) or next(self._message_ids)
+        return self.ok({
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private", "title": "mock chat"},
+            "from": self.BOT_USER,
+            "text": text,
+        })
+
+    async def _get_updates(self, params: Dict[str, Any]) -> web.Response:
+        offset = int(params.get("offset") or 0)
+        limit = min(100, int(params.get("limit") or 100))
+        timeout = float(params.get("timeout") or 0)
+
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()  # offset подтверждает всё, что раньше
+        if not self.updates and timeout > 0:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        batch = list(itertools.islice(self.updates, limit))
+        self.stats["telegram.updates_delivered"] += len(batch)
+        return self.ok(batch)
+
+    def make_update(self, text: Optional[str] = None) -> dict:
+        uid = 100000 + self.rnd.randrange(self.s.users)
+        return {
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": self.s.tg_chat_id, "type": "supergroup", "title": "mock chat"},
+                "from": {"id": uid, "is_bot": False, "first_name": f"user{uid}"},
+                "text": text or self._text(),
+            },
+        }
+
+    async def generate(self):
+        """
+        Входящие сообщения с частотой tg_updates_per_sec.
+        """
+        interval = 1.0 / self.s.tg_updates_per_sec
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            update = self.make_update()
+            self.stats["telegram.updates_generated"] += 1
+            if self.webhook_url:
+                asyncio.create_task(self._push(update))
+            else:
+                self.updates.append(update)
+                self._new_update.set()
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    async def _push(self, update: dict):
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        headers = {"X-Telegram-Bot-Api-Secret-Token": self.webhook_secret} if self.webhook_secret else {}
+        try:
+            async with self._session.post(self.webhook_url, json=update, headers=headers) as r:
+                self.stats[f"telegram.webhook.{r.status}"] += 1
+        except aiohttp.ClientError:
+            self.stats["telegram.webhook.error"] += 1
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+
+
+# ---------- Discord REST + gateway ----------
+
+
+def _discord_json(data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # discord.py разбирает JSON, только если Content-Type ровно "application/json" (без charset)
+    return web.Response(
+        body=json.dumps(data, ensure_ascii=False).encode("utf-8"),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+    )
+
+
+class MockDiscord(_Base):
+    """
+    /discord/api/v10/... — эндпоинты, которые дёргают бот и discord.py при старте.
+    Каждый ответ несёт X-RateLimit-* заголовки; превышение — 429 с retry_after и Retry-After.
+    /discord/gateway — websocket: HELLO, READY, GUILD_CREATE, heartbeat ACK,
+    MESSAGE_CREATE с частотой discord_messages_per_sec.
+    """
+
+    API = "/discord/api/v10"
+
+    def __init__(self, settings: MockSettings, stats: Counter):
+        super().__init__(settings, stats)
+        self.global_window = FixedWindow(*settings.discord_global_limit)
+        self.channel_window = FixedWindow(*settings.discord_channel_limit)
+        self.bot_user = {
+            "id": str(BOT_USER_ID), "username": "mock-bot", "discriminator": "0", "global_name": None,
+            "avatar": None, "bot": True, "flags": 0, "verified": True, "mfa_enabled": False,
+        }
+        self.sockets: List[web.WebSocketResponse] = []
+
+    def mount(self, app: web.Application):
+        api = self.API
+        r = app.router
+        r.add_get(f"{api}/users/@me", self.me)
+        r.add_get(f"{api}/oauth2/applications/@me", self.application)
+        r.add_get(f"{api}/applications/@me", self.application)
+        r.add_get(f"{api}/gateway", self.gateway)
+        r.add_get(f"{api}/gateway/bot", self.gateway)
+        r.add_get(f"{api}/guilds/{{gid}}", self.get_guild)
+        r.add_get(f"{api}/channels/{{cid}}", self.get_channel)
+        r.add_post(f"{api}/channels/{{cid}}/messages", self.create_message)
+        r.add_patch(f"{api}/channels/{{cid}}/messages/{{mid}}", self.edit_message)
+        r.add_delete(f"{api}/channels/{{cid}}/messages/{{mid}}", self.no_content)
+        r.add_post(f"{api}/channels/{{cid}}/messages/bulk-delete", self.no_content)
+        r.add_patch(f"{api}/guilds/{{gid}}/members/{{uid}}", self.edit_member)
+        r.add_put(f"{api}/guilds/{{gid}}/bans/{{uid}}", self.no_content)
+        r.add_put(f"{api}/applications/{{aid}}/commands", self.put_commands)
+        r.add_put(f"{api}/applications/{{aid}}/guilds/{{gid}}/commands", self.put_commands)
+        r.add_get(f"{api}/applications/{{aid}}/commands", self.empty_list)
+        r.add_get(f"{api}/applications/{{aid}}/guilds/{{gid}}/commands", self.empty_list)
+        r.add_route("*", f"{api}/{{tail:.*}}", self.unknown)
+        r.add_get("/discord/gateway", self.websocket)
+
+    # ----- лимиты -----
+
+    def _limited(self, request: web.Request, bucket: str, key: Any = None) -> Tuple[Optional[web.Response], Dict[str, str]]:
+        """
+        Проверка лимитов: (готовый 429 или None, заголовки X-RateLimit-* для ответа).
+        """
+        ok_global, _, reset_global = self.global_window.hit("global")
+        if not ok_global:
+            self.stats["discord.429.global"] += 1
+            return self._too_many(reset_global, bucket, is_global=True), {}
+
+        window = self.channel_window if key is not None else None
+        remaining, reset_after, limit = 1, 0.0, 1
+        if window is not None:
+            ok, remaining, reset_after = window.hit(key)
+            limit = window.limit
+            if not ok:
+                self.stats["discord.429.route"] += 1
+                return self._too_many(reset_after, bucket), {}
+        if self._random_429():
+            self.stats["discord.429.injected"] += 1
+            return self._too_many(max(0.1, reset_after or 0.5), bucket), {}
+
+        headers = {
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": bucket,
+        }
+        return None, headers
+
+    def _too_many(self, retry_after: float, bucket: str, is_global: bool = False) -> web.Response:
+        retry_after = round(max(0.001, retry_after), 3)
+        headers = {
+            "Retry-After": str(max(1, int(retry_after + 0.999))),
+            "X-RateLimit-Limit": str(self.channel_window.limit),
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": f"{time.time() + retry_after:.3f}",
+            "X-RateLimit-Reset-After": f"{retry_after:.3f}",
+            "X-RateLimit-Bucket": bucket,
+            "X-RateLimit-Scope": "global" if is_global else "user",
+        }
+        if is_global:
+            headers["X-RateLimit-Global"] = "true"
+        body = {"message": "You are being rate limited.", "retry_after": retry_after, "global": is_global, "code": 0}
+        return _discord_json(body, status=429, headers=headers)
+
+    # ----- объекты -----
+
+    def _channel(self, cid: int) -> dict:
+        return {
+            "id": str(cid), "type": 0, "guild_id": str(self.s.discord_guild_id), "name": f"mock-{cid % 1000}",
+            "position": self.s.discord_channel_ids.index(cid) if cid in self.s.discord_channel_ids else 0,
+            "permission_overwrites": [], "nsfw": False, "parent_id": None, "topic": None,
+            "last_message_id": None, "rate_limit_per_user": 0, "flags": 0,
+        }
+
+    def _user(self, uid: int) -> dict:
+        return {"id": str(uid), "username": f"user{uid % 100000}", "discriminator": "0",
+                "global_name": f"User {uid % 100000}", "avatar": None, "bot": False}
+
+    def _member(self, user: dict) -> dict:
+        return {"user": user, "roles": [], "joined_at": _now_iso(), "nick": None,
+                "deaf": False, "mute": False, "flags": 0, "communication_disabled_until": None}
+
+    def _message(self, cid: int, content: str, author: dict, mid: Optional[int] = None) -> dict:
+        return {
+            "id": str(mid or snowflake()), "channel_id": str(cid), "guild_id": str(self.s.discord_guild_id),
+            "author": author, "content": content, "timestamp": _now_iso(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False, "type": 0, "flags": 0, "components": [],
+        }
+
+    def _guild(self) -> dict:
+        gid = str(self.s.discord_guild_id)
+        return {
+            "id": gid, "name": "Mock Guild", "owner_id": str(BOT_USER_ID), "member_count": self.s.users + 1,
+            "large": False, "unavailable": False, "joined_at": _now_iso(), "features": [],
+            "roles": [{"id": gid, "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                       "hoist": False, "managed": False, "mentionable": False, "flags": 0}],
+            "channels": [self._channel(cid) for cid in self.s.discord_channel_ids],
+            "members": [self._member(self.bot_user)], "threads": [], "presences": [], "voice_states": [],
+            "emojis": [], "stickers": [], "stage_instances": [], "guild_scheduled_events": [],
+            "premium_tier": 0, "system_channel_id": None, "preferred_locale": "en-US",
+        }
+
+    # ----- REST -----
+
+    async def me(self, request: web.Request) -> web.Response:
+        await self._latency()
+        return _discord_json(self.bot_user)
+
+    async def application(self, request: web.Request) -> web.Response:
+        await self._latency()
+        return _discord_json({
+            "id": str(APP_ID), "name": "mock-app", "icon": None, "description": "", "summary": "",
+            "bot_public": True, "bot_require_code_grant": False, "owner": self.bot_user, "team": None,
+            "verify_key": "00" * 32, "flags": 0, "rpc_origins": [], "tags": [],
+        })
+
+    async def gateway(self, request: web.Request) -> web.Response:
+        url = f"{'wss' if request.secure else 'ws'}://{request.host}/discord/gateway"
+        return _discord_json({
+            "url": url, "shards": 1,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def get_guild(self, request: web.Request) -> web.Response:
+        self.stats["discord.get_guild"] += 1
+        await self._latency()
+        if int(request.match_info["gid"]) != self.s.discord_guild_id:
+            return _discord_json({"message": "Unknown Guild", "code": 10004}, status=404)
+        guild = self._guild()
+        guild["approximate_member_count"] = self.s.users + 1
+        guild["approximate_presence_count"] = self.s.users // 2
+        return _discord_json(guild)
+
+    async def get_channel(self, request: web.Request) -> web.Response:
+        self.stats["discord.get_channel"] += 1
+        await self._latency()
+        cid = int(request.match_info["cid"])
+        if cid not in self.s.discord_channel_ids:
+            return _discord_json({"message": "Unknown Channel", "code": 10003}, status=404)
+        return _discord_json(self._channel(cid))
+
+    async def create_message(self, request: web.Request) -> web.Response:
+        cid = int(request.match_info["cid"])
+        self.stats["discord.create_message"] += 1
+        await self._latency()
+        limited, headers = self._limited(request, f"messages:{cid}", cid)
+        if limited is not None:
+            return limited
+        if cid not in self.s.discord_channel_ids:
+            return _discord_json({"message": "Unknown Channel", "code": 10003}, status=404, headers=headers)
+        body = await request.json() if request.content_type == "application/json" else {}
+        content = str(body.get("content") or "")
+        if len(content) > 2000:
+            return _discord_json({"message": "Invalid Form Body", "code": 50035}, status=400, headers=headers)
+        self.stats["discord.delivered"] += 1
+        self.stats[f"discord.channel.{cid}"] += 1
+        return _discord_json(self._message(cid, content, self.bot_user), headers=headers)
+
+    async def edit_message(self, request: web.Request) -> web.Response:
+        cid, mid = int(request.match_info["cid"]), int(request.match_info["mid"])
+        self.stats["discord.edit_message"] += 1
+        await self._latency()
+        limited, headers = self._limited(request, f"messages:{cid}", cid)
+        if limited is not None:
+            return limited
+        body = await request.json() if request.content_type == "application/json" else {}
+        msg = self._message(cid, str(body.get("content") or ""), self.bot_user, mid)
+        msg["edited_timestamp"] = _now_iso()
+        return _discord_json(msg, headers=headers)
+
+    async def edit_member(self, request: web.Request) -> web.Response:
+        self.stats["discord.edit_member"] += 1
+        await self._latency()
+        limited, headers = self._limited(request, "members")
+        if limited is not None:
+            return limited
+        member = self._member(self._user(int(request.match_info["uid"])))
+        body = await request.json() if request.content_type == "application/json" else {}
+        member["communication_disabled_until"] = body.get("communication_disabled_until")
+        return _discord_json(member, headers=headers)
+
+    async def put_commands(self, request: web.Request) -> web.Response:
+        self.stats["discord.put_commands"] += 1
+        await self._latency()
+        commands = await request.json()
+        for cmd in commands:
+            cmd.setdefault("id", str(snowflake()))
+            cmd.setdefault("application_id", str(APP_ID))
+            cmd.setdefault("version", str(snowflake()))
+            cmd.setdefault("type", 1)
+            cmd.setdefault("default_member_permissions", None)
+        return _discord_json(commands)
+
+    async def empty_list(self, request: web.Request) -> web.Response:
+        await self._latency()
+        return _discord_json([])
+
+    async def no_content(self, request: web.Request) -> web.Response:
+        self.stats[f"discord.{request.method} {request.match_info.route.resource.canonical[len(self.API):]}"] += 1
+        await self._latency()
+        limited, headers = self._limited(request, "misc")
+        if limited is not None:
+            return limited
+        return web.Response(status=204, headers=headers)
+
+    async def unknown(self, request: web.Request) -> web.Response:
+        self.stats["discord.unknown"] += 1
+        log.warning("[Mock] Unknown Discord route %s %s", request.method, request.path)
+        return _discord_json({"message": "404: Not Found", "code": 0}, status=404)
+
+    # ----- gateway -----
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(heartbeat=None, max_msg_size=0)
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        self.stats["discord.gateway.connections"] += 1
+        seq = itertools.count(1)
+        generator: Optional[asyncio.Task] = None
+
+        async def dispatch(event: str, data: dict):
+            await ws.send_str(json.dumps({"op": 0, "t": event, "s": next(seq), "d": data}))
+
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": 41250}}))
+        try:
+            async for frame in ws:
+                if frame.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(frame.data)
+                op = payload.get("op")
+                if op == 1:  # heartbeat
+                    await ws.send_str(json.dumps({"op": 11}))
+                elif op == 2:  # identify
+                    gw = f"{'wss' if request.secure else 'ws'}://{request.host}{request.path}"
+                    await dispatch("READY", {
+                        "v": 10, "user": self.bot_user, "session_type": "normal", "session_id": f"mock-{snowflake()}",
+                        "resume_gateway_url": gw, "guilds": [{"id": str(self.s.discord_guild_id), "unavailable": True}],
+                        "application": {"id": str(APP_ID), "flags": 0}, "private_channels": [], "relationships": [],
+                    })
+                    await dispatch("GUILD_CREATE", self._guild())
+                    if self.s.discord_messages_per_sec > 0 and generator is None:
+                        generator = asyncio.create_task(self._generate(dispatch))
+                elif op == 6:  # resume
+                    await dispatch("RESUMED", {})
+                elif op == 8:  # request guild members
+                    d = payload.get("d") or {}
+                    await dispatch("GUILD_MEMBERS_CHUNK", {
+                        "guild_id": str(d.get("guild_id", self.s.discord_guild_id)), "members": [],
+                        "chunk_index": 0, "chunk_count": 1, "nonce": d.get("nonce"),
+                    })
+        finally:
+            if generator:
+                generator.cancel()
+            self.sockets.remove(ws)
+        return ws
+
+    async def _generate(self, dispatch):
+        interval = 1.0 / self.s.discord_messages_per_sec
+        next_at = time.monotonic()
+        while True:
+            next_at += interval
+            uid = 800000000000000000 + self.rnd.randrange(self.s.users)
+            user = self._user(uid)
+            cid = self.rnd.choice(self.s.discord_channel_ids)
+            msg = self._message(cid, self._text(), user)
+            msg["member"] = {k: v for k, v in self._member(user).items() if k != "user"}
+            try:
+                await dispatch("MESSAGE_CREATE", msg)
+            except ConnectionResetError:
+                return
+            self.stats["discord.messages_generated"] += 1
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+
+    async def close(self):
+        for ws in list(self.sockets):
+            await ws.close()
+
+
+# ---------- RSS ----------
+
+
+class MockRss(_Base):
+    """
+    /rss/<name>.xml — лента, в которой каждые rss_every секунд появляется новость.
+    ETag / Last-Modified и 304 на условный GET, как у нормального сервера.
+    """
+
+    def __init__(self, settings: MockSettings, stats: Counter):
+        super().__init__(settings, stats)
+        self.started = time.time()
+
+    def mount(self, app: web.Application):
+        app.router.add_get("/rss/{name}.xml", self.feed)
+
+    async def feed(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        self.stats[f"rss.{name}"] += 1
+        await self._latency()
+        if name not in self.s.rss_feeds:
+            return web.Response(status=404)
+
+        latest = int((time.time() - self.started) / max(0.001, self.s.rss_every)) + self.s.rss_items
+        etag = f'"{name}-{latest}"'
+        published = self.started + (latest - self.s.rss_items) * self.s.rss_every
+        last_modified = datetime.datetime.fromtimestamp(published, datetime.timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
+        if request.headers.get("If-None-Match") == etag:
+            self.stats["rss.304"] += 1
+            return web.Response(status=304, headers={"ETag": etag, "Last-Modified": last_modified})
+
+        base = f"{request.scheme}://{request.host}"
+        items = []
+        for n in range(latest, max(0, latest - self.s.rss_items), -1):
+            url = f"{base}/news/{name}/{n}"
+            items.append(
+                f"<item><title>{escape(f'Mock {name} #{n}: патч и турнир')}</title><link>{url}</link>"
+                f"<guid>{url}</guid><pubDate>{last_modified}</pubDate></item>"
+            )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Mock {escape(name)}</title><link>{base}</link><description>mock feed</description>"
+            + "".join(items)
+            + "</channel></rss>"
+        )
+        return web.Response(
+            text=body, content_type="application/rss+xml", headers={"ETag": etag, "Last-Modified": last_modified}
+        )
+
+
+# ---------- сборка ----------
+
+
+def create_mock_app(settings: Optional[MockSettings] = None) -> web.Application:
+    settings = settings or MockSettings()
+    stats: Counter = Counter()
+    telegram = MockTelegram(settings, stats)
+    discord_api = MockDiscord(settings, stats)
+    rss = MockRss(settings, stats)
+
+    app = web.Application()
+    telegram.mount(app)
+    discord_api.mount(app)
+    rss.mount(app)
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(dict(sorted(stats.items())))
+
+    app.router.add_get("/mock/stats", get_stats)
+
+    async def on_startup(app: web.Application):
+        tasks = []
+        if settings.tg_updates_per_sec > 0:
+            tasks.append(asyncio.create_task(telegram.generate()))
+        app["mock_tasks"] = tasks
+
+    async def on_shutdown(app: web.Application):
+        for t in app["mock_tasks"]:
+            t.cancel()
+        await discord_api.close()
+        await telegram.close()
+
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app["mock_settings"] = settings
+    app["mock_stats"] = stats
+    return app
+
+
+def env_for(host: str, port: int, settings: MockSettings) -> Dict[str, str]:
+    """
+    Переменные окружения бота для работы через мок.
+    """
+    base = f"http://{host}:{port}"
+    return {
+        "TELEGRAM_API_URL": f"{base}/telegram",
+        "DISCORD_API_URL": f"{base}{MockDiscord.API}",
+        "DISCORD_GATEWAY_URL": f"ws://{host}:{port}/discord/gateway",
+        "NEWS_FEEDS": ",".join(f"{base}/rss/{name}.xml" for name in settings.rss_feeds),
+        "DISCORD_TOKEN": "mock.discord.token",
+        "TELEGRAM_TOKEN": "123456:mock-telegram-token",
+        "DISCORD_GUILD_ID": str(settings.discord_guild_id),
+        "BRIDGE_DISCORD_CHANNEL_ID": str(settings.discord_channel_ids[0]),
+        "BRIDGE_TELEGRAM_CHAT_ID": str(settings.tg_chat_id),
+        "TELEGRAM_ADMIN_CHAT_ID": str(settings.tg_chat_id),
+    }
+
+
+async def _serve(host: str, port: int, settings: MockSettings, stats_every: float):
+    app = create_mock_app(settings)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("[Mock] Listening on %s:%s", host, port)
+    for key, value in env_for(host, port, settings).items():
+        print(f"{key}={value}", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(stats_every)
+            log.info("[Mock] %s", json.dumps(dict(sorted(app["mock_stats"].items()))))
+    finally:
+        await runner.cleanup()
+
+
+def main(argv: Optional[List[str]] = None):
+    p = argparse.ArgumentParser(prog="python -m bot.mockapi", description="Local Telegram/Discord/RSS API stand-in")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--latency", type=float, default=0.03, help="response latency, seconds")
+    p.add_argument("--jitter", type=float, default=0.02, help="extra random latency 0..jitter, seconds")
+    p.add_argument("--error-429", type=float, default=0.0, help="fraction of sends answered with 429 regardless of limits")
+    p.add_argument("--tg-global-limit", default="30/1", help="Telegram sends per window, N/seconds")
+    p.add_argument("--tg-chat-limit", default="20/60", help="Telegram sends per group chat, N/seconds")
+    p.add_argument("--discord-channel-limit", default="5/5", help="Discord messages per channel, N/seconds")
+    p.add_argument("--discord-global-limit", default="50/1", help="Discord requests per bot, N/seconds")
+    p.add_argument("--tg-updates", type=float, default=0.0, help="incoming Telegram messages/sec")
+    p.add_argument("--discord-messages", type=float, default=0.0, help="incoming Discord messages/sec (gateway)")
+    p.add_argument("--users", type=int, default=200, help="distinct authors of incoming messages")
+    p.add_argument("--rss-feeds", default="news", help="comma-separated feed names")
+    p.add_argument("--rss-every", type=float, default=60.0, help="seconds between new items in each feed")
+    p.add_argument("--stats-every", type=float, default=10.0)
+    p.add_argument("--log-level", default="INFO")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    settings = MockSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_429=args.error_429,
+        tg_global_limit=_parse_limit(args.tg_global_limit),
+        tg_chat_limit=_parse_limit(args.tg_chat_limit),
+        discord_channel_limit=_parse_limit(args.discord_channel_limit),
+        discord_global_limit=_parse_limit(args.discord_global_limit),
+        tg_updates_per_sec=args.tg_updates,
+        discord_messages_per_sec=args.discord_messages,
+        users=args.users,
+        rss_feeds=tuple(n.strip() for n in args.rss_feeds.split(",") if n.strip()),
+        rss_every=args.rss_every,
+    )
+    try:
+        asyncio.run(_serve(args.host, args.port, settings, args.stats_every))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import discord
+
+from .metrics import REGISTRY
+from .ratelimit import DISCORD_CHANNEL_LIMIT, TokenBucket
+
+log = logging.getLogger(__name__)
+
+_ACTIONS = REGISTRY.counter(
+    "avcbot_moderation_actions_total", "Moderation actions by kind and result", ("action", "result")
+)
+
+# bulk delete принимает 2..100 сообщений не старше 14 дней
+_BULK_MAX = 100
+_BULK_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)
+
+
+class ModerationQueue:
+    """
+    Очередь модерации для рейдов: хендлеры только кладут действие и сразу выходят,
+    один воркер раз в flush_interval разбирает накопленное пачками.
+
+    - таймаут/бан: не больше одного на пользователя за dedupe_window секунд;
+    - удаление: сообщения группируются по каналам и удаляются bulk delete по 100;
+    - уведомления о таймаутах в канал — одним сообщением на канал за проход;
+    - REST-вызовы идут через token bucket (поверх лимитов discord.py), 429 ставит паузу;
+    - прогресс — в лог и (если задан) в лог-канал, не чаще progress_every секунд;
+      ошибки и report() — в лог-канал после каждого прохода.
+
+    ban_delete_seconds — сколько истории сообщений удалять при бане
+    (по умолчанию сутки, как member.ban() в discord.py).
+    """
+
+    def __init__(
+        self,
+        client: discord.Client,
+        *,
+        flush_interval: float = 1.0,
+        dedupe_window: float = 300.0,
+        rate: float = 5.0,
+        burst: float = 10.0,
+        log_channel_id: Optional[int] = None,
+        progress_every: float = 30.0,
+        ban_delete_seconds: int = 86400,
+    ):
+        self.client = client
+        self.flush_interval = flush_interval
+        self.dedupe_window = dedupe_window
+        self.bucket = TokenBucket(rate, burst)
+        self.announce_bucket = TokenBucket(*DISCORD_CHANNEL_LIMIT)
+        self.log_channel_id = log_channel_id
+        self.progress_every = progress_every
+        self.ban_delete_seconds = ban_delete_seconds
+
+        # (guild_id, user_id) -> (member, until, reason, announce_channel)
+        self._timeouts: "OrderedDict[Tuple[int, int], tuple]" = OrderedDict()
+        # (guild_id, user_id) -> (guild, user, reason, on_result)
+        self._bans: "OrderedDict[Tuple[int, int], tuple]" = OrderedDict()
+        self._reports: List[str] = []  # для лог-канала
+        self._deletes: Dict[int, Tuple[discord.abc.Messageable, Set[int]]] = {}
+        self._recent: Dict[Tuple[str, int, int], float] = {}  # (kind, guild, user) -> когда поставили
+
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_progress = 0.0
+        self._reported_total = 0
+        self.done: Dict[str, int] = {"timeout": 0, "ban": 0, "delete": 0}
+        self.failed: Dict[str, int] = {"timeout": 0, "ban": 0, "delete": 0}
+        self.deduped = 0
+
+    # ---------- постановка (из хендлеров, без await на REST) ----------
+
+    def _fresh(self, kind: str, guild_id: int, user_id: int) -> bool:
+        key = (kind, guild_id, user_id)
+        now = time.monotonic()
+        last = self._recent.get(key)
+        if last is not None and now - last < self.dedupe_window:
+            self.deduped += 1
+            return False
+        self._recent[key] = now
+        return True
+
+    def timeout(
+        self,
+        member: discord.Member,
+        seconds: int,
+        reason: str,
+        announce_in: Optional[discord.abc.Messageable] = None,
+    ) -> bool:
+        if not self._fresh("timeout", member.guild.id, member.id):
+            return False
+        until = discord.utils.utcnow() + datetime.timedelta(seconds=seconds)
+        self._timeouts[(member.guild.id, member.id)] = (member, until, reason, announce_in)
+        self._wake.set()
+        return True
+
+    def ban(
+        self,
+        guild: discord.Guild,
+        user: discord.abc.Snowflake,
+        reason: str,
+        on_result: Optional[Callable[[bool], Awaitable[None]]] = None,
+    ) -> bool:
+        """
+        on_result(ok) вызывается после попытки бана (например, followup модератору).
+        """
+        if not self._fresh("ban", guild.id, user.id):
+            return False
+        self._bans[(guild.id, user.id)] = (guild, user, reason, on_result)
+        # бан важнее таймаута — таймаут тому же пользователю уже не нужен
+        self._timeouts.pop((guild.id, user.id), None)
+        self._wake.set()
+        return True
+
+    def delete(self, message: discord.Message):
+        entry = self._deletes.get(message.channel.id)
+        if entry is None:
+            entry = self._deletes[message.channel.id] = (message.channel, set())
+        entry[1].add(message.id)
+        self._wake.set()
+
+    def report(self, text: str):
+        """
+        Сообщение для лог-канала (и лога): уйдёт после ближайшего прохода очереди.
+        """
+        self._reports.append(text)
+        self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._timeouts) + len(self._bans) + sum(len(ids) for _, ids in self._deletes.values())
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run(), name="moderation")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            # даём накопиться пачке: в рейде за секунду приходят десятки сообщений
+            await asyncio.sleep(self.flush_interval)
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("[Moderation] Flush failed")
+            self._prune_recent()
+            await self._report_progress()
+            await self._send_reports()
+
+    async def flush(self):
+        deletes, self._deletes = self._deletes, {}
+        bans, self._bans = self._bans, OrderedDict()
+        timeouts, self._timeouts = self._timeouts, OrderedDict()
+
+        # сначала убираем мусор из каналов (дёшево: до 100 сообщений за вызов), потом людей
+        for channel, ids in deletes.values():
+            await self._bulk_delete(channel, ids)
+
+        ban_results = await asyncio.gather(*(self._do_ban(g, u, r) for g, u, r, _ in bans.values()))
+        for ok, (_, user, reason, on_result) in zip(ban_results, bans.values()):
+            if not ok:
+                self.report(f"⚠️ Не удалось забанить <@{user.id}> ({reason})")
+            if on_result is not None:
+                try:
+                    await on_result(ok)
+                except Exception:
+                    log.warning("[Moderation] Ban result callback failed", exc_info=True)
+
+        announced: Dict[int, Tuple[discord.abc.Messageable, List[str]]] = {}
+        results = await asyncio.gather(*(self._do_timeout(m, until, reason) for m, until, reason, _ in timeouts.values()))
+        for ok, (member, _, reason, channel) in zip(results, timeouts.values()):
+            if not ok:
+                self.report(f"⚠️ Не удалось дать таймаут {member.mention} ({reason})")
+            elif channel is not None:
+                announced.setdefault(channel.id, (channel, []))[1].append(member.mention)
+
+        for channel, mentions in announced.values():
+            await self.announce_bucket.acquire()
+            try:
+                await channel.send(f"⛔ Таймаут за спам: {', '.join(mentions)}"[:2000])
+            except Exception:
+                log.warning("[Moderation] Can't announce in channel %s", getattr(channel, "id", "?"))
+
+    # ---------- исполнение ----------
+
+    async def _call(self, kind: str, coro_fn, *args, **kwargs) -> bool:
+        await self.bucket.acquire()
+        try:
+            await coro_fn(*args, **kwargs)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.bucket.penalize(getattr(e, "retry_after", 1.0) or 1.0)
+            if e.status != 404:  # уже удалено / пользователь ушёл — не ошибка
+                self.failed[kind] += 1
+                _ACTIONS.labels(kind, "error").inc()
+                log.warning("[Moderation] %s failed: %s", kind, e)
+                return False
+        except Exception:
+            self.failed[kind] += 1
+            _ACTIONS.labels(kind, "error").inc()
+            log.exception("[Moderation] %s failed", kind)
+            return False
+        _ACTIONS.labels(kind, "ok").inc()
+        return True
+
+    async def _do_timeout(self, member: discord.Member, until: datetime.datetime, reason: str) -> bool:
+        ok = await self._call("timeout", member.timeout, until, reason=reason)
+        if ok:
+            self.done["timeout"] += 1
+        return ok
+
+    async def _do_ban(self, guild: discord.Guild, user: discord.abc.Snowflake, reason: str) -> bool:
+        ok = await self._call("ban", guild.ban, user, reason=reason, delete_message_seconds=self.ban_delete_seconds)
+        if ok:
+            self.done["ban"] += 1
+        return ok
+
+    async def _bulk_delete(self, channel: discord.abc.Messageable, ids: Set[int]):
+        cutoff = discord.utils.utcnow() - _BULK_MAX_AGE
+        fresh = sorted(i for i in ids if discord.utils.snowflake_time(i) > cutoff)
+        old = [i for i in ids if discord.utils.snowflake_time(i) <= cutoff]
+
+        bulk = getattr(channel, "delete_messages", None)
+        if bulk is None:  # ЛС и т.п. — только по одному
+            old, fresh = old + fresh, []
+
+        for i in range(0, len(fresh), _BULK_MAX):
+            chunk = [discord.Object(id=m) for m in fresh[i:i + _BULK_MAX]]
+            if await self._call("delete", bulk, chunk, reason="Raid cleanup"):
+                self.done["delete"] += len(chunk)
+
+        for m in old:
+            if await self._call("delete", channel.get_partial_message(m).delete):
+                self.done["delete"] += 1
+
+    # ---------- служебное ----------
+
+    def _prune_recent(self):
+        now = time.monotonic()
+        stale = [k for k, ts in self._recent.items() if now - ts >= self.dedupe_window]
+        for k in stale:
+            del self._recent[k]
+
+    async def _report_progress(self):
+        # раз в progress_every, пока идёт работа, и итог — когда очередь опустела
+        total = sum(self.done.values()) + sum(self.failed.values())
+        if total == self._reported_total:
+            return
+        now = time.monotonic()
+        if self.pending() and now - self._last_progress < self.progress_every:
+            return
+        self._last_progress = now
+        self._reported_total = total
+
+        text = self.progress_text()
+        log.info("[Moderation] %s", text)
+        if self.log_channel_id:
+            ch = self.client.get_channel(self.log_channel_id)
+            if ch is not None:
+                try:
+                    await ch.send(f"🛡 {text}")
+                except Exception:
+                    log.warning("[Moderation] Can't post progress to log channel %s", self.log_channel_id)
+
+    async def _send_reports(self):
+        if not self._reports:
+            return
+        reports, self._reports = self._reports, []
+        for text in reports:
+            log.warning("[Moderation] %s", text)
+        ch = self.client.get_channel(self.log_channel_id) if self.log_channel_id else None
+        if ch is None:
+            return
+        try:
+            await ch.send("\n".join(reports)[:2000])
+        except Exception:
+            log.warning("[Moderation] Can't post report to log channel %s", self.log_channel_id)
+
+    def progress_text(self) -> str:
+        return (
+            f"timeouts {self.done['timeout']} (err {self.failed['timeout']}), "
+            f"bans {self.done['ban']} (err {self.failed['ban']}), "
+            f"deleted {self.done['delete']} (err {self.failed['delete']}), "
+            f"deduped {self.deduped}, pending {self.pending()}"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "done": dict(self.done),
+            "failed": dict(self.failed),
+            "deduped": self.deduped,
+            "bucket": self.bucket.stats(),
+        }
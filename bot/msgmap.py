@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# (платформа, id канала/чата, id сообщения)
+MsgRef = Tuple[str, int, int]
+
+
+def _key(ref: MsgRef) -> str:
+    return f"{ref[0]}:{ref[1]}:{ref[2]}"
+
+
+def _ref(key: str) -> MsgRef:
+    platform, chat, msg = key.split(":")
+    return platform, int(chat), int(msg)
+
+
+class MessageMap:
+    """
+    Индекс «исходное сообщение -> копии моста» для синхронизации правок/удалений.
+    Связь односторонняя: правка или удаление копии (например, чистка канала-адресата)
+    на оригинал не влияет.
+
+    Копия может быть склеенной пачкой из нескольких оригиналов (очередь моста склеивает
+    всплески) — для каждой связи хранится merged, сколько оригиналов в копии.
+
+    Свежие связи — в LRU на cache_size сообщений (поиск без базы). Новые связи копятся
+    и пишутся в SQLite пачкой (раз в flush_every связей и в flush()),
+    так что индекс переживает рестарт. Записи старше ttl_days удаляются при flush(),
+    поэтому ни память, ни файл не растут бесконечно.
+    """
+
+    def __init__(self, path: str, cache_size: int = 20_000, ttl_days: int = 7, flush_every: int = 200):
+        self.path = path
+        self.cache_size = max(16, cache_size)
+        self.ttl_sec = max(1, ttl_days) * 86400
+        self.flush_every = max(1, flush_every)
+
+        # оригинал -> [(копия, merged)]
+        self._cache: "OrderedDict[str, List[Tuple[str, int]]]" = OrderedDict()
+        self._pending: List[Tuple[str, str, int, int]] = []  # (src, dst, merged, ts)
+        self._last_prune = 0.0
+        self.hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS copies ("
+            "src TEXT NOT NULL, dst TEXT NOT NULL, merged INTEGER NOT NULL, ts INTEGER NOT NULL, "
+            "PRIMARY KEY (src, dst))"
+        )
+        self._db.commit()
+        self.prune()
+
+    # ---------- запись ----------
+
+    def link(self, src: MsgRef, dst: MsgRef, merged: int = 1):
+        """
+        src переслали как dst (вместе с ещё merged - 1 оригиналами, если пачка склеена).
+        """
+        a, b = _key(src), _key(dst)
+        lst = self._cache.get(a)
+        if lst is None:
+            # обычно это только что отправленное сообщение — в базе про него ничего нет
+            lst = self._cache[a] = []
+        else:
+            self._cache.move_to_end(a)
+        if all(k != b for k, _ in lst):
+            lst.append((b, merged))
+        self._evict()
+        self._pending.append((a, b, merged, int(time.time())))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def _evict(self):
+        # вытесняем старые записи без похода в базу: несохранённые связи остаются
+        # в _pending (их видит _load) и уйдут пачкой по flush_every / flush()
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # ---------- чтение ----------
+
+    def _load(self, key: str) -> List[Tuple[str, int]]:
+        out = [(b, n) for b, n in self._db.execute("SELECT dst, merged FROM copies WHERE src = ?", (key,))]
+        # ещё не записанные связи тоже считаются
+        seen = {b for b, _ in out}
+        out += [(b, n) for a, b, n, _ in self._pending if a == key and b not in seen]
+        return out
+
+    def copies(self, ref: MsgRef) -> List[Tuple[MsgRef, int]]:
+        """
+        Копии оригинала ref: [(копия, merged)]. Для копии (или чужого сообщения) — пусто.
+        """
+        key = _key(ref)
+        lst = self._cache.get(key)
+        if lst is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            lst = self._load(key)
+            if not lst:
+                return []
+            self._cache[key] = lst
+            self._evict()
+        return [(_ref(k), n) for k, n in lst]
+
+    def forget(self, ref: MsgRef):
+        """
+        Оригинал удалён — его связи больше не нужны.
+        """
+        key = _key(ref)
+        self._cache.pop(key, None)
+        self._pending = [p for p in self._pending if p[0] != key]
+        with self._db:
+            self._db.execute("DELETE FROM copies WHERE src = ?", (key,))
+
+    # ---------- обслуживание ----------
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO copies (src, dst, merged, ts) VALUES (?, ?, ?, ?)", pending)
+        if time.time() - self._last_prune > 3600:
+            self.prune()
+
+    def prune(self):
+        cutoff = int(time.time()) - self.ttl_sec
+        with self._db:
+            cur = self._db.execute("DELETE FROM copies WHERE ts < ?", (cutoff,))
+        self._last_prune = time.time()
+        if cur.rowcount:
+            log.info("[MsgMap] Pruned %s old links", cur.rowcount)
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def stats(self) -> dict:
+        return {
+            "cached": len(self._cache),
+            "pending": len(self._pending),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def open_message_map(path: Optional[str] = None) -> MessageMap:
+    return MessageMap(
+        path or os.getenv("MSGMAP_DB", "") or "data/msgmap.sqlite3",
+        cache_size=int(os.getenv("MSGMAP_CACHE", "20000") or 20000),
+        ttl_days=int(os.getenv("MSGMAP_TTL_DAYS", "7") or 7),
+    )
@@ -1,21 +1,114 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import time
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Dict, List, Optional, Tuple
 
 import aiohttp
 
+from .metrics import REGISTRY
+from .seen_store import SeenStore, item_key
+
 log = logging.getLogger(__name__)
 
+_POLL_SECONDS = REGISTRY.histogram("avcbot_news_poll_seconds", "Full NewsWatcher.poll cycle duration")
+_FETCH_SECONDS = REGISTRY.histogram("avcbot_news_fetch_seconds", "Single feed fetch + parse duration")
+_FETCH_RESULTS = REGISTRY.counter("avcbot_news_fetch_total", "Feed fetches by result", ("result",))
+_FETCH_OK = _FETCH_RESULTS.labels("ok")
+_FETCH_NOT_MODIFIED = _FETCH_RESULTS.labels("not_modified")
+_FETCH_ERROR = _FETCH_RESULTS.labels("error")
+_NEW_ITEMS = REGISTRY.counter("avcbot_news_new_items_total", "New feed items returned by poll")
+
 
 @dataclass
 class NewsPost:
     title: str
     url: str
     source: str
+    guid: str = ""
+
+
+_ATOM_NS = "{http://www.w3.org/2005/Atom}"
+_ATOM_ENTRY = _ATOM_NS + "entry"
+
+
+def _rss_item(item: ET.Element, source_url: str) -> Optional[NewsPost]:
+    title = (item.findtext("title") or "News").strip()
+    link = (item.findtext("link") or "").strip()
+    if not link:
+        return None
+    guid = (item.findtext("guid") or "").strip()
+    return NewsPost(title=title, url=link, source=source_url, guid=guid)
+
+
+def _atom_entry(entry: ET.Element, source_url: str) -> Optional[NewsPost]:
+    title = (entry.findtext(_ATOM_NS + "title") or "News").strip()
+    link_el = entry.find(_ATOM_NS + "link")
+    href = link_el.attrib.get("href") if link_el is not None else ""
+    if not href:
+        return None
+    guid = (entry.findtext(_ATOM_NS + "id") or "").strip()
+    return NewsPost(title=title, url=href, source=source_url, guid=guid)
+
+
+class _FeedParser:
+    """
+    Инкрементальный разбор RSS/Atom: кормим байтами по мере прихода,
+    получаем готовые элементы. Разобранные item/entry сразу выкидываем
+    из дерева, чтобы не держать весь документ в памяти.
+    """
+
+    def __init__(self, source_url: str):
+        self.source_url = source_url
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: List[ET.Element] = []
+
+    def feed(self, chunk: bytes) -> List[NewsPost]:
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[NewsPost]:
+        self._parser.close()
+        return self._drain()
+
+    def _drain(self) -> List[NewsPost]:
+        out: List[NewsPost] = []
+        for event, el in self._parser.read_events():
+            if event == "start":
+                self._stack.append(el)
+                continue
+            self._stack.pop()
+            if el.tag == "item":
+                post = _rss_item(el, self.source_url)
+            elif el.tag == _ATOM_ENTRY:
+                post = _atom_entry(el, self.source_url)
+            else:
+                continue
+            if post:
+                out.append(post)
+            el.clear()
+            if self._stack:
+                self._stack[-1].remove(el)
+        return out
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+@dataclass
+class _FeedState:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    failures: int = 0
+    next_try: float = 0.0  # time.monotonic(), раньше не трогаем (backoff)
 
 
 class NewsWatcher:
@@ -23,46 +116,148 @@ class NewsWatcher:
     def __init__(self) -> None:
         self.feeds: List[str] = [x.strip() for x in os.getenv("NEWS_FEEDS", "").split(",") if x.strip()]
         self.keywords: List[str] = [x.strip().lower() for x in os.getenv("NEWS_KEYWORDS", "").split(",") if x.strip()]
-        self._last_link: Optional[str] = None
+
+        # что уже постили — по всем лентам, переживает рестарт
+        self.max_items_per_feed = max(1, _env_int("NEWS_MAX_ITEMS_PER_FEED", 20))
+        self.max_feed_bytes = max(64 * 1024, _env_int("NEWS_MAX_FEED_BYTES", 2 * 1024 * 1024))
+        self.seen = SeenStore(
+            os.getenv("NEWS_SEEN_DB", "") or "data/news_seen.sqlite3",
+            ttl_days=_env_int("NEWS_SEEN_TTL_DAYS", 30),
+        )
+
+        # сколько лент качаем одновременно, таймаут на одну ленту и backoff для сломанных
+        self.concurrency = max(1, _env_int("NEWS_CONCURRENCY", 20))
+        self.feed_timeout = max(1, _env_int("NEWS_FEED_TIMEOUT", 10))
+        self.backoff_base = max(1, _env_int("NEWS_BACKOFF_BASE", 60))
+        self.backoff_max = max(self.backoff_base, _env_int("NEWS_BACKOFF_MAX", 3600))
+        self._state: Dict[str, _FeedState] = {u: _FeedState() for u in self.feeds}
 
     def enabled(self) -> bool:
         return bool(self.feeds)
 
-    async def poll(self, session: aiohttp.ClientSession) -> Optional[NewsPost]:
+    async def poll(self, session: aiohttp.ClientSession) -> List[NewsPost]:
+        """
+        Все новые элементы всех лент (старые сначала). Каждый элемент отдаётся один раз:
+        сразу помечаем его в SeenStore. Новую ленту в первый раз только запоминаем,
+        чтобы не вывалить в чат весь её архив.
+        """
         if not self.feeds:
-            return None
+            return []
 
-        for feed_url in self.feeds[:10]:
-            try:
-                async with session.get(feed_url, timeout=aiohttp.ClientTimeout(total=20)) as r:
-                    if r.status != 200:
-                        continue
-                    xml = await r.text()
+        now = time.monotonic()
+        due = [u for u in self.feeds if self._state[u].next_try <= now]
+        if not due:
+            return []
 
-                post = self._parse_first_item(xml, feed_url)
-                if not post:
-                    continue
+        sem = asyncio.Semaphore(self.concurrency)
+        with _POLL_SECONDS.time():
+            # неожиданная ошибка одной ленты не должна срывать опрос остальных
+            results = await asyncio.gather(*(self._fetch(session, u, sem) for u in due), return_exceptions=True)
 
+        posts: List[NewsPost] = []
+        for feed_url, res in zip(due, results):
+            if isinstance(res, BaseException):
+                if isinstance(res, asyncio.CancelledError):
+                    raise res
+                log.error("[News] Feed poll crashed: %s", feed_url, exc_info=res)
+                self._backoff(self._state[feed_url], feed_url, repr(res))
+                continue
+            if res is None:
+                continue  # 304 / ошибка / backoff
+            items, validators = res
+            st = self._state[feed_url]
+            st.etag, st.last_modified = validators
+
+            first_time = not self.seen.known_feed(feed_url)
+            keyed = [(item_key(feed_url, p.guid or p.url), p) for p in items]
+            fresh = [(k, p) for k, p in keyed if not self.seen.has(k)]
+            self.seen.touch(k for k, p in keyed if self.seen.has(k))
+            self.seen.add_many((k for k, _ in fresh), feed_url=feed_url)
+            if first_time:
+                continue
+
+            # в ленте новые сверху — постим в хронологическом порядке
+            for _, post in reversed(fresh):
                 if not self._match_keywords(post.title):
                     continue
+                post.title = self._format_title(post.title)
+                posts.append(post)
 
-                if self._last_link is None:
-                    self._last_link = post.url
-                    return None
+        _NEW_ITEMS.inc(len(posts))
+        return posts
 
-                if post.url == self._last_link:
-                    continue
+    async def _fetch(
+        self, session: aiohttp.ClientSession, feed_url: str, sem: asyncio.Semaphore
+    ) -> Optional[Tuple[List[NewsPost], Tuple[Optional[str], Optional[str]]]]:
+        """
+        Условный GET одной ленты + потоковый разбор. None — 304 (ничего нового) или ошибка.
+        """
+        st = self._state[feed_url]
+        headers = {}
+        if st.etag:
+            headers["If-None-Match"] = st.etag
+        if st.last_modified:
+            headers["If-Modified-Since"] = st.last_modified
+
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                async with session.get(
+                    feed_url, headers=headers, timeout=aiohttp.ClientTimeout(total=self.feed_timeout)
+                ) as r:
+                    if r.status == 304:
+                        st.failures = 0
+                        _FETCH_NOT_MODIFIED.inc()
+                        return None
+                    if r.status != 200:
+                        self._backoff(st, feed_url, f"HTTP {r.status}")
+                        return None
+                    validators = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+                    items = await self._read_items(r, feed_url)
+                _FETCH_SECONDS.observe(time.perf_counter() - t0)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self._backoff(st, feed_url, repr(e))
+                return None
+            except ET.ParseError as e:
+                self._backoff(st, feed_url, f"bad XML: {e}")
+                return None
 
-                self._last_link = post.url
+        st.failures = 0
+        _FETCH_OK.inc()
+        return items, validators
 
-                post.title = self._format_title(post.title)
+    async def _read_items(self, r: aiohttp.ClientResponse, feed_url: str) -> List[NewsPost]:
+        """
+        Читаем ленту кусками и разбираем по ходу. Останавливаемся, как только дошли
+        до уже виденного элемента (дальше в ленте только старое), набрали
+        max_items_per_feed или прочитали max_feed_bytes.
+        """
+        parser = _FeedParser(feed_url)
+        stop_at_seen = self.seen.known_feed(feed_url)
+        items: List[NewsPost] = []
+        size = 0
 
-                return post
+        async for chunk in r.content.iter_chunked(16 * 1024):
+            size += len(chunk)
+            for post in parser.feed(chunk):
+                items.append(post)
+                if stop_at_seen and self.seen.has(item_key(feed_url, post.guid or post.url)):
+                    return items
+                if len(items) >= self.max_items_per_feed:
+                    return items
+            if size >= self.max_feed_bytes:
+                log.warning("[News] Feed is larger than %s bytes, read only the head: %s", self.max_feed_bytes, feed_url)
+                return items
 
-            except Exception:
-                log.exception("[News] Failed feed: %s", feed_url)
+        items.extend(parser.close())
+        return items[: self.max_items_per_feed]
 
-        return None
+    def _backoff(self, st: _FeedState, feed_url: str, reason: str):
+        _FETCH_ERROR.inc()
+        st.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (st.failures - 1))
+        st.next_try = time.monotonic() + delay
+        log.warning("[News] Feed failed (%s), retry in %ss: %s", reason, delay, feed_url)
 
     def _match_keywords(self, title: str) -> bool:
         if not self.keywords:
@@ -91,28 +286,3 @@ class NewsWatcher:
             emoji = "📢"
 
         return f"{emoji} {title}"
-
-    def _parse_first_item(self, xml: str, source_url: str) -> Optional[NewsPost]:
-        root = ET.fromstring(xml)
-
-        channel = root.find("channel")
-        if channel is not None:
-            item = channel.find("item")
-            if item is None:
-                return None
-            title = (item.findtext("title") or "News").strip()
-            link = (item.findtext("link") or "").strip()
-            if not link:
-                return None
-            return NewsPost(title=title, url=link, source=source_url)
-
-        ns = {"atom": "http://www.w3.org/2005/Atom"}
-        entry = root.find("atom:entry", ns)
-        if entry is None:
-            return None
-        title = (entry.findtext("atom:title", default="News", namespaces=ns) or "News").strip()
-        link_el = entry.find("atom:link", ns)
-        href = link_el.attrib.get("href") if link_el is not None else ""
-        if not href:
-            return None
-        return NewsPost(title=title, url=href, source=source_url)
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from .metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+_PENDING = REGISTRY.gauge("avcbot_outbox_pending", "Bridge messages written to the outbox and not yet delivered")
+_COMMITS = REGISTRY.counter("avcbot_outbox_commits_total", "Outbox group commits (one fsync each)")
+_COMMIT_SECONDS = REGISTRY.histogram("avcbot_outbox_commit_seconds", "Outbox write+fsync duration")
+
+
+class OutboxRecord:
+    """
+    Сообщение моста, которое ещё не доставлено: куда (очередь + адресат), что и откуда (ref).
+    """
+
+    __slots__ = ("key", "queue", "dest", "text", "ref", "attempts")
+
+    def __init__(self, key: str, queue: str, dest: int, text: str, ref: Optional[tuple] = None, attempts: int = 0):
+        self.key = key
+        self.queue = queue
+        self.dest = dest
+        self.text = text
+        self.ref = ref
+        self.attempts = attempts
+
+    def to_json(self) -> dict:
+        return {
+            "op": "put", "id": self.key, "q": self.queue, "d": self.dest,
+            "t": self.text, "r": list(self.ref) if self.ref else None, "n": self.attempts,
+        }
+
+
+def idempotency_key(queue: str, dest: int, ref: Optional[tuple]) -> str:
+    """
+    Одно исходное сообщение -> один адресат = один ключ: повторный put того же
+    (переигровка, повторное событие шлюза) не создаёт второй копии.
+    Без ref сообщение уникально само по себе.
+    """
+    if ref:
+        return f"{queue}:{dest}:{ref[0]}:{ref[1]}:{ref[2]}"
+    return f"{queue}:{dest}:{uuid.uuid4().hex}"
+
+
+class Outbox:
+    """
+    Журнал исходящих сообщений моста (write-ahead log): put пишется на диск до отправки,
+    ack — после доставки. После рестарта всё, что без ack, отправляется заново
+    (at-least-once: копия может прийти дважды, но не потеряется).
+
+    Формат — JSON-строки, только дозапись. Group commit: записи копятся
+    commit_interval секунд и пишутся одним write + fsync в потоке, так что
+    всплеск из сотни сообщений стоит одного fsync, а не сотни.
+    Когда файл больше compact_bytes, он переписывается одними недоставленными записями.
+
+    Сообщение, которое не удалось отправить max_attempts раз (в том числе через рестарты),
+    выбрасывается с предупреждением в логе — чтобы битое сообщение не крутилось вечно.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        commit_interval: float = 0.02,
+        compact_bytes: int = 4 * 1024 * 1024,
+        max_attempts: int = 3,
+        remember_keys: int = 10_000,
+    ):
+        self.path = path
+        self.commit_interval = max(0.0, commit_interval)
+        self.compact_bytes = max(64 * 1024, compact_bytes)
+        self.max_attempts = max(1, max_attempts)
+        self.remember_keys = remember_keys
+
+        self._pending: "OrderedDict[str, OutboxRecord]" = OrderedDict()
+        self._done: "OrderedDict[str, None]" = OrderedDict()  # недавно доставленные ключи
+        self._buf: List[bytes] = []
+        self._waiters: List[asyncio.Future] = []
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._size = 0
+
+        self.commits = 0
+        self.records = 0
+        self.duplicates = 0
+        self.given_up = 0
+        self.compactions = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._load()
+        self._file = open(path, "ab")
+        _PENDING.set_function(lambda: len(self._pending))
+
+    # ---------- восстановление ----------
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+
+        for i, raw in enumerate(lines):
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                # оборванная последняя строка (упали посреди write) — норма, остальное — нет
+                if i != len(lines) - 1:
+                    log.warning("[Outbox] Skipping corrupt line %s in %s", i + 1, self.path)
+                continue
+            op, key = rec.get("op"), rec.get("id")
+            if op == "put":
+                self._pending[key] = OutboxRecord(
+                    key, rec["q"], int(rec["d"]), rec["t"], tuple(rec["r"]) if rec.get("r") else None, rec.get("n", 0)
+                )
+            elif op == "ack":
+                self._pending.pop(key, None)
+            elif op == "fail" and key in self._pending:
+                self._pending[key].attempts += 1
+
+        for key in [k for k, r in self._pending.items() if r.attempts >= self.max_attempts]:
+            rec = self._pending.pop(key)
+            self.given_up += 1
+            log.warning("[Outbox] Giving up on %s after %s attempts", key, rec.attempts, extra={"body": rec.text})
+
+        # сразу сжимаем: на диске остаётся только то, что надо переиграть
+        self._rewrite(list(self._pending.values()))
+        if self._pending:
+            log.info("[Outbox] %s undelivered messages to replay", len(self._pending))
+
+    def pending(self) -> List[OutboxRecord]:
+        """
+        Недоставленные сообщения в порядке записи (для переигровки на старте).
+        """
+        return list(self._pending.values())
+
+    # ---------- запись ----------
+
+    def _append(self, rec: dict):
+        self._buf.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+        self.records += 1
+        self._dirty.set()
+
+    async def put(self, queue: str, dest: int, text: str, ref: Optional[tuple] = None) -> Optional[str]:
+        """
+        Записать сообщение и дождаться fsync его пачки. Возвращает ключ для ack/fail,
+        None — такое сообщение уже в журнале или недавно доставлено (дубликат).
+        Если запись не удалась — исключение, и сообщения в журнале нет.
+        """
+        if self._closing:
+            raise RuntimeError("outbox is closed")
+        key = idempotency_key(queue, dest, ref)
+        if key in self._pending or key in self._done:
+            self.duplicates += 1
+            return None
+        rec = OutboxRecord(key, queue, dest, text, ref)
+        self._pending[key] = rec
+        self._append(rec.to_json())
+
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        self._ensure_task()
+        try:
+            await fut
+        except Exception:
+            # пачка не записалась: вызывающий отправит сообщение в обход журнала (без ключа),
+            # ack не придёт — иначе запись переигралась бы после рестарта второй копией
+            self._pending.pop(key, None)
+            raise
+        return key
+
+    def ack(self, keys: Iterable[str]):
+        """
+        Доставлено. На диск попадёт со следующим коммитом, ждать не нужно:
+        потерянный ack означает лишь повторную отправку после рестарта.
+        """
+        for key in keys:
+            if self._pending.pop(key, None) is not None:
+                self._append({"op": "ack", "id": key})
+            self._done[key] = None
+            if len(self._done) > self.remember_keys:
+                self._done.popitem(last=False)
+        self._ensure_task()
+
+    def fail(self, keys: Iterable[str]):
+        """
+        Отправка не удалась: сообщение остаётся в журнале до следующего старта,
+        пока попыток меньше max_attempts.
+        """
+        for key in keys:
+            rec = self._pending.get(key)
+            if rec is None:
+                continue
+            rec.attempts += 1
+            if rec.attempts >= self.max_attempts:
+                self.ack([key])
+                self.given_up += 1
+                log.warning("[Outbox] Giving up on %s after %s attempts", key, rec.attempts, extra={"body": rec.text})
+            else:
+                self._append({"op": "fail", "id": key})
+        self._ensure_task()
+
+    # ---------- group commit ----------
+
+    def _ensure_task(self):
+        if self._closing:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._committer(), name="outbox")
+
+    async def _committer(self):
+        while not self._closing:
+            await self._dirty.wait()
+            if self._closing:
+                break
+            # собираем пачку: все put/ack за commit_interval уходят одним fsync
+            if self.commit_interval:
+                await asyncio.sleep(self.commit_interval)
+            await self._commit()
+
+    async def _commit(self):
+        self._dirty.clear()
+        buf, self._buf = self._buf, []
+        waiters, self._waiters = self._waiters, []
+        if not buf and not waiters:
+            return
+
+        data = b"".join(buf)
+        snapshot = None
+        if self._size + len(data) > self.compact_bytes:
+            # _pending уже учитывает всё из buf — вместо дозаписи переписываем файл целиком
+            snapshot = list(self._pending.values())
+
+        t0 = time.monotonic()
+        try:
+            await asyncio.to_thread(self._write, data, snapshot)
+        except Exception as e:
+            log.exception("[Outbox] Commit failed")
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        _COMMIT_SECONDS.observe(time.monotonic() - t0)
+        _COMMITS.inc()
+        self.commits += 1
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    def _write(self, data: bytes, snapshot: Optional[List[OutboxRecord]]):
+        # вызывается в потоке, но всегда по одному (коммиты идут последовательно)
+        if snapshot is not None:
+            self._file.close()
+            self._rewrite(snapshot)
+            self._file = open(self.path, "ab")
+            self.compactions += 1
+            return
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._size += len(data)
+
+    def _rewrite(self, records: List[OutboxRecord]):
+        tmp = self.path + ".tmp"
+        data = b"".join(
+            json.dumps(r.to_json(), ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n" for r in records
+        )
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._size = len(data)
+
+    async def close(self):
+        """
+        Дописать накопленное (ack последних отправок) и закрыть файл.
+        Коммит, который уже пишется в потоке, не прерываем — дожидаемся его.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        self._dirty.set()  # разбудить committer, чтобы он вышел из цикла
+        if self._task:
+            try:
+                await self._task
+            except Exception:
+                log.exception("[Outbox] Committer failed")
+            self._task = None
+        try:
+            await self._commit()
+        finally:
+            self._file.close()
+            # никто не должен остаться ждать fsync, которого уже не будет
+            waiters, self._waiters = self._waiters, []
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_exception(RuntimeError("outbox is closed"))
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "commits": self.commits,
+            "records": self.records,
+            "duplicates": self.duplicates,
+            "given_up": self.given_up,
+            "compactions": self.compactions,
+            "bytes": self._size,
+        }
+
+
+def open_outbox(path: Optional[str] = None) -> Optional[Outbox]:
+    """
+    OUTBOX=0 — выключить; OUTBOX_PATH, OUTBOX_COMMIT_MS, OUTBOX_COMPACT_MB, OUTBOX_MAX_ATTEMPTS.
+    """
+    if os.getenv("OUTBOX", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    return Outbox(
+        path or os.getenv("OUTBOX_PATH", "") or "data/outbox.log",
+        commit_interval=float(os.getenv("OUTBOX_COMMIT_MS", "20") or 20) / 1000,
+        compact_bytes=int(float(os.getenv("OUTBOX_COMPACT_MB", "4") or 4) * 1024 * 1024),
+        max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3") or 3),
+    )
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+# Документированные лимиты платформ: (сообщений в секунду, размер пачки)
+# Telegram: в одну группу не больше 20 сообщений в минуту и ~1 сообщения в секунду.
+# Discord: 5 сообщений за 5 секунд в один канал.
+TELEGRAM_CHAT_LIMIT = (20 / 60, 3)
+DISCORD_CHANNEL_LIMIT = (5 / 5, 5)
+
+
+class TokenBucket:
+    """
+    Простой token bucket для исходящих сообщений.
+    rate — сколько токенов добавляется в секунду, capacity — максимальная пачка.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(0.001, float(rate))
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+        self.waited_sec = 0.0
+        self.penalties = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    def try_acquire(self, n: float = 1.0) -> bool:
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self.tokens >= n:
+            self.tokens -= n
+            return True
+        return False
+
+    async def acquire(self, n: float = 1.0):
+        """
+        Ждём, пока не наберётся n токенов (и не закончится пауза после 429).
+        Lock — чтобы несколько воркеров не будили друг друга по кругу.
+        """
+        async with self._lock:
+            t0 = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= n:
+                    self.tokens -= n
+                    self.waited_sec += time.monotonic() - t0
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+    def penalize(self, retry_after: float):
+        """
+        Платформа всё-таки ответила 429: замолкаем на retry_after и обнуляем пачку.
+        """
+        self.penalties += 1
+        self.tokens = 0.0
+        self._updated = time.monotonic()
+        self._paused_until = max(self._paused_until, self._updated + max(0.0, float(retry_after)))
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "waited_sec": round(self.waited_sec, 3),
+            "penalties": self.penalties,
+        }
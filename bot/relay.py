@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from .metrics import REGISTRY
+from .outbox import Outbox, OutboxRecord
+from .ratelimit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+# что делать, когда очередь заполнена
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "block")
+
+
+_DEPTH = REGISTRY.gauge("avcbot_relay_depth", "Messages waiting in the relay queue", ("queue",))
+_IN_FLIGHT = REGISTRY.gauge("avcbot_relay_in_flight", "Relay sends in progress", ("queue",))
+_EVENTS = REGISTRY.counter("avcbot_relay_messages_total", "Relay queue events", ("queue", "event"))
+_LATENCY = REGISTRY.histogram(
+    "avcbot_relay_latency_seconds", "Enqueue-to-delivered latency of the relay queue", ("queue",)
+)
+
+# сколько раз переотправляем сообщение после 429 / RetryAfter
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class _Item:
+    __slots__ = ("text", "enqueued_at", "retries", "refs", "keys")
+
+    def __init__(self, text: str, ref: Optional[tuple] = None, key: Optional[str] = None):
+        self.text = text
+        self.enqueued_at = time.monotonic()
+        self.retries = 0
+        self.refs: List[tuple] = [ref] if ref else []  # исходные сообщения всех склеенных (для связи с копией)
+        self.keys: List[str] = [key] if key else []  # ключи outbox всех склеенных сообщений
+
+    def absorb(self, text: str, refs: List[tuple], keys: List[str]):
+        self.text = f"{self.text}\n{text}"
+        self.refs += refs
+        self.keys += keys
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """
+    telegram.error.RetryAfter и похожие ошибки несут retry_after (секунды или timedelta).
+    """
+    ra = getattr(exc, "retry_after", None)
+    if ra is None:
+        return None
+    if hasattr(ra, "total_seconds"):
+        return ra.total_seconds()
+    try:
+        return float(ra)
+    except (TypeError, ValueError):
+        return None
+
+
+class RelayQueue:
+    """
+    Ограниченная очередь исходящих сообщений моста для одного направления
+    (TG -> Discord или Discord -> TG) + свои воркеры-отправители.
+
+    Входящий хендлер только кладёт текст в очередь и сразу возвращается,
+    поэтому медленный / лимитированный API не тормозит приём сообщений.
+
+    overflow:
+    - drop_oldest: выкидываем самое старое сообщение из очереди
+    - coalesce: приклеиваем текст к последнему сообщению в очереди (если влезает в max_len),
+      иначе как drop_oldest
+    - block: put() ждёт, пока воркер освободит место
+
+    Перед отправкой воркер ждёт токен из bucket (лимиты платформы) и склеивает
+    всё, что накопилось подряд в очереди, в одно сообщение до max_len.
+    coalesce_window — сколько подождать после первого сообщения пачки,
+    чтобы всплеск успел собраться в одно сообщение.
+
+    ref — ссылка на оригинал для синхронизации правок. Склеенная пачка помнит refs всех
+    своих сообщений: send() возвращает id копии, on_sent(refs, result) связывает их с ней.
+    merge_refs=False — сообщения с ref ни с чем не склеиваются (и не ждут coalesce_window):
+    у каждого своя копия, которую можно править/удалять. Цена — больше отправок во всплеске
+    и при overflow=coalesce такие сообщения выкидываются, как при drop_oldest.
+
+    key — ключ записи в outbox: on_settled(keys, ok) сообщает, чем кончилось
+    (ok=True — доставлено или выброшено при переполнении, False — ошибка отправки).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[str], Awaitable[None]],
+        *,
+        maxsize: int = 500,
+        overflow: str = "drop_oldest",
+        workers: int = 1,
+        max_len: int = 4000,
+        bucket: Optional[TokenBucket] = None,
+        coalesce_window: float = 0.0,
+        merge_refs: bool = True,
+        on_sent: Optional[Callable[[List[tuple], object], None]] = None,
+        on_settled: Optional[Callable[[List[str], bool], None]] = None,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            log.warning("[Relay] %s: unknown overflow policy %r, using drop_oldest", name, overflow)
+            overflow = "drop_oldest"
+
+        self.name = name
+        self.send = send
+        self.maxsize = max(1, int(maxsize))
+        self.overflow = overflow
+        self.workers = max(1, int(workers))
+        self.max_len = max_len
+        self.bucket = bucket
+        self.coalesce_window = max(0.0, float(coalesce_window))
+        self.merge_refs = merge_refs
+        self.on_sent = on_sent
+        self.on_settled = on_settled
+
+        self._items: Deque[_Item] = deque()
+        self._cond = asyncio.Condition()
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+
+        # метрики backpressure
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.rate_limited = 0
+        self.blocked_sec = 0.0
+        self.in_flight = 0
+        self.high_watermark = 0
+        self.last_latency_ms: Optional[float] = None
+        self.max_latency_ms = 0.0
+
+        # /metrics: глубину считаем при скрейпе, события — дочерние счётчики заранее
+        _DEPTH.labels(name).set_function(self.depth)
+        _IN_FLIGHT.labels(name).set_function(lambda: self.in_flight)
+        self._m_sent = _EVENTS.labels(name, "sent")
+        self._m_failed = _EVENTS.labels(name, "failed")
+        self._m_dropped = _EVENTS.labels(name, "dropped")
+        self._m_coalesced = _EVENTS.labels(name, "coalesced")
+        self._m_rate_limited = _EVENTS.labels(name, "rate_limited")
+        self._m_latency = _LATENCY.labels(name)
+
+    # ---------- lifecycle ----------
+
+    async def start(self):
+        """
+        Запустить воркеров; повторный вызов ничего не делает.
+        """
+        if self._tasks:
+            return
+        self._closed = False
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"relay:{self.name}:{i}"))
+        log.info(
+            "[Relay] %s started (maxsize=%s, overflow=%s, workers=%s)",
+            self.name, self.maxsize, self.overflow, self.workers,
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Закрываем очередь и даём воркерам дослать то, что уже лежит внутри.
+        """
+        if not self._tasks:
+            return
+        async with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for t in pending:
+            t.cancel()
+        self._tasks = []
+        if self._items:
+            log.warning("[Relay] %s stopped with %s undelivered messages", self.name, len(self._items))
+
+    # ---------- producer side ----------
+
+    def depth(self) -> int:
+        return len(self._items)
+
+    async def put(self, text: str, ref: Optional[tuple] = None, key: Optional[str] = None) -> bool:
+        """
+        Кладём сообщение в очередь. Возвращает False, если очередь уже закрыта.
+        ref — id исходного сообщения, если копию нужно запомнить (правки/удаления).
+        key — ключ outbox (сообщение уже записано в журнал).
+        """
+        if self._closed:
+            return False
+
+        self.enqueued += 1
+        async with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.overflow == "block":
+                    t0 = time.monotonic()
+                    await self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+                    self.blocked_sec += time.monotonic() - t0
+                    if self._closed:
+                        return False
+                elif self.overflow == "coalesce" and self._coalesce_tail(text, ref, key):
+                    self.coalesced += 1
+                    self._m_coalesced.inc()
+                    return True
+                else:
+                    self._settle(self._items.popleft().keys, True)  # выброшено намеренно — не переигрываем
+                    self.dropped += 1
+                    self._m_dropped.inc()
+                    if self.dropped == 1 or self.dropped % 100 == 0:
+                        log.warning("[Relay] %s overflow: dropped %s messages so far", self.name, self.dropped)
+
+            self._items.append(_Item(text, ref, key))
+            if len(self._items) > self.high_watermark:
+                self.high_watermark = len(self._items)
+            self._cond.notify_all()
+        return True
+
+    def _coalesce_tail(self, text: str, ref: Optional[tuple], key: Optional[str]) -> bool:
+        if not self._items:
+            return False
+        tail = self._items[-1]
+        if len(tail.text) + 1 + len(text) > self.max_len:
+            return False
+        if not self.merge_refs and (ref or tail.refs):
+            return False
+        tail.absorb(text, [ref] if ref else [], [key] if key else [])
+        return True
+
+    # ---------- consumer side ----------
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: self._items or self._closed)
+                if not self._items:
+                    return  # закрыты и всё дослали
+                first_at = self._items[0].enqueued_at
+                wait = self.merge_refs or not self._items[0].refs
+
+            # даём всплеску собраться
+            if wait and self.coalesce_window and not self._closed:
+                delay = first_at + self.coalesce_window - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            if self.bucket:
+                await self.bucket.acquire()
+
+            async with self._cond:
+                item = self._take_batch()
+                self._cond.notify_all()  # разбудим заблокированные put()
+            if item is None:
+                continue  # пачку забрал другой воркер
+
+            await self._deliver(item)
+
+    def _take_batch(self) -> Optional[_Item]:
+        """
+        Склеиваем подряд идущие сообщения, пока влезают в max_len (с ref — только при merge_refs).
+        Вызывать под self._cond.
+        """
+        if not self._items:
+            return None
+        item = self._items.popleft()
+        merged = 0
+        while self._items:
+            nxt = self._items[0]
+            if len(item.text) + 1 + len(nxt.text) > self.max_len:
+                break
+            if not self.merge_refs and (item.refs or nxt.refs):
+                break
+            self._items.popleft()
+            item.absorb(nxt.text, nxt.refs, nxt.keys)
+            merged += 1
+        if merged:
+            self.coalesced += merged
+            self._m_coalesced.inc(merged)
+            self.batches += 1
+        return item
+
+    async def _deliver(self, item: _Item):
+        self.in_flight += 1
+        try:
+            result = await self.send(item.text[: self.max_len])
+            self.sent += 1
+            self._m_sent.inc()
+            self._settle(item.keys, True)
+            if item.refs and self.on_sent is not None:
+                try:
+                    self.on_sent(item.refs, result)
+                except Exception:
+                    log.exception("[Relay] %s on_sent failed", self.name)
+        except Exception as e:
+            retry_after = _retry_after(e)
+            if retry_after is not None and item.retries < MAX_RATE_LIMIT_RETRIES:
+                # 429: притормозим bucket и вернём пачку в начало очереди
+                self.rate_limited += 1
+                self._m_rate_limited.inc()
+                item.retries += 1
+                if self.bucket:
+                    self.bucket.penalize(retry_after)
+                else:
+                    await asyncio.sleep(retry_after)
+                async with self._cond:
+                    self._items.appendleft(item)
+                    self._cond.notify_all()
+                log.warning("[Relay] %s rate limited, retry in %.1fs", self.name, retry_after)
+                return
+            self.failed += 1
+            self._m_failed.inc()
+            self._settle(item.keys, False)
+            log.exception("[Relay] %s send failed", self.name)
+        finally:
+            self.in_flight -= 1
+        latency = time.monotonic() - item.enqueued_at
+        self._m_latency.observe(latency)
+        latency_ms = latency * 1000
+        self.last_latency_ms = latency_ms
+        if latency_ms > self.max_latency_ms:
+            self.max_latency_ms = latency_ms
+
+    def _settle(self, keys: List[str], ok: bool):
+        if keys and self.on_settled is not None:
+            try:
+                self.on_settled(keys, ok)
+            except Exception:
+                log.exception("[Relay] %s on_settled failed", self.name)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": len(self._items),
+            "maxsize": self.maxsize,
+            "high_watermark": self.high_watermark,
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "batches": self.batches,
+            "rate_limited": self.rate_limited,
+            "blocked_sec": round(self.blocked_sec, 3),
+            "last_latency_ms": None if self.last_latency_ms is None else round(self.last_latency_ms, 1),
+            "max_latency_ms": round(self.max_latency_ms, 1),
+            "bucket": self.bucket.stats() if self.bucket else None,
+        }
+
+
+class RelayPool:
+    """
+    Очереди моста по адресатам: одна RelayQueue (со своим token bucket) на канал/чат,
+    создаётся при первом сообщении туда. Лимиты платформ — на канал/чат, поэтому
+    медленный или залимиченный адресат не задерживает остальных.
+
+    send: async (dest_id, text) -> id отправленного сообщения (или None)
+    on_sent: (refs, dest_id, result) — копия сообщений refs (одно или склеенная пачка) доставлена как result
+    outbox: если задан, put() сначала пишет сообщение в журнал (durable), а доставка
+    подтверждается ack — после рестарта недоставленное переигрывается через replay()
+    """
+
+    def __init__(
+        self,
+        name: str,
+        send: Callable[[int, str], Awaitable[object]],
+        *,
+        bucket_factory: Optional[Callable[[], TokenBucket]] = None,
+        on_sent: Optional[Callable[[List[tuple], int, object], None]] = None,
+        outbox: Optional[Outbox] = None,
+        **queue_kwargs,
+    ):
+        self.name = name
+        self.send = send
+        self.bucket_factory = bucket_factory
+        self.on_sent = on_sent
+        self.outbox = outbox
+        self.queue_kwargs = queue_kwargs
+        self.queues: Dict[int, RelayQueue] = {}
+        self._started = False
+
+    def queue(self, dest: int) -> RelayQueue:
+        q = self.queues.get(dest)
+        if q is None:
+            async def send(text: str, _dest: int = dest):
+                return await self.send(_dest, text)
+
+            def link(refs: List[tuple], result: object, _dest: int = dest):
+                self.on_sent(refs, _dest, result)
+
+            q = RelayQueue(
+                f"{self.name}:{dest}",
+                send,
+                bucket=self.bucket_factory() if self.bucket_factory else None,
+                on_sent=link if self.on_sent is not None else None,
+                on_settled=self._settled if self.outbox else None,
+                **self.queue_kwargs,
+            )
+            self.queues[dest] = q
+        return q
+
+    async def put(self, dest: int, text: str, ref: Optional[tuple] = None) -> bool:
+        key = None
+        if self.outbox is not None:
+            try:
+                key = await self.outbox.put(self.name, dest, text, ref)
+            except Exception:
+                # диск подвёл — всё равно отправляем, просто без гарантии после рестарта
+                log.warning("[Relay] %s: outbox write failed, sending without durability", self.name)
+            else:
+                if key is None:
+                    return True  # дубликат: это сообщение уже в пути
+        return await self._enqueue(dest, text, ref, key)
+
+    async def replay(self, records: Iterable[OutboxRecord]) -> int:
+        """
+        Переиграть недоставленное из outbox (записи этого пула), без повторной записи в журнал.
+        """
+        n = 0
+        for rec in records:
+            if rec.queue == self.name:
+                await self._enqueue(rec.dest, rec.text, rec.ref, rec.key)
+                n += 1
+        if n:
+            log.info("[Relay] %s: replayed %s messages from outbox", self.name, n)
+        return n
+
+    async def _enqueue(self, dest: int, text: str, ref: Optional[tuple], key: Optional[str]) -> bool:
+        q = self.queue(dest)
+        if self._started:
+            await q.start()  # no-op, если воркеры уже запущены
+        return await q.put(text, ref, key)
+
+    def _settled(self, keys: List[str], ok: bool):
+        if ok:
+            self.outbox.ack(keys)
+        else:
+            self.outbox.fail(keys)
+
+    async def start(self):
+        self._started = True
+        for q in list(self.queues.values()):
+            await q.start()
+
+    async def stop(self, timeout: float = 10.0):
+        self._started = False
+        await asyncio.gather(*(q.stop(timeout) for q in self.queues.values()))
+
+    def depth(self) -> int:
+        return sum(q.depth() for q in self.queues.values())
+
+    def stats(self) -> dict:
+        return {str(dest): q.stats() for dest, q in self.queues.items()}
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+DISCORD = "discord"
+TELEGRAM = "telegram"
+PLATFORMS = (DISCORD, TELEGRAM)
+
+# src_id = ANY — маршрут для любого чата платформы (старое поведение без BRIDGE_TELEGRAM_CHAT_ID)
+ANY = 0
+
+
+@dataclass(frozen=True)
+class Route:
+    src_platform: str
+    src_id: int
+    dst_platform: str
+    dst_id: int
+    name: str = ""
+
+
+class RoutingTable:
+    """
+    Маршруты моста, проиндексированные по источнику: (платформа, id канала/чата) -> кортеж Route.
+    Поиск адресатов для входящего сообщения — один (максимум два, с ANY) dict.get,
+    сколько бы маршрутов ни было.
+    """
+
+    def __init__(self, routes: Iterable[Route] = ()):
+        index: Dict[Tuple[str, int], List[Route]] = {}
+        seen = set()
+        for r in routes:
+            key = (r.src_platform, r.src_id, r.dst_platform, r.dst_id)
+            if key in seen or (r.src_platform, r.src_id) == (r.dst_platform, r.dst_id):
+                continue  # дубликаты и петли «сам в себя» не нужны
+            seen.add(key)
+            index.setdefault((r.src_platform, r.src_id), []).append(r)
+        self._by_source: Dict[Tuple[str, int], Tuple[Route, ...]] = {k: tuple(v) for k, v in index.items()}
+        self._targets: Dict[str, FrozenSet[int]] = {
+            p: frozenset(r.dst_id for rs in self._by_source.values() for r in rs if r.dst_platform == p)
+            for p in PLATFORMS
+        }
+        self._source_platforms: FrozenSet[str] = frozenset(p for p, _ in self._by_source)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._by_source.values())
+
+    def destinations(self, platform: str, src_id: int) -> Tuple[Route, ...]:
+        routes = self._by_source.get((platform, src_id))
+        if routes is None:
+            routes = self._by_source.get((platform, ANY), ())
+        return routes
+
+    def is_source(self, platform: str, src_id: int) -> bool:
+        return (platform, src_id) in self._by_source or (platform, ANY) in self._by_source
+
+    def has_sources(self, platform: str) -> bool:
+        """
+        Есть ли вообще маршруты из этой платформы.
+        """
+        return platform in self._source_platforms
+
+    def targets(self, platform: str) -> FrozenSet[int]:
+        return self._targets.get(platform, frozenset())
+
+    def describe(self) -> str:
+        return ", ".join(
+            f"{r.src_platform}:{r.src_id or '*'}->{r.dst_platform}:{r.dst_id}"
+            for rs in self._by_source.values() for r in rs
+        )
+
+
+# ---------- загрузка ----------
+
+_ARROW_RE = re.compile(r"\s*(<>|<|>)\s*")
+
+
+def _ids(spec) -> List[int]:
+    if isinstance(spec, (int, str)):
+        spec = [spec]
+    out = []
+    for x in spec or []:
+        for part in str(x).split(","):
+            part = part.strip()
+            if part:
+                out.append(ANY if part == "*" else int(part))
+    return out
+
+
+def _pairs(discord_ids: List[int], telegram_ids: List[int], direction: str, name: str) -> List[Route]:
+    """
+    Все каналы × все чаты группы: direction both | d2t | t2d.
+    "*" (ANY) допустим только как источник.
+    """
+    routes = []
+    for d in discord_ids:
+        for t in telegram_ids:
+            if direction in ("both", "d2t") and t != ANY:
+                routes.append(Route(DISCORD, d, TELEGRAM, t, name))
+            if direction in ("both", "t2d") and d != ANY:
+                routes.append(Route(TELEGRAM, t, DISCORD, d, name))
+    return routes
+
+
+def parse_routes_env(spec: str) -> List[Route]:
+    """
+    BRIDGE_ROUTES="111<>-1001; 222,333>-1002; 444<-1003,-1004"
+    слева Discord-каналы, справа Telegram-чаты; <> в обе стороны, > Discord->TG, < TG->Discord.
+    """
+    routes: List[Route] = []
+    for i, group in enumerate(g for g in spec.split(";") if g.strip()):
+        parts = _ARROW_RE.split(group.strip())
+        if len(parts) != 3:
+            raise ValueError(f"bad route {group!r}: expected 'discord<>telegram'")
+        left, arrow, right = parts
+        direction = {"<>": "both", ">": "d2t", "<": "t2d"}[arrow]
+        routes += _pairs(_ids(left), _ids(right), direction, f"env{i + 1}")
+    return routes
+
+
+def parse_routes_file(path: str) -> List[Route]:
+    """
+    JSON: [{"name": "cs2", "discord": [111, 222], "telegram": -1001, "direction": "both"}, ...]
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    routes: List[Route] = []
+    for i, g in enumerate(data):
+        direction = g.get("direction", "both")
+        if direction not in ("both", "d2t", "t2d"):
+            raise ValueError(f"route {i}: bad direction {direction!r}")
+        routes += _pairs(_ids(g.get("discord")), _ids(g.get("telegram")), direction, g.get("name") or f"file{i + 1}")
+    return routes
+
+
+def legacy_routes(cfg) -> List[Route]:
+    """
+    Старая пара BRIDGE_DISCORD_CHANNEL_ID / BRIDGE_TELEGRAM_CHAT_ID (+ админ-чат как адресат в TG).
+    Без BRIDGE_TELEGRAM_CHAT_ID в Discord идёт текст из любого TG-чата — как было раньше.
+    """
+    d = getattr(cfg, "bridge_discord_channel_id", None)
+    t = getattr(cfg, "bridge_telegram_chat_id", None)
+    admin = getattr(cfg, "telegram_admin_chat_id", None)
+    routes: List[Route] = []
+    if not d:
+        return routes
+    if t or admin:
+        routes.append(Route(DISCORD, int(d), TELEGRAM, int(t or admin), "legacy"))
+    routes.append(Route(TELEGRAM, int(t) if t else ANY, DISCORD, int(d), "legacy"))
+    return routes
+
+
+def load_routes(cfg, *, file: Optional[str] = None, env: Optional[str] = None) -> RoutingTable:
+    """
+    BRIDGE_ROUTES_FILE (JSON) + BRIDGE_ROUTES (строка) + старые BRIDGE_* из Config.
+    """
+    file = os.getenv("BRIDGE_ROUTES_FILE", "") if file is None else file
+    env = os.getenv("BRIDGE_ROUTES", "") if env is None else env
+
+    routes: List[Route] = []
+    if file:
+        routes += parse_routes_file(file)
+    if env.strip():
+        routes += parse_routes_env(env)
+    routes += legacy_routes(cfg)
+
+    table = RoutingTable(routes)
+    log.info("[Routing] %s routes loaded", len(table))
+    return table
@@ -1,14 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import datetime as dt
+import heapq
+import itertools
 import logging
 import os
-from typing import Awaitable, Callable, Optional
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
 
-from .stats import build_discord_stats
+from .cron import CronExpr
+from .fanout import Destination, fan_out
+from .metrics import JOB_ERRORS, JOB_SECONDS
 
 log = logging.getLogger(__name__)
 
+# что делать, если запуск проспали (loop был занят, прошлый запуск ещё идёт и т.п.)
+MISFIRE_POLICIES = ("run_once", "skip", "catch_up")
+_MAX_CATCH_UP = 10
+
 
 def _int(name: str, default: int) -> int:
     v = os.getenv(name)
@@ -27,10 +38,70 @@ def _bool(name: str, default: bool = True) -> bool:
     return v.strip().lower() in ("1", "true", "yes", "y", "on")
 
 
+class Job:
+    """
+    Одна периодическая задача: либо every (секунды), либо cron.
+    jitter — случайная добавка к каждому запуску (чтобы не долбить API ровно в :00).
+    misfire:
+    - run_once: проспали хоть 10 запусков — выполним один раз и дальше по расписанию
+    - skip: опоздали больше чем на grace_sec — пропускаем, ждём следующий
+    - catch_up: выполняем все пропущенные (не больше _MAX_CATCH_UP)
+    max_concurrency — сколько экземпляров задачи может идти одновременно.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[None]],
+        *,
+        every: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0.0,
+        misfire: str = "run_once",
+        grace_sec: float = 60.0,
+        max_concurrency: int = 1,
+        run_on_start: bool = False,
+    ):
+        if (every is None) == (cron is None):
+            raise ValueError(f"job {name}: set exactly one of every / cron")
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"job {name}: misfire must be one of {MISFIRE_POLICIES}")
+        self.name = name
+        self.func = func
+        self.every = max(1.0, float(every)) if every is not None else None
+        self.cron = CronExpr(cron) if cron else None
+        self.jitter = max(0.0, float(jitter))
+        self.misfire = misfire
+        self.grace_sec = grace_sec
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.run_on_start = run_on_start
+
+        self.next_run = 0.0  # time.time() без jitter — от него считаем следующий
+        self.running = 0
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self._m_seconds = JOB_SECONDS.labels(name)
+        self._m_errors = JOB_ERRORS.labels(name)
+
+    def following(self, after: float) -> float:
+        if self.every is not None:
+            return after + self.every
+        return self.cron.next_after(dt.datetime.fromtimestamp(after)).timestamp()
+
+    def first_run(self, now: float) -> float:
+        if self.run_on_start:
+            return now
+        return self.following(now)
+
+
 class Scheduler:
     """
-    Простой планировщик: каждые N секунд делает пост.
-    Работает внутри одного asyncio loop (Render OK).
+    Планировщик на одной куче времён запуска: один спящий таск на все задачи,
+    спит ровно до ближайшей. Работает внутри одного asyncio loop (Render OK).
+
+    Из коробки — задача stats (каждые every_seconds, или по SCHED_STATS_CRON);
+    остальное (новости, напоминания, дайджесты) добавляется через add_job().
     """
 
     def __init__(
@@ -39,57 +110,206 @@ class Scheduler:
         send_to_discord: Callable[[str], Awaitable[None]],
         send_to_telegram: Callable[[str], Awaitable[None]],
         build_stats_text: Callable[[], Awaitable[str]],
+        extra_destinations: Sequence[Destination] = (),
     ):
         self.every_seconds = max(30, int(every_seconds))  # защита от слишком частого спама
         self.send_to_discord = send_to_discord
         self.send_to_telegram = send_to_telegram
         self.build_stats_text = build_stats_text
 
+        # куда постим: TG + Discord + (опционально) доп. чаты/каналы
+        self.destinations: List[Destination] = [
+            Destination("telegram", send_to_telegram),
+            Destination("discord", send_to_discord),
+            *extra_destinations,
+        ]
+        self.send_timeout = _int("SCHED_SEND_TIMEOUT", 15)
+        self.send_retries = _int("SCHED_SEND_RETRIES", 2)
+
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[tuple] = []  # (next_run + jitter, seq, job)
+        self._seq = itertools.count()
+        self._running_tasks: set = set()
+
         self._task: Optional[asyncio.Task] = None
         self._stop = asyncio.Event()
+        self._wake = asyncio.Event()
+
+        # Сразу отправим один раз после запуска (можно выключить переменной)
+        stats_cron = os.getenv("SCHED_STATS_CRON", "").strip()
+        self.add_job(
+            "stats",
+            self._safe_send,
+            every=None if stats_cron else self.every_seconds,
+            cron=stats_cron or None,
+            run_on_start=_bool("STATS_SEND_ON_START", True),
+        )
+        self._add_reminders(os.getenv("REMINDERS", ""))
+
+    # ---------- jobs ----------
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[None]], **kwargs) -> Job:
+        """
+        kwargs — как у Job: every= / cron=, jitter=, misfire=, max_concurrency=, run_on_start=.
+        Можно вызывать и до, и после start().
+        """
+        if name in self.jobs:
+            raise ValueError(f"job {name} already exists")
+        job = Job(name, func, **kwargs)
+        self.jobs[name] = job
+        if self._task:
+            self._schedule(job, job.first_run(time.time()))
+        return job
+
+    def _add_reminders(self, spec: str):
+        """
+        REMINDERS="0 18 * * 5|Турнир в субботу!;@daily|Не забудьте про /ticket"
+        """
+        for i, item in enumerate(p for p in spec.split(";") if p.strip()):
+            cron, _, text = item.partition("|")
+            if not text.strip():
+                log.warning("[Scheduler] Bad reminder %r (need 'cron|text')", item)
+                continue
+
+            async def send(text: str = text.strip()):
+                await self.post(text)
+
+            try:
+                self.add_job(f"reminder{i + 1}", send, cron=cron.strip(), misfire="skip")
+            except ValueError as e:
+                log.warning("[Scheduler] Bad reminder %r: %s", item, e)
+
+    def _schedule(self, job: Job, at: float):
+        job.next_run = at
+        jitter = random.uniform(0, job.jitter) if job.jitter else 0.0
+        heapq.heappush(self._heap, (at + jitter, next(self._seq), job))
+        self._wake.set()
+
+    # ---------- lifecycle ----------
 
     async def start(self):
         if self._task:
             return
         self._stop.clear()
+        now = time.time()
+        self._heap = []
+        for job in self.jobs.values():
+            self._schedule(job, job.first_run(now))
         self._task = asyncio.create_task(self._run(), name="scheduler")
-        log.info("[Scheduler] Started (every %s sec)", self.every_seconds)
+        log.info(
+            "[Scheduler] Started: %s",
+            ", ".join(f"{j.name}({j.cron.expr if j.cron else f'every {int(j.every)}s'})" for j in self.jobs.values()),
+        )
 
     async def stop(self):
         if not self._task:
             return
         self._stop.set()
+        self._wake.set()
         self._task.cancel()
         try:
             await self._task
-        except Exception:
+        except BaseException:
             pass
         self._task = None
+        for t in list(self._running_tasks):
+            t.cancel()
 
     async def _run(self):
-        # Сразу отправим один раз после запуска (можно выключить переменной)
-        send_on_start = _bool("STATS_SEND_ON_START", True)
+        while not self._stop.is_set():
+            if not self._heap:
+                delay = None
+            else:
+                delay = max(0.0, self._heap[0][0] - time.time())
 
-        if send_on_start:
-            await self._safe_send()
+            if delay is None or delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
 
-        while not self._stop.is_set():
-            try:
-                await asyncio.wait_for(self._stop.wait(), timeout=self.every_seconds)
-                break
-            except asyncio.TimeoutError:
-                await self._safe_send()
+            _, _, job = heapq.heappop(self._heap)
+            self._dispatch(job, time.time())
 
-    async def _safe_send(self):
+    def _dispatch(self, job: Job, now: float):
+        due = job.next_run
+        late = now - due
+
+        # сколько запусков пропущено и когда следующий
+        runs = 1
+        nxt = job.following(due)
+        if nxt <= now:
+            missed = 0
+            while nxt <= now and missed < 100_000:
+                nxt = job.following(nxt)
+                missed += 1
+            if job.misfire == "catch_up":
+                runs = 1 + min(missed, _MAX_CATCH_UP - 1)
+        if job.misfire == "skip" and late > job.grace_sec:
+            runs = 0
+        self._schedule(job, nxt)
+
+        if not runs:
+            job.skipped += 1
+            log.warning("[Scheduler] %s: late by %.0fs, skipped", job.name, late)
+            return
+        if job.running >= job.max_concurrency:
+            job.skipped += 1
+            log.warning("[Scheduler] %s: previous run still going, skipped", job.name)
+            return
+
+        t = asyncio.create_task(self._execute(job, runs), name=f"job:{job.name}")
+        self._running_tasks.add(t)
+        t.add_done_callback(self._running_tasks.discard)
+
+    async def _execute(self, job: Job, runs: int):
+        job.running += 1
         try:
-            text = await self.build_stats_text()
-            if not text:
-                return
+            for _ in range(runs):
+                job.runs += 1
+                try:
+                    with job._m_seconds.time():
+                        await job.func()
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    job.failures += 1
+                    job._m_errors.inc()
+                    log.exception("[Scheduler] Job %s failed", job.name)
+        finally:
+            job.running -= 1
+
+    # ---------- posting ----------
+
+    async def post(self, text: str):
+        """
+        Разослать текст во все destinations (stats, новости и т.п.).
+        """
+        return await fan_out(
+            self.destinations, text, timeout=self.send_timeout, retries=self.send_retries
+        )
+
+    async def _safe_send(self):
+        text = await self.build_stats_text()
+        if not text:
+            return
+
+        # во все адреса параллельно, ошибка одного не мешает остальным
+        results = await self.post(text)
 
-            # в TG + Discord
-            await self.send_to_telegram(text)
-            await self.send_to_discord(text)
+        ok = [r.name for r in results if r.ok]
+        log.info("[Scheduler] Sent stats to %s", ", ".join(ok) or "nobody")
 
-            log.info("[Scheduler] Sent stats to TG + Discord")
-        except Exception:
-            log.exception("[Scheduler] Failed to send stats")
+    def stats(self) -> dict:
+        return {
+            name: {
+                "next_run": round(j.next_run, 1),
+                "running": j.running,
+                "runs": j.runs,
+                "skipped": j.skipped,
+                "failures": j.failures,
+            }
+            for name, j in self.jobs.items()
+        }
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, Set
+
+log = logging.getLogger(__name__)
+
+
+def item_key(feed_url: str, guid: str) -> str:
+    """
+    Ключ элемента ленты: лента + GUID (или ссылка, если GUID нет).
+    """
+    return hashlib.sha1(f"{feed_url}\n{guid}".encode("utf-8")).hexdigest()[:20]
+
+
+class SeenStore:
+    """
+    Что из лент уже запостили. SQLite на диске + множество ключей в памяти,
+    поэтому проверка has() не ходит в базу. Переживает рестарты (если файл
+    лежит на постоянном диске — на Render это Disk, смонтированный в NEWS_SEEN_DB).
+
+    Записи, которых не было в лентах дольше ttl_days, вычищаются compact():
+    раз элемент из ленты пропал, повторно он уже не придёт. Элементы, которые
+    всё ещё висят в ленте, продлеваются через touch() (не чаще раза в сутки).
+    """
+
+    def __init__(self, path: str, ttl_days: int = 30):
+        self.path = path
+        self.ttl_sec = max(1, ttl_days) * 86400
+        self._keys: Dict[str, int] = {}  # key -> когда последний раз видели в ленте
+        self._feeds: Set[str] = set()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, ts INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS feeds (url TEXT PRIMARY KEY, ts INTEGER NOT NULL)")
+        self._db.commit()
+
+        self.compact()
+        self._load_keys()
+        self._feeds = {row[0] for row in self._db.execute("SELECT url FROM feeds")}
+        log.info("[News] Seen store %s: %s items, %s feeds", path, len(self._keys), len(self._feeds))
+
+    def _load_keys(self):
+        self._keys = {key: ts for key, ts in self._db.execute("SELECT key, ts FROM seen")}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def has(self, key: str) -> bool:
+        return key in self._keys
+
+    def known_feed(self, feed_url: str) -> bool:
+        return feed_url in self._feeds
+
+    def add_many(self, keys: Iterable[str], feed_url: str | None = None):
+        now = int(time.time())
+        new = [k for k in keys if k not in self._keys]
+        with self._db:
+            if new:
+                self._db.executemany("INSERT OR REPLACE INTO seen (key, ts) VALUES (?, ?)", [(k, now) for k in new])
+            if feed_url and feed_url not in self._feeds:
+                self._db.execute("INSERT OR REPLACE INTO feeds (url, ts) VALUES (?, ?)", (feed_url, now))
+        self._keys.update((k, now) for k in new)
+        if feed_url:
+            self._feeds.add(feed_url)
+
+        # раз в сутки чистим хвост
+        if time.time() - self._last_compact > 86400:
+            self.compact()
+            self._load_keys()
+
+    def touch(self, keys: Iterable[str]):
+        """
+        Элементы всё ещё есть в ленте — продлеваем им TTL.
+        """
+        now = int(time.time())
+        stale = [k for k in keys if now - self._keys.get(k, now) > 86400]
+        if not stale:
+            return
+        with self._db:
+            self._db.executemany("UPDATE seen SET ts = ? WHERE key = ?", [(now, k) for k in stale])
+        for k in stale:
+            self._keys[k] = now
+
+    def compact(self):
+        cutoff = int(time.time()) - self.ttl_sec
+        with self._db:
+            cur = self._db.execute("DELETE FROM seen WHERE ts < ?", (cutoff,))
+        self._last_compact = time.time()
+        if cur.rowcount:
+            log.info("[News] Seen store compacted: -%s items", cur.rowcount)
+
+    def close(self):
+        self._db.close()
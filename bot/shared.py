@@ -1,16 +1,279 @@
+import hashlib
+import re
+import sys
 import time
-from collections import defaultdict, deque
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set
+
+from rapidfuzz import fuzz
+
+
+class _UserWindow:
+    """
+    Кольцо из последних max_msgs+1 отметок времени одного пользователя.
+    Больше хранить не нужно: спам = (max_msgs+1)-е сообщение попало в окно.
+    """
+    __slots__ = ("stamps", "head", "count", "last")
+
+    def __init__(self, size: int):
+        self.stamps = array("d", bytes(8 * size))
+        self.head = 0
+        self.count = 0
+        self.last = 0.0
+
 
 class SpamGate:
-    def __init__(self, max_msgs: int, window_sec: int):
+    def __init__(self, max_msgs: int, window_sec: int, max_users: int = 100_000):
         self.max_msgs = max_msgs
         self.window_sec = window_sec
-        self.events = defaultdict(deque)
+        self.max_users = max_users
+        self._size = max(1, max_msgs + 1)
+        # порядок = давность последнего сообщения: в начале самые «остывшие»
+        self.events: "OrderedDict[int, _UserWindow]" = OrderedDict()
+        self.evicted = 0
 
     def hit(self, user_id: int) -> bool:
-        now = time.time()
-        q = self.events[user_id]
-        q.append(now)
-        while q and now - q[0] > self.window_sec:
-            q.popleft()
-        return len(q) > self.max_msgs
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        w = self.events.get(user_id)
+        if w is None:
+            w = _UserWindow(self._size)
+            self.events[user_id] = w
+            if len(self.events) > self.max_users:
+                self.events.popitem(last=False)
+                self.evicted += 1
+        else:
+            self.events.move_to_end(user_id)
+
+        w.stamps[w.head] = now
+        w.head = (w.head + 1) % self._size
+        if w.count < self._size:
+            w.count += 1
+        w.last = now
+
+        if w.count < self._size:
+            return False
+        # после записи head указывает на самую старую отметку в кольце
+        return now - w.stamps[w.head] <= self.window_sec
+
+    def _evict_idle(self, now: float):
+        # пользователь без сообщений дольше окна нам больше не интересен
+        events = self.events
+        while events:
+            uid, w = next(iter(events.items()))
+            if now - w.last <= self.window_sec:
+                break
+            del events[uid]
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        per_user = sys.getsizeof(_UserWindow(self._size)) + sys.getsizeof(array("d", bytes(8 * self._size)))
+        return {
+            "users": len(self.events),
+            "evicted": self.evicted,
+            "approx_bytes": sys.getsizeof(self.events) + len(self.events) * per_user,
+        }
+
+
+# ---------- рейды: одинаковые/почти одинаковые сообщения от разных аккаунтов ----------
+
+_URL_RE = re.compile(r"https?://\S+")
+# признаки рекламы/рейда в самом тексте: ссылка (в т.ч. без схемы), упоминание (Discord, @username в TG), @everyone
+_SIGNAL_RE = re.compile(
+    r"https?://|www\.|\b[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}/\S*|discord\.gg|t\.me/|<@[!&]?\d+>|@everyone|@here|(?<!\w)@[a-z]\w{4,}",
+    re.IGNORECASE,
+)
+
+# вердикты RaidDetector.hit
+RAID = "raid"  # рейд: удалить и наказать
+SUSPECT = "suspect"  # массовый повтор без других признаков: только сообщить модераторам
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_REPEAT_RE = re.compile(r"(.)\1+")
+
+# MinHash: BANDS полос по ROWS хешей. Похожесть (Jaccard по 4-граммам) ~0.7+
+# почти наверняка даёт общую полосу, поэтому кандидатов ищем по словарю, а не попарно.
+_SHINGLE = 4
+_BANDS = 4
+_ROWS = 4
+_PRIME = (1 << 61) - 1
+_MAX_SIGNATURE_CHARS = 400  # для сигнатуры хватает начала сообщения
+_PERMS = [
+    (int.from_bytes(hashlib.blake2b(b"a%d" % i, digest_size=8).digest(), "big") | 1,
+     int.from_bytes(hashlib.blake2b(b"b%d" % i, digest_size=8).digest(), "big"))
+    for i in range(_BANDS * _ROWS)
+]
+
+
+def _normalize(text: str) -> str:
+    t = unicodedata.normalize("NFKC", text or "").lower()
+    # ссылки оставляем только доменом: в рейдах часто меняют хвост ссылки
+    t = _URL_RE.sub(lambda m: m.group(0).split("/")[2] if m.group(0).count("/") >= 2 else "", t)
+    t = _NON_WORD_RE.sub(" ", t)
+    t = _REPEAT_RE.sub(r"\1", t)
+    return " ".join(t.split())
+
+
+def _band_keys(norm: str) -> List[tuple]:
+    norm = norm[:_MAX_SIGNATURE_CHARS]
+    shingles = {hash(norm[i:i + _SHINGLE]) for i in range(max(1, len(norm) - _SHINGLE + 1))}
+    sig = [min(((a * h + b) % _PRIME) for h in shingles) for a, b in _PERMS]
+    return [(i, tuple(sig[i * _ROWS:(i + 1) * _ROWS])) for i in range(_BANDS)]
+
+
+class _Cluster:
+    __slots__ = ("sample", "keys", "hits", "users", "newcomers", "signal", "last", "flagged", "reported")
+
+    def __init__(self, sample: str):
+        self.sample = sample
+        self.keys: list = []
+        self.hits: deque = deque()  # (ts, user_id)
+        self.users: Dict[int, int] = {}  # user_id -> сколько раз в окне
+        self.newcomers: Set[int] = set()  # новички среди авторов в окне
+        self.signal = False  # в тексте кластера были ссылки/упоминания
+        self.last = 0.0
+        self.flagged = False
+        self.reported = False
+
+
+class RaidDetector:
+    """
+    Ловит copy-paste рейды: одно и то же (или почти то же) сообщение от разных
+    пользователей в любых каналах за window_sec.
+
+    Одинаковый текст сам по себе не рейд («всем привет», «го катку» пишут многие),
+    поэтому нужен ещё признак:
+    - в тексте ссылка или упоминание, и его прислали min_users разных пользователей;
+    - или его прислали min_users новичков (newcomer=True: свежий аккаунт / только что зашёл).
+    Тогда кластер — рейд, и RAID получают сообщения со ссылкой/упоминанием или от новичков;
+    старожил, повторивший безобидную фразу, не наказывается.
+    Без признаков, но от mass_users и больше разных людей — один раз SUSPECT на кластер:
+    сообщить модераторам, ничего не удалять.
+
+    Похожие сообщения собираются в кластеры. Поиск кластера — точный хеш
+    нормализованного текста, иначе MinHash-полосы + проверка rapidfuzz
+    (только против образца кластера), т.е. O(1) на сообщение без попарных сравнений.
+    Индекс ограничен: кластеры без активности дольше окна выкидываются,
+    и их не больше max_clusters.
+    """
+
+    def __init__(
+        self,
+        min_users: int = 4,
+        window_sec: int = 60,
+        similarity: int = 85,
+        min_len: int = 20,
+        max_clusters: int = 20_000,
+        mass_users: int = 15,
+    ):
+        self.min_users = max(2, int(min_users))
+        self.mass_users = max(self.min_users, int(mass_users))
+        self.window_sec = window_sec
+        self.similarity = similarity
+        self.min_len = min_len
+        self.max_clusters = max_clusters
+
+        self._clusters: "OrderedDict[int, _Cluster]" = OrderedDict()
+        self._index: Dict[object, _Cluster] = {}
+        self.checked = 0
+        self.flagged = 0
+        self.suspected = 0
+        self.evicted = 0
+
+    def hit(
+        self, text: str, user_id: int, channel_id: Optional[int] = None, *, newcomer: bool = False
+    ) -> Optional[str]:
+        """
+        RAID, SUSPECT или None (см. описание класса).
+        newcomer — автор новый (аккаунт/участник); на платформах, где это неизвестно, False.
+        channel_id пока только для логов/расширений: кластеры общие для всех каналов.
+        """
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        norm = _normalize(text)
+        if len(norm) < self.min_len:
+            return None
+        self.checked += 1
+
+        exact = hashlib.blake2b(norm.encode("utf-8"), digest_size=8).digest()
+        cluster = self._index.get(exact)
+        bands: List[tuple] = []
+        if cluster is None:
+            bands = _band_keys(norm)
+            for key in bands:
+                c = self._index.get(key)
+                if c is not None and fuzz.ratio(norm, c.sample) >= self.similarity:
+                    cluster = c
+                    break
+
+        if cluster is None:
+            cluster = _Cluster(norm)
+            self._add_keys(cluster, [exact, *bands])
+            self._clusters[id(cluster)] = cluster
+            if len(self._clusters) > self.max_clusters:
+                self._drop(next(iter(self._clusters.values())))
+        else:
+            self._clusters.move_to_end(id(cluster))
+            if exact not in self._index and len(cluster.keys) < 64:
+                self._add_keys(cluster, [exact])
+
+        signal = _SIGNAL_RE.search(text) is not None
+        cluster.last = now
+        cluster.signal = cluster.signal or signal
+        cluster.hits.append((now, user_id))
+        cluster.users[user_id] = cluster.users.get(user_id, 0) + 1
+        if newcomer:
+            cluster.newcomers.add(user_id)
+        while cluster.hits and now - cluster.hits[0][0] > self.window_sec:
+            _, old_uid = cluster.hits.popleft()
+            n = cluster.users[old_uid] - 1
+            if n:
+                cluster.users[old_uid] = n
+            else:
+                del cluster.users[old_uid]
+                cluster.newcomers.discard(old_uid)
+
+        if not cluster.flagged:
+            users = len(cluster.users)
+            cluster.flagged = (cluster.signal and users >= self.min_users) or len(cluster.newcomers) >= self.min_users
+        if cluster.flagged and (signal or newcomer):
+            self.flagged += 1
+            return RAID
+        if not cluster.reported and len(cluster.users) >= self.mass_users:
+            cluster.reported = True
+            self.suspected += 1
+            return SUSPECT
+        return None
+
+    def _add_keys(self, cluster: _Cluster, keys: list):
+        for k in keys:
+            self._index[k] = cluster
+            cluster.keys.append(k)
+
+    def _drop(self, cluster: _Cluster):
+        self._clusters.pop(id(cluster), None)
+        for k in cluster.keys:
+            if self._index.get(k) is cluster:
+                del self._index[k]
+        self.evicted += 1
+
+    def _evict_idle(self, now: float):
+        clusters = self._clusters
+        while clusters:
+            c = next(iter(clusters.values()))
+            if now - c.last <= self.window_sec:
+                break
+            self._drop(c)
+
+    def stats(self) -> dict:
+        return {
+            "clusters": len(self._clusters),
+            "index_keys": len(self._index),
+            "checked": self.checked,
+            "flagged": self.flagged,
+            "suspected": self.suspected,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from .metrics import REGISTRY
+
+log = logging.getLogger(__name__)
+
+_PHASE_SECONDS = REGISTRY.gauge(
+    "avcbot_startup_seconds", "Time spent in each startup phase", ("phase",)
+)
+
+
+class StartupTimer:
+    """
+    Замер фаз запуска (конфиг, импорты, логины платформ...) — в лог и в /metrics.
+    Фазы могут идти параллельно: у каждой своё время, total — от создания таймера.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t)
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+        _PHASE_SECONDS.labels(name).set(round(seconds, 4))
+        log.info("[Startup] %s: %.0f ms", name, seconds * 1000)
+
+    def mark(self, name: str):
+        """
+        Событие «готово» (например, логин в Discord) — время от начала запуска.
+        """
+        self.record(name, time.perf_counter() - self.t0)
+
+    def report(self):
+        total = time.perf_counter() - self.t0
+        _PHASE_SECONDS.labels("total").set(round(total, 4))
+        parts = ", ".join(f"{k} {v * 1000:.0f}ms" for k, v in self.phases.items())
+        log.info("[Startup] Ready in %.2fs (%s)", total, parts)
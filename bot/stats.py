@@ -1,10 +1,111 @@
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
-from typing import Optional
+import logging
+import time
+from typing import Optional, Tuple
 
 import discord
 
+log = logging.getLogger(__name__)
+
+_ONLINE = (discord.Status.online, discord.Status.idle, discord.Status.dnd)
+
+
+def _is_online(member) -> bool:
+    return getattr(member, "status", None) in _ONLINE
+
+
+class GuildStatsTracker:
+    """
+    Счётчики участников, которые обновляются по событиям Discord
+    (join / remove / presence), чтобы !stats и плановые посты были O(1).
+    Раз в reconcile_every секунд делаем полный проход по guild.members —
+    на случай пропущенных событий (реконнект и т.п.).
+    track_online=False (нет presence intent) — статусов у участников нет, online не считаем.
+    """
+
+    def __init__(self, guild_id: int, reconcile_every: int = 3600, track_online: bool = True):
+        self.guild_id = int(guild_id)
+        self.reconcile_every = reconcile_every
+        self.track_online = track_online
+        self.humans = 0
+        self.bots = 0
+        self.online = 0
+        self.ready = False
+        self._last_reconcile = 0.0
+        self._reconciling = False
+
+    def _mine(self, member) -> bool:
+        guild = getattr(member, "guild", None)
+        return guild is not None and guild.id == self.guild_id
+
+    def counts(self) -> Optional[Tuple[int, int, Optional[int]]]:
+        """
+        (люди, боты, онлайн); онлайн None, если он не отслеживается.
+        """
+        if not self.ready:
+            return None
+        return self.humans, self.bots, self.online if self.track_online else None
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_reconcile >= self.reconcile_every
+
+    async def reconcile(self, guild: discord.Guild):
+        """
+        Полный пересчёт одним проходом; каждые 5000 участников отдаём loop другим задачам.
+        """
+        if self._reconciling or guild is None or not guild.members:
+            return
+        self._reconciling = True
+        try:
+            humans = bots = online = 0
+            for i, m in enumerate(list(guild.members)):
+                if m.bot:
+                    bots += 1
+                else:
+                    humans += 1
+                if _is_online(m):
+                    online += 1
+                if i and i % 5000 == 0:
+                    await asyncio.sleep(0)
+            self.humans, self.bots, self.online = humans, bots, online
+            self.ready = True
+            self._last_reconcile = time.monotonic()
+            log.info("[Stats] Reconciled guild %s: humans=%s bots=%s online=%s", guild.id, humans, bots, online)
+        finally:
+            self._reconciling = False
+
+    # ---------- события ----------
+
+    def on_member_join(self, member: discord.Member):
+        if not self._mine(member):
+            return
+        if member.bot:
+            self.bots += 1
+        else:
+            self.humans += 1
+        if _is_online(member):
+            self.online += 1
+
+    def on_member_remove(self, member: discord.Member):
+        if not self._mine(member):
+            return
+        if member.bot:
+            self.bots = max(0, self.bots - 1)
+        else:
+            self.humans = max(0, self.humans - 1)
+        if _is_online(member):
+            self.online = max(0, self.online - 1)
+
+    def on_presence_update(self, before: discord.Member, after: discord.Member):
+        if not self._mine(after):
+            return
+        was, now = _is_online(before), _is_online(after)
+        if was != now:
+            self.online = max(0, self.online + (1 if now else -1))
+
 
 def _fmt_dt(d: Optional[dt.datetime]) -> str:
     if not d:
@@ -13,10 +114,13 @@ def _fmt_dt(d: Optional[dt.datetime]) -> str:
     return d.strftime("%Y-%m-%d %H:%M")
 
 
-async def build_discord_stats(client: discord.Client, guild_id: int) -> str:
+async def build_discord_stats(
+    client: discord.Client, guild_id: int, tracker: Optional[GuildStatsTracker] = None
+) -> str:
     """
     Собирает безопасную статистику сервера без privileged intents.
     (Если у тебя включены Presence/Members intents — покажем больше.)
+    С tracker счётчики участников берутся из него, без прохода по guild.members.
     """
     guild = client.get_guild(guild_id)
     if not guild:
@@ -35,21 +139,34 @@ async def build_discord_stats(client: discord.Client, guild_id: int) -> str:
     online = None
 
     try:
-        if guild.members:
-            humans = sum(1 for m in guild.members if not m.bot)
-            bots = sum(1 for m in guild.members if m.bot)
-
-            # online будет только если включен Presence intent
-            try:
-                online = sum(
-                    1 for m in guild.members
-                    if getattr(m, "status", None) in (discord.Status.online, discord.Status.idle, discord.Status.dnd)
-                )
-            except Exception:
+        if tracker is not None and isinstance(guild, discord.Guild) and (not tracker.ready or tracker.due()):
+            await tracker.reconcile(guild)
+
+        counts = tracker.counts() if tracker is not None else None
+        if counts is not None:
+            humans, bots, online = counts
+        elif guild.members:
+            humans = bots = online = 0
+            for m in guild.members:
+                if m.bot:
+                    bots += 1
+                else:
+                    humans += 1
+                # online будет только если включен Presence intent
+                if _is_online(m):
+                    online += 1
+            if not client.intents.presences:
                 online = None
     except Exception:
         pass
 
+    if online is None:
+        # без Presence intent — приблизительный онлайн от самого Discord (один REST-запрос)
+        try:
+            online = (await client.fetch_guild(guild_id, with_counts=True)).approximate_presence_count
+        except Exception:
+            pass
+
     text = []
     text.append("📊 **Статистика сервера**")
     text.append(f"🏰 Сервер: **{guild.name}**")
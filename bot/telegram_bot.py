@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import hmac
 import logging
 from typing import Callable, Awaitable, Optional, List, Tuple
 
+from aiohttp import web
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -13,48 +15,68 @@ from telegram.ext import (
 )
 
 from .config import Config
+from .metrics import HANDLER_ERRORS, HANDLER_SECONDS, SEND_ERRORS, SEND_SECONDS
+from .msgmap import MsgRef
+from .routing import TELEGRAM, Route, RoutingTable, load_routes
+from .web import TELEGRAM_WEBHOOK_PATH, LateRoute
 
 log = logging.getLogger(__name__)
 
+WEBHOOK_PATH = TELEGRAM_WEBHOOK_PATH
+
+_ON_TEXT_SECONDS = HANDLER_SECONDS.labels("telegram_on_text")
+_ON_TEXT_ERRORS = HANDLER_ERRORS.labels("telegram_on_text")
+_CHAT_SEND_SECONDS = SEND_SECONDS.labels("telegram_bridge")
+_CHAT_SEND_ERRORS = SEND_ERRORS.labels("telegram_bridge")
+
 
 class TelegramBridge:
     """
-    Неблокирующий Telegram polling для совместной работы с Discord в одном asyncio-loop.
+    Неблокирующий Telegram (polling или webhook) для совместной работы с Discord в одном asyncio-loop.
+
+    Webhook включается TELEGRAM_WEBHOOK_URL (публичный адрес сервиса на Render):
+    апдейты приходят POST-ом на WEBHOOK_PATH нашего aiohttp сервера (bot/web.py),
+    long-poll цикла нет вообще.
     """
 
-    def __init__(self, cfg: Config, on_text_from_tg: Callable[[str, str], Awaitable[None]]):
+    def __init__(
+        self,
+        cfg: Config,
+        on_text_from_tg: Callable[[str, str, Tuple[Route, ...], MsgRef], Awaitable[None]],
+        routes: Optional[RoutingTable] = None,
+    ):
         self.cfg = cfg
-        self.on_text_from_tg = on_text_from_tg  # async (text, author)
+        self.on_text_from_tg = on_text_from_tg  # async (text, author, routes, ref)
+        self._on_edit: Optional[Callable[[MsgRef, str], Awaitable[None]]] = None
+        self.routes = routes if routes is not None else load_routes(cfg)
         self.app: Optional[Application] = None
         self._started = False
 
         # сюда __main__.py может положить доп. команды: [("stats", handler), ...]
         self.extra_command_handlers: List[Tuple[str, Callable]] = []
 
-    def _allowed_chat(self, update: Update) -> bool:
+    def set_sync_handlers(self, on_edit):
         """
-        Если задан TELEGRAM_ALLOWED_CHAT_ID — разрешаем только этот чат/группу.
-        Если не задан — разрешаем везде.
+        Правки в чатах-источниках: on_edit(ref, text), text оформлен как при пересылке.
+        Об удалениях Bot API ботам не сообщает — их синхронизация идёт только из Discord.
         """
-        allowed = getattr(self.cfg, "bridge_telegram_chat_id", None) or getattr(self.cfg, "telegram_allowed_chat_id", None)
-        # В твоём Config есть bridge_telegram_chat_id и telegram_admin_chat_id.
-        # Мы используем TELEGRAM_ALLOWED_CHAT_ID (если ты добавил), иначе пропускаем все.
-        # Если у тебя переменная называется TELEGRAM_ALLOWED_CHAT_ID — она должна попадать в cfg как telegram_allowed_chat_id.
-        # Если у тебя её нет в Config — просто убери проверку или добавь поле (я могу дать готовый config.py).
-        try:
-            allowed_env = getattr(self.cfg, "telegram_allowed_chat_id", None)
-            allowed = allowed_env if allowed_env else allowed
-        except Exception:
-            pass
+        self._on_edit = on_edit
 
-        if not allowed:
-            return True
+    @staticmethod
+    def format_for_discord(author: str, text: str) -> str:
+        return f"📨 TG | {author}: {text}"
 
-        try:
-            chat_id = update.effective_chat.id if update.effective_chat else None
-            return int(chat_id) == int(allowed)
-        except Exception:
+    def _allowed_chat(self, update: Update) -> bool:
+        """
+        Есть маршруты из Telegram — только чаты-источники (без BRIDGE_TELEGRAM_CHAT_ID маршрут "любой чат").
+        Маршрутов из Telegram нет вовсе — разрешаем везде, как раньше.
+        """
+        chat = update.effective_chat
+        if chat is None:
             return False
+        if not self.routes.has_sources(TELEGRAM):
+            return True
+        return self.routes.is_source(TELEGRAM, chat.id)
 
     async def _cmd_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self._allowed_chat(update):
@@ -83,6 +105,14 @@ class TelegramBridge:
         await msg.reply_text(text)
 
     async def _on_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        with _ON_TEXT_SECONDS.time():
+            try:
+                await self._handle_text(update, context)
+            except Exception:
+                _ON_TEXT_ERRORS.inc()
+                raise
+
+    async def _handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not self._allowed_chat(update):
             return
 
@@ -95,20 +125,89 @@ class TelegramBridge:
         author = (user.full_name if user else "unknown")
 
         # ЛОГ: чтобы видеть, что реально приходят апдейты
-        log.info("[TG] got message from %s: %s", author, text)
+        log.info("[TG] got message from %s", author, extra={"body": text})
 
         # тестовый ответ в телеге (чтобы сразу понять, что хендлер работает)
         await msg.reply_text("👍 Принял: " + text[:200])
 
         # если у тебя есть мост в Discord — отправим туда
+        chat_id = update.effective_chat.id
+        routes = self.routes.destinations(TELEGRAM, chat_id)
+        if not routes:
+            return
         try:
-            await self.on_text_from_tg(text, author)
+            await self.on_text_from_tg(text, author, routes, (TELEGRAM, chat_id, msg.message_id))
         except Exception:
             log.exception("TG -> Discord bridge failed")
 
+    async def _on_edited_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        msg = update.edited_message
+        if not self._on_edit or not msg or not msg.text:
+            return
+        if not self.routes.is_source(TELEGRAM, msg.chat_id):
+            return
+        user = update.effective_user
+        author = user.full_name if user else "unknown"
+        try:
+            await self._on_edit((TELEGRAM, msg.chat_id, msg.message_id), self.format_for_discord(author, msg.text))
+        except Exception:
+            log.exception("[Bridge] TG edit sync failed")
+
     async def _on_error(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         log.exception("Telegram error: %s", context.error)
 
+    # ---------- webhook ----------
+
+    def webhook_enabled(self) -> bool:
+        return bool(getattr(self.cfg, "telegram_webhook_url", ""))
+
+    def bind_webhook(self, route: LateRoute):
+        """
+        Обработчик апдейтов для роута, смонтированного на общем aiohttp app заранее
+        (сервер уже запущен, см. late_route в bot/web.py).
+        """
+        if not self.webhook_enabled():
+            return
+        route.set(self._webhook)
+        log.info("[Telegram] Webhook endpoint bound at %s", WEBHOOK_PATH)
+
+    async def _webhook(self, request: web.Request) -> web.Response:
+        secret = getattr(self.cfg, "telegram_webhook_secret", "")
+        if secret:
+            got = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if not hmac.compare_digest(got, secret):
+                return web.Response(status=403)
+
+        if not self.app or not self.app.running:
+            # ещё стартуем — Telegram повторит доставку сам
+            return web.Response(status=503)
+
+        try:
+            data = await request.json()
+        except Exception:
+            return web.Response(status=400)
+
+        update = Update.de_json(data, self.app.bot)
+        if update:
+            # дальше как при polling: очередь Application, обработка параллельно (concurrent_updates)
+            await self.app.update_queue.put(update)
+        return web.Response(text="OK")
+
+    def _allowed_updates(self) -> List[str]:
+        """
+        Просим у Telegram только те типы апдейтов, которые реально обрабатываем.
+        """
+        types = set()
+        for group in self.app.handlers.values():
+            for h in group:
+                if isinstance(h, (CommandHandler, MessageHandler)):
+                    types.add(Update.MESSAGE)
+                    if h.callback == self._on_edited_text:
+                        types.add(Update.EDITED_MESSAGE)
+                else:
+                    return Update.ALL_TYPES  # незнакомый хендлер — не рискуем
+        return sorted(types) or [Update.MESSAGE]
+
     async def start(self):
         """
         Запускаем polling НЕ блокируя loop.
@@ -120,35 +219,65 @@ class TelegramBridge:
         if not self.cfg.telegram_token:
             raise RuntimeError("TELEGRAM_TOKEN is empty")
 
-        # build() без run_polling()
-        self.app = Application.builder().token(self.cfg.telegram_token).build()
+        # build() без run_polling(); апдейты обрабатываем параллельно
+        builder = (
+            Application.builder()
+            .token(self.cfg.telegram_token)
+            .concurrent_updates(max(1, int(getattr(self.cfg, "telegram_concurrency", 1) or 1)))
+        )
+        api_url = getattr(self.cfg, "telegram_api_url", "")
+        if api_url:
+            # свой Bot API сервер (локальный мок для нагрузочных тестов)
+            builder = builder.base_url(f"{api_url}/bot").base_file_url(f"{api_url}/file/bot")
+        if self.webhook_enabled():
+            builder = builder.updater(None)
+        self.app = builder.build()
 
         # базовые команды
-        self.app.add_handler(CommandHandler("start", self._cmd_start))
-        self.app.add_handler(CommandHandler("id", self._cmd_id))
+        # (только новые сообщения: правки приходят отдельным типом апдейта)
+        new_only = filters.UpdateType.MESSAGE
+        self.app.add_handler(CommandHandler("start", self._cmd_start, filters=new_only))
+        self.app.add_handler(CommandHandler("id", self._cmd_id, filters=new_only))
 
         # ✅ ДОП КОМАНДЫ из __main__.py
         extra = getattr(self, "extra_command_handlers", [])
         for cmd, fn in extra:
-            self.app.add_handler(CommandHandler(cmd, fn))
+            self.app.add_handler(CommandHandler(cmd, fn, filters=new_only))
 
         # текстовые сообщения
-        self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self._on_text))
+        self.app.add_handler(MessageHandler(new_only & filters.TEXT & ~filters.COMMAND, self._on_text))
+        if self._on_edit:
+            self.app.add_handler(
+                MessageHandler(filters.UpdateType.EDITED_MESSAGE & filters.TEXT & ~filters.COMMAND, self._on_edited_text)
+            )
         self.app.add_error_handler(self._on_error)
 
         # правильный неблокирующий старт
         await self.app.initialize()
         await self.app.start()
 
+        allowed_updates = self._allowed_updates()
+
+        if self.webhook_enabled():
+            url = self.cfg.telegram_webhook_url + WEBHOOK_PATH
+            await self.app.bot.set_webhook(
+                url=url,
+                secret_token=getattr(self.cfg, "telegram_webhook_secret", "") or None,
+                allowed_updates=allowed_updates,
+                drop_pending_updates=True,
+            )
+            log.info("[Telegram] Started (webhook %s, updates=%s)", url, allowed_updates)
+            return
+
         if not self.app.updater:
             raise RuntimeError("Telegram Updater is not available (check python-telegram-bot version)")
 
         await self.app.updater.start_polling(
             drop_pending_updates=True,
-            allowed_updates=Update.ALL_TYPES,
+            allowed_updates=allowed_updates,
         )
 
-        log.info("[Telegram] Started polling (non-blocking)")
+        log.info("[Telegram] Started polling (non-blocking, updates=%s)", allowed_updates)
 
     async def stop(self):
         if not self.app:
@@ -162,20 +291,38 @@ class TelegramBridge:
             self.app = None
             self._started = False
 
-    async def send_to_admin(self, text: str):
+    async def send_to_admin(self, text: str) -> Optional[int]:
         """
         Отправка в TG-админ чат/группу.
         TELEGRAM_ADMIN_CHAT_ID должен быть -100...
         """
-        if not self.app:
-            return
-
         chat_id = getattr(self.cfg, "telegram_admin_chat_id", None)
         if not chat_id:
             log.warning("TELEGRAM_ADMIN_CHAT_ID is not set, cannot send message")
-            return
+            return None
+        return await self.send_to_chat(int(chat_id), text)
+
+    async def send_to_chat(self, chat_id: int, text: str) -> Optional[int]:
+        """
+        Отправка в любой чат (адресаты маршрутов моста). Возвращает id сообщения.
+        """
+        if not self.app:
+            return None
 
         try:
-            await self.app.bot.send_message(chat_id=int(chat_id), text=text[:4000])
+            with _CHAT_SEND_SECONDS.time():
+                sent = await self.app.bot.send_message(chat_id=int(chat_id), text=text[:4000])
+            return sent.message_id
         except Exception:
-            log.exception("Failed to send message to admin chat")
+            # RetryAfter и прочие ошибки решает вызывающий (очередь моста / fan-out):
+            # он залогирует, подождёт и повторит
+            _CHAT_SEND_ERRORS.inc()
+            raise
+
+    async def edit_message(self, chat_id: int, message_id: int, text: str):
+        if self.app:
+            await self.app.bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text[:4000])
+
+    async def delete_message(self, chat_id: int, message_id: int):
+        if self.app:
+            await self.app.bot.delete_message(chat_id=chat_id, message_id=message_id)
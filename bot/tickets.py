@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+log = logging.getLogger(__name__)
+
+STATUS_OPEN = "open"
+STATUS_CLOSED = "closed"
+
+
+def make_ticket_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+@dataclass(frozen=True)
+class Ticket:
+    id: str
+    platform: str  # "telegram" | "discord"
+    user_id: int
+    chat_id: int  # TG: чат пользователя; Discord: канал/ветка тикета
+    text: str
+    status: str = STATUS_OPEN
+    admin_msg_id: Optional[int] = None  # TG: сообщение в админ-чате, на которое отвечают
+    created: int = 0
+    closed: int = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == STATUS_OPEN
+
+
+_COLUMNS = "id, platform, user_id, chat_id, text, status, admin_msg_id, created, closed"
+
+
+class TicketStore:
+    """
+    Тикеты из TG и Discord в одной SQLite (WAL) — переживают рестарты Render
+    (если файл лежит на Disk). Индексы по id, admin_msg_id и chat_id.
+
+    Спереди — LRU на cache_size тикетов: ответ админа на свежий тикет
+    не ходит в базу. Память ограничена, сколько бы тикетов ни накопилось.
+    """
+
+    def __init__(self, path: str, cache_size: int = 1024):
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, Ticket]" = OrderedDict()
+        self._by_admin_msg: "OrderedDict[int, str]" = OrderedDict()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tickets ("
+            " id TEXT PRIMARY KEY, platform TEXT NOT NULL, user_id INTEGER NOT NULL,"
+            " chat_id INTEGER NOT NULL, text TEXT NOT NULL, status TEXT NOT NULL,"
+            " admin_msg_id INTEGER, created INTEGER NOT NULL, closed INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS tickets_admin_msg ON tickets (admin_msg_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS tickets_chat ON tickets (chat_id, status)")
+        self._db.commit()
+        log.info("[Tickets] Store %s: %s open", path, self.count_open())
+
+    # ---------- кэш ----------
+
+    def _remember(self, t: Ticket) -> Ticket:
+        self._cache[t.id] = t
+        self._cache.move_to_end(t.id)
+        if t.admin_msg_id is not None:
+            self._by_admin_msg[t.admin_msg_id] = t.id
+            self._by_admin_msg.move_to_end(t.admin_msg_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        while len(self._by_admin_msg) > self.cache_size:
+            self._by_admin_msg.popitem(last=False)
+        return t
+
+    def _select_one(self, where: str, args: tuple) -> Optional[Ticket]:
+        row = self._db.execute(f"SELECT {_COLUMNS} FROM tickets WHERE {where} LIMIT 1", args).fetchone()
+        return self._remember(Ticket(*row)) if row else None
+
+    # ---------- API ----------
+
+    def create(self, platform: str, user_id: int, chat_id: int, text: str) -> Ticket:
+        t = Ticket(make_ticket_id(), platform, int(user_id), int(chat_id), text, created=int(time.time()))
+        with self._db:
+            self._db.execute(
+                f"INSERT INTO tickets ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (t.id, t.platform, t.user_id, t.chat_id, t.text, t.status, t.admin_msg_id, t.created, t.closed),
+            )
+        return self._remember(t)
+
+    def attach_admin_message(self, ticket_id: str, admin_msg_id: int) -> Optional[Ticket]:
+        t = self.get(ticket_id)
+        if t is None:
+            return None
+        with self._db:
+            self._db.execute("UPDATE tickets SET admin_msg_id = ? WHERE id = ?", (int(admin_msg_id), ticket_id))
+        return self._remember(replace(t, admin_msg_id=int(admin_msg_id)))
+
+    def get(self, ticket_id: str) -> Optional[Ticket]:
+        t = self._cache.get(ticket_id)
+        if t is not None:
+            self._cache.move_to_end(ticket_id)
+            return t
+        return self._select_one("id = ?", (ticket_id,))
+
+    def by_admin_message(self, admin_msg_id: int) -> Optional[Ticket]:
+        tid = self._by_admin_msg.get(admin_msg_id)
+        if tid is not None:
+            t = self.get(tid)
+            if t is not None:
+                return t
+        return self._select_one("admin_msg_id = ?", (int(admin_msg_id),))
+
+    def open_in_chat(self, chat_id: int) -> Optional[Ticket]:
+        """
+        Открытый тикет, привязанный к чату/каналу (Discord: канал или ветка тикета).
+        """
+        for t in reversed(self._cache.values()):
+            if t.chat_id == chat_id and t.is_open:
+                return t
+        return self._select_one("chat_id = ? AND status = ? ORDER BY created DESC", (int(chat_id), STATUS_OPEN))
+
+    def close(self, ticket_id: str) -> Optional[Ticket]:
+        """
+        Закрыть тикет. None — такого нет; уже закрытый возвращается как есть.
+        """
+        t = self.get(ticket_id)
+        if t is None or not t.is_open:
+            return t
+        now = int(time.time())
+        with self._db:
+            self._db.execute("UPDATE tickets SET status = ?, closed = ? WHERE id = ?", (STATUS_CLOSED, now, ticket_id))
+        return self._remember(replace(t, status=STATUS_CLOSED, closed=now))
+
+    def list_open(self, limit: int = 20) -> List[Ticket]:
+        rows = self._db.execute(
+            f"SELECT {_COLUMNS} FROM tickets WHERE status = ? ORDER BY created DESC LIMIT ?", (STATUS_OPEN, limit)
+        ).fetchall()
+        return [Ticket(*r) for r in rows]
+
+    def count_open(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM tickets WHERE status = ?", (STATUS_OPEN,)).fetchone()[0]
+
+    def close_db(self):
+        self._db.close()
+
+
+_STORES: Dict[str, TicketStore] = {}
+
+
+def get_ticket_store(path: Optional[str] = None) -> TicketStore:
+    """
+    Одно хранилище на процесс (общее для TG и Discord), путь из TICKETS_DB.
+    """
+    path = path or os.getenv("TICKETS_DB", "data/tickets.sqlite3")
+    store = _STORES.get(path)
+    if store is None:
+        store = _STORES[path] = TicketStore(path)
+    return store
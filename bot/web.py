@@ -1,17 +1,66 @@
+import logging
 import os
+from typing import Awaitable, Callable, Optional
+
 from aiohttp import web
 
+from .metrics import metrics_handler
+
+log = logging.getLogger(__name__)
+
+# путь здесь, а не в telegram_bot.py: роут вешаем до импорта python-telegram-bot
+TELEGRAM_WEBHOOK_PATH = "/telegram/webhook"
+
+
 async def health(request):
     return web.Response(text="OK")
 
-async def start_web_server():
+
+def create_app() -> web.Application:
+    """
+    Общий aiohttp app: health для Render + всё, что модули смонтируют до старта
+    (webhook Telegram и т.п.) + /metrics в формате Prometheus. Роуты добавлять только до start_web_server().
+    """
     app = web.Application()
-    app.router.add_get("/", health)
+    app.router.add_get("/", health)  # ВАЖНО: только GET (HEAD aiohttp добавит сам)
     app.router.add_get("/health", health)
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+class LateRoute:
+    """
+    Роут, который монтируется до старта сервера, а обработчик получает позже
+    (когда модуль догрузится). До этого отвечает 503 — Telegram повторит.
+    """
+
+    def __init__(self):
+        self.target: Optional[Callable[[web.Request], Awaitable[web.StreamResponse]]] = None
+
+    def set(self, handler: Callable[[web.Request], Awaitable[web.StreamResponse]]):
+        self.target = handler
+
+    async def __call__(self, request: web.Request) -> web.StreamResponse:
+        if self.target is None:
+            return web.Response(status=503, text="starting")
+        return await self.target(request)
+
+
+def late_route(app: web.Application, method: str, path: str) -> LateRoute:
+    route = LateRoute()
+    app.router.add_route(method, path, route)
+    return route
+
+
+async def start_web_server(app: Optional[web.Application] = None) -> web.AppRunner:
+    app = app or create_app()
 
     runner = web.AppRunner(app)
     await runner.setup()
 
-    port = int(os.environ.get("PORT", "10000"))
+    port = int(os.environ.get("PORT", "10000"))  # Render обычно ок на 10000
     site = web.TCPSite(runner, "0.0.0.0", port)
     await site.start()
+
+    log.info("[HTTP] Web server started on port %s", port)
+    return runner
@@ -27,10 +27,17 @@ class Config:
     spam_max_msgs: int
     spam_window_sec: int
     spam_timeout_sec: int
+    raid_min_users: int
+    raid_window_sec: int
+    raid_similarity: int
+    raid_mass_users: int
+    raid_new_account_days: int
+    raid_recent_join_hours: int
     link_donate: str
     link_discord: str
     link_steam: str
     link_goals: str
+    tickets_db: str
 
 def load_config() -> Config:
     discord_token = _str("DISCORD_TOKEN")
@@ -57,8 +64,15 @@ def load_config() -> Config:
         spam_max_msgs=int(_str("SPAM_MAX_MSGS", "5")),
         spam_window_sec=int(_str("SPAM_WINDOW_SEC", "8")),
         spam_timeout_sec=int(_str("SPAM_TIMEOUT_SEC", "300")),
+        raid_min_users=int(_str("RAID_MIN_USERS", "4")),
+        raid_window_sec=int(_str("RAID_WINDOW_SEC", "60")),
+        raid_similarity=int(_str("RAID_SIMILARITY", "85")),
+        raid_mass_users=int(_str("RAID_MASS_USERS", "15")),
+        raid_new_account_days=int(_str("RAID_NEW_ACCOUNT_DAYS", "7")),
+        raid_recent_join_hours=int(_str("RAID_RECENT_JOIN_HOURS", "24")),
         link_donate=_str("LINK_DONATE"),
         link_discord=_str("LINK_DISCORD"),
         link_steam=_str("LINK_STEAM"),
         link_goals=_str("LINK_GOALS"),
+        tickets_db=_str("TICKETS_DB", "data/tickets.sqlite3"),
     )
@@ -1,13 +1,15 @@
 from __future__ import annotations
+import datetime
 import discord
 from discord import app_commands
 from discord.ext import commands
+from .bot.channel_cache import ChannelCache
+from .bot.command_sync import sync_if_changed
+from .bot.moderation import ModerationQueue
+from .bot.tickets import get_ticket_store
 from .config import Config
-from .shared import SpamGate
-from .keywords import KEYWORD_REPLIES
-
-def _low(s: str) -> str:
-    return (s or "").lower()
+from .shared import RAID, SUSPECT, RaidDetector, SpamGate
+from .keywords import get_matcher, match_reply, reload_keywords
 
 class RolePanelView(discord.ui.View):
     def __init__(self, role_ids: list[int]):
@@ -36,16 +38,26 @@ class RoleButton(discord.ui.Button):
             await interaction.response.send_message(f"Роль выдана: {role.name}", ephemeral=True)
 
 class DiscordBot(commands.Bot):
-    def __init__(self, cfg: Config, tg_bridge_send):
+    def __init__(self, cfg: Config, tg_bridge_send, force_command_sync: bool = False):
         intents = discord.Intents.default()
         intents.members = True
         intents.message_content = True
         super().__init__(command_prefix="!", intents=intents)
         self.cfg = cfg
         self.spam = SpamGate(cfg.spam_max_msgs, cfg.spam_window_sec)
+        self.raids = RaidDetector(
+            cfg.raid_min_users, cfg.raid_window_sec, cfg.raid_similarity, mass_users=cfg.raid_mass_users
+        )
         self.tg_bridge_send = tg_bridge_send  # async (text, author)
+        self.channels = ChannelCache(self)  # общий кэш каналов для всех отправителей
+        self.tickets = get_ticket_store(cfg.tickets_db)  # общий с Telegram /ticket
+        # таймауты/баны/удаления пачками в фоне — хендлеры не ждут REST
+        self.moderation = ModerationQueue(self, log_channel_id=cfg.discord_log_channel_id)
+        self.force_command_sync = force_command_sync
+        get_matcher()  # строим автомат ключевых слов на старте, а не на первом сообщении
 
     async def setup_hook(self):
+        self.moderation.start()
         guild = discord.Object(id=self.cfg.discord_guild_id)
 
         @self.tree.command(name="donate", description="Ссылка на донат", guild=guild)
@@ -94,19 +106,53 @@ class DiscordBot(commands.Bot):
                     ephemeral=True
                 )
 
+            t = self.tickets.create("discord", interaction.user.id, created.id, text)
             await interaction.response.send_message(f"Тикет создан: {created.mention}", ephemeral=True)
-            await created.send(f"🎫 Тикет от {interaction.user.mention}\n**Текст:** {text}")
+            await created.send(f"🎫 Тикет {t.id} от {interaction.user.mention}\n**Текст:** {text}")
+
+        @self.tree.command(name="close", description="Закрыть тикет в этом канале", guild=guild)
+        async def close_ticket(interaction: discord.Interaction):
+            t = self.tickets.open_in_chat(interaction.channel_id)
+            if t is None:
+                return await interaction.response.send_message("Здесь нет открытого тикета.", ephemeral=True)
+
+            perms = interaction.channel.permissions_for(interaction.user) if interaction.guild else None
+            if interaction.user.id != t.user_id and not (perms and perms.manage_channels):
+                return await interaction.response.send_message("Закрыть может автор или модератор.", ephemeral=True)
+
+            self.tickets.close(t.id)
+            await interaction.response.send_message(f"🔒 Тикет {t.id} закрыт.")
+            if isinstance(interaction.channel, discord.Thread):
+                await interaction.channel.edit(archived=True, locked=True)
 
         @self.tree.command(name="ban", description="Бан пользователя", guild=guild)
         @app_commands.checks.has_permissions(ban_members=True)
         async def ban(interaction: discord.Interaction, member: discord.Member, reason: str = "No reason"):
-            await member.ban(reason=reason)
-            await interaction.response.send_message(f"✅ Забанен {member.mention}. Причина: {reason}")
+            # бан выполняет очередь модерации; ответ — когда он реально прошёл (или не прошёл)
+            async def on_result(ok: bool):
+                if ok:
+                    await interaction.followup.send(f"✅ Забанен {member.mention}. Причина: {reason}")
+                else:
+                    await interaction.followup.send(f"⚠️ Не удалось забанить {member.mention}, подробности в лог-канале.")
+
+            await interaction.response.defer(thinking=True)
+            if not self.moderation.ban(interaction.guild, member, reason, on_result=on_result):
+                await interaction.followup.send(f"⏳ {member.mention} уже в очереди на бан.")
+
+        @self.tree.command(name="massban", description="Бан списка пользователей (ID через пробел/запятую)", guild=guild)
+        @app_commands.checks.has_permissions(ban_members=True)
+        async def massban(interaction: discord.Interaction, user_ids: str, reason: str = "Raid"):
+            ids = {int(x) for x in user_ids.replace(",", " ").split() if x.isdigit()}
+            queued = sum(self.moderation.ban(interaction.guild, discord.Object(id=uid), reason) for uid in ids)
+            await interaction.response.send_message(
+                f"✅ В очереди на бан: {queued} (дубликатов: {len(ids) - queued}). Прогресс и ошибки — в лог-канале.",
+                ephemeral=True,
+            )
 
         @self.tree.command(name="timeout", description="Таймаут (сек)", guild=guild)
         @app_commands.checks.has_permissions(moderate_members=True)
         async def timeout(interaction: discord.Interaction, member: discord.Member, seconds: int, reason: str = "No reason"):
-            until = discord.utils.utcnow() + discord.timedelta(seconds=seconds)
+            until = discord.utils.utcnow() + datetime.timedelta(seconds=seconds)
             await member.timeout(until, reason=reason)
             await interaction.response.send_message(f"✅ Таймаут {member.mention} на {seconds}s. Причина: {reason}")
 
@@ -115,8 +161,10 @@ class DiscordBot(commands.Bot):
         async def purge(interaction: discord.Interaction, count: int):
             if not isinstance(interaction.channel, discord.TextChannel):
                 return await interaction.response.send_message("Только текстовый канал.", ephemeral=True)
+            # purge удаляет пачками по 100, но может идти дольше 3 секунд на ответ interaction
+            await interaction.response.defer(ephemeral=True, thinking=True)
             deleted = await interaction.channel.purge(limit=max(1, min(count, 200)))
-            await interaction.response.send_message(f"🧹 Удалено: {len(deleted)}", ephemeral=True)
+            await interaction.followup.send(f"🧹 Удалено: {len(deleted)}", ephemeral=True)
 
         @self.tree.command(name="rolepanel", description="Панель ролей по кнопкам", guild=guild)
         @app_commands.checks.has_permissions(manage_roles=True)
@@ -127,34 +175,86 @@ class DiscordBot(commands.Bot):
                 return await interaction.response.send_message("Не настроено: впиши role_ids в bot/discord_bot.py", ephemeral=True)
             await interaction.response.send_message("Выбери роли:", view=RolePanelView(role_ids))
 
-        await self.tree.sync(guild=guild)
+        # sync — медленный REST с жёстким лимитом: только если команды поменялись
+        await sync_if_changed(self.tree, guild, force=self.force_command_sync)
+
+        # !synccommands — принудительный sync (работает и когда слэш-команды устарели)
+        @self.command(name="synccommands")
+        @commands.has_permissions(administrator=True)
+        async def synccommands(ctx: commands.Context):
+            if await sync_if_changed(self.tree, guild, force=True):
+                await ctx.reply("✅ Слэш-команды синхронизированы.", mention_author=False)
+            else:
+                await ctx.reply("⚠️ Не удалось синхронизировать слэш-команды, подробности в логе.", mention_author=False)
+
+        # !reloadkeywords — перечитать KEYWORDS_FILE без рестарта (автомат общий с Telegram)
+        @self.command(name="reloadkeywords")
+        @commands.has_permissions(administrator=True)
+        async def reloadkeywords(ctx: commands.Context):
+            matcher = reload_keywords()
+            await ctx.reply(f"✅ Ключевые слова перечитаны: {len(matcher)} правил.", mention_author=False)
 
     async def on_ready(self):
         print(f"[Discord] Logged in as {self.user}")
 
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.channels.on_channel_create(channel)
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.channels.on_channel_delete(channel)
+
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        self.channels.on_channel_update(before, after)
+
     async def on_member_join(self, member: discord.Member):
         ch = member.guild.system_channel
         if ch:
             await ch.send(f"👋 Добро пожаловать, {member.mention}!")
 
+    def _is_newcomer(self, author) -> bool:
+        """
+        Свежий аккаунт или только что зашёл на сервер — типичный рейдовый аккаунт.
+        """
+        now = discord.utils.utcnow()
+        created = getattr(author, "created_at", None)
+        if created and now - created < datetime.timedelta(days=self.cfg.raid_new_account_days):
+            return True
+        joined = getattr(author, "joined_at", None)
+        return bool(joined and now - joined < datetime.timedelta(hours=self.cfg.raid_recent_join_hours))
+
     async def on_message(self, message: discord.Message):
         if message.author.bot:
             return
 
+        # copy-paste рейд с разных аккаунтов (со ссылками/упоминаниями или от новичков):
+        # удаляем и даём таймаут, дальше не обрабатываем
+        # (всё через очередь модерации: удаление пачкой, один таймаут на пользователя)
+        verdict = None
+        if message.content:
+            verdict = self.raids.hit(
+                message.content, message.author.id, message.channel.id, newcomer=self._is_newcomer(message.author)
+            )
+        if verdict == RAID:
+            self.moderation.delete(message)
+            if isinstance(message.author, discord.Member):
+                self.moderation.timeout(message.author, self.cfg.spam_timeout_sec, "Raid (copy-paste spam)")
+            return
+        if verdict == SUSPECT:
+            # массовый повтор без ссылок и новичков — может быть и обычный чат: только сообщаем
+            self.moderation.report(
+                f"👀 Много одинаковых сообщений, похоже на рейд (ничего не удалено): "
+                f"{message.author.mention} в {message.channel.mention}: {message.content[:200]}"
+            )
+
         if self.spam.hit(message.author.id):
             if isinstance(message.author, discord.Member):
-                try:
-                    until = discord.utils.utcnow() + discord.timedelta(seconds=self.cfg.spam_timeout_sec)
-                    await message.author.timeout(until, reason="Spam detected")
-                    await message.channel.send(f"⛔ {message.author.mention} таймаут за спам ({self.cfg.spam_timeout_sec}s).")
-                except Exception:
-                    pass
-
-        content = _low(message.content)
-        for k, v in KEYWORD_REPLIES.items():
-            if k in content:
-                await message.reply(v, mention_author=False)
-                break
+                self.moderation.timeout(
+                    message.author, self.cfg.spam_timeout_sec, "Spam detected", announce_in=message.channel
+                )
+
+        reply = match_reply(message.content)
+        if reply:
+            await message.reply(reply, mention_author=False)
 
         if self.cfg.bridge_discord_channel_id and message.channel.id == self.cfg.bridge_discord_channel_id:
             if self.tg_bridge_send:
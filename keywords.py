@@ -1,7 +1,9 @@
-KEYWORD_REPLIES = {
-    "привет": "Привет! 👋",
-    "донат": "Поддержать: /donate",
-    "дискорд": "Наш Discord: /discord",
-    "steam": "Steam: /steam",
-    "цель": "Цели: /goals",
-}
+# Одна таблица и один автомат на обе платформы — живут в bot/keywords.py
+from .bot.keywords import (  # noqa: F401
+    KEYWORD_REPLIES,
+    KeywordMatcher,
+    KeywordRule,
+    get_matcher,
+    match_reply,
+    reload_keywords,
+)
@@ -2,14 +2,9 @@ from __future__ import annotations
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from .config import Config
-from .keywords import KEYWORD_REPLIES
-import uuid
-
-def _low(s: str) -> str:
-    return (s or "").lower()
-
-def make_ticket_id() -> str:
-    return uuid.uuid4().hex[:8]
+from .keywords import get_matcher, match_reply
+from .shared import RAID, SUSPECT, RaidDetector
+from .bot.tickets import get_ticket_store
 
 class TelegramBot:
     def __init__(self, cfg: Config, discord_bridge_send):
@@ -22,11 +17,16 @@ class TelegramBot:
         self.app.add_handler(CommandHandler("steam", self._link("steam")))
         self.app.add_handler(CommandHandler("goals", self._link("goals")))
         self.app.add_handler(CommandHandler("ticket", self.ticket))
+        self.app.add_handler(CommandHandler("close", self.close_ticket))
 
         self.app.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, self.welcome))
         self.app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.on_text))
 
-        self.ticket_map = {}  # admin_msg_id -> user_chat_id
+        self.tickets = get_ticket_store(cfg.tickets_db)  # общий с Discord /ticket, переживает рестарты
+        get_matcher()  # автомат ключевых слов общий с Discord, строится один раз
+        self.raids = RaidDetector(
+            cfg.raid_min_users, cfg.raid_window_sec, cfg.raid_similarity, mass_users=cfg.raid_mass_users
+        )
 
     def _link(self, which: str):
         async def handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -50,9 +50,10 @@ class TelegramBot:
         if not self.cfg.telegram_admin_chat_id:
             return await update.message.reply_text("Не настроен TELEGRAM_ADMIN_CHAT_ID.")
 
-        tid = make_ticket_id()
         user = update.effective_user
         user_chat_id = update.effective_chat.id
+        t = self.tickets.create("telegram", user.id, user_chat_id, text)
+        tid = t.id
 
         admin_text = (
             f"🎫 TICKET {tid}\n"
@@ -61,9 +62,33 @@ class TelegramBot:
             f"Text: {text}"
         )
         msg = await context.bot.send_message(chat_id=self.cfg.telegram_admin_chat_id, text=admin_text)
-        self.ticket_map[msg.message_id] = user_chat_id
+        self.tickets.attach_admin_message(tid, msg.message_id)
         await update.message.reply_text(f"✅ Тикет создан: {tid}.")
 
+    async def close_ticket(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        /close <id> или /close ответом на сообщение тикета (только в админ-чате).
+        """
+        if not update.message or not self.cfg.telegram_admin_chat_id:
+            return
+        if update.effective_chat.id != self.cfg.telegram_admin_chat_id:
+            return
+
+        t = None
+        if context.args:
+            t = self.tickets.get(context.args[0].strip())
+        elif update.message.reply_to_message:
+            t = self.tickets.by_admin_message(update.message.reply_to_message.message_id)
+        if t is None:
+            return await update.message.reply_text("Тикет не найден. Напиши: /close <id> или ответь на тикет.")
+        if not t.is_open:
+            return await update.message.reply_text(f"Тикет {t.id} уже закрыт.")
+
+        self.tickets.close(t.id)
+        await update.message.reply_text(f"🔒 Тикет {t.id} закрыт.")
+        if t.platform == "telegram":
+            await context.bot.send_message(chat_id=t.chat_id, text=f"🔒 Тикет {t.id} закрыт.")
+
     async def on_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message:
             return
@@ -71,16 +96,38 @@ class TelegramBot:
         # Admin reply-to-ticket -> forward to user
         if self.cfg.telegram_admin_chat_id and update.effective_chat.id == self.cfg.telegram_admin_chat_id:
             rt = update.message.reply_to_message
-            if rt and rt.message_id in self.ticket_map:
-                user_chat_id = self.ticket_map[rt.message_id]
-                await context.bot.send_message(chat_id=user_chat_id, text=f"💬 Ответ админа: {update.message.text}")
+            t = self.tickets.by_admin_message(rt.message_id) if rt else None
+            if t is not None:
+                if not t.is_open:
+                    await update.message.reply_text(f"Тикет {t.id} закрыт, ответ не отправлен.")
+                    return
+                await context.bot.send_message(chat_id=t.chat_id, text=f"💬 Ответ админа: {update.message.text}")
                 return
 
-        content = _low(update.message.text)
-        for k, v in KEYWORD_REPLIES.items():
-            if k in content:
-                await update.message.reply_text(v)
-                break
+        # copy-paste рейд со ссылками/упоминаниями: удаляем сообщение (нужны права админа в группе).
+        # Возраст аккаунта Bot API не сообщает — newcomer здесь не определить.
+        user_id = update.effective_user.id if update.effective_user else 0
+        verdict = self.raids.hit(update.message.text, user_id, update.effective_chat.id)
+        if verdict == RAID:
+            try:
+                await update.message.delete()
+            except Exception:
+                pass
+            return
+        if verdict == SUSPECT and self.cfg.telegram_admin_chat_id:
+            # массовый повтор без ссылок — только сообщаем админам
+            try:
+                await context.bot.send_message(
+                    chat_id=self.cfg.telegram_admin_chat_id,
+                    text=f"👀 Много одинаковых сообщений в чате {update.effective_chat.id}, похоже на рейд "
+                         f"(ничего не удалено): {update.message.text[:200]}",
+                )
+            except Exception:
+                pass
+
+        reply = match_reply(update.message.text)
+        if reply:
+            await update.message.reply_text(reply)
 
         if self.cfg.bridge_telegram_chat_id and update.effective_chat.id == self.cfg.bridge_telegram_chat_id:
             if self.discord_bridge_send:
@@ -0,0 +1,61 @@
+import datetime as dt
+
+import pytest
+
+from bot.cron import CronExpr
+
+
+def at(*args) -> dt.datetime:
+    return dt.datetime(*args)
+
+
+def test_every_minute_is_strictly_after():
+    assert CronExpr("* * * * *").next_after(at(2026, 1, 1, 10, 0, 30)) == at(2026, 1, 1, 10, 1)
+
+
+def test_aliases():
+    assert CronExpr("@hourly").next_after(at(2026, 1, 1, 10, 0)) == at(2026, 1, 1, 11, 0)
+    assert CronExpr("@daily").next_after(at(2026, 1, 1, 10, 0)) == at(2026, 1, 2, 0, 0)
+    assert CronExpr("@monthly").next_after(at(2026, 1, 31, 10, 0)) == at(2026, 2, 1, 0, 0)
+
+
+def test_lists_ranges_and_steps():
+    e = CronExpr("0,30 9-17/4 * * *")
+    assert e.minutes == {0, 30}
+    assert e.hours == {9, 13, 17}
+    assert e.next_after(at(2026, 1, 1, 13, 30)) == at(2026, 1, 1, 17, 0)
+    assert e.next_after(at(2026, 1, 1, 17, 30)) == at(2026, 1, 2, 9, 0)
+
+
+def test_weekday_seven_is_sunday():
+    # 2026-01-04 — воскресенье
+    assert CronExpr("0 12 * * 7").next_after(at(2026, 1, 1, 0, 0)) == at(2026, 1, 4, 12, 0)
+    assert CronExpr("0 12 * * 0").weekdays == {0}
+
+
+def test_dom_and_dow_both_restricted_match_either():
+    # 13-е число или понедельник: 2026-01-05 — понедельник, раньше 13-го
+    assert CronExpr("0 0 13 * 1").next_after(at(2026, 1, 1, 0, 0)) == at(2026, 1, 5, 0, 0)
+
+
+def test_star_step_day_of_month_is_not_restricted():
+    # */2 в дне месяца начинается с * — правило «или» не действует: нужен и нечётный день, и понедельник
+    e = CronExpr("0 0 */2 * 1")
+    assert e.next_after(at(2026, 1, 1, 0, 0)) == at(2026, 1, 5, 0, 0)
+    assert e.next_after(at(2026, 1, 6, 0, 0)) == at(2026, 1, 19, 0, 0)
+    assert CronExpr("0 0 */1 * 1").next_after(at(2026, 1, 1, 0, 0)) == at(2026, 1, 5, 0, 0)
+
+
+def test_month_rollover_and_leap_day():
+    assert CronExpr("0 0 29 2 *").next_after(at(2026, 3, 1, 0, 0)) == at(2028, 2, 29, 0, 0)
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "60 * * * *", "* 24 * * *", "*/0 * * * *", "5-1 * * * *"])
+def test_invalid(expr):
+    with pytest.raises(ValueError):
+        CronExpr(expr)
+
+
+def test_never_fires():
+    with pytest.raises(ValueError):
+        CronExpr("0 0 31 2 *").next_after(at(2026, 1, 1, 0, 0))
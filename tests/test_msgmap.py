@@ -0,0 +1,88 @@
+import pytest
+
+from bot import msgmap
+from bot.msgmap import MessageMap
+
+SRC = ("telegram", -100, 1)
+COPY = ("discord", 200, 900)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "msgmap.sqlite3")
+
+
+def test_link_is_one_way(path):
+    m = MessageMap(path)
+    m.link(SRC, COPY)
+    assert m.copies(SRC) == [(COPY, 1)]
+    # правка/удаление копии на оригинал не влияет
+    assert m.copies(COPY) == []
+    m.close()
+
+
+def test_merged_copies_keep_their_count(path):
+    m = MessageMap(path)
+    other = ("telegram", -100, 2)
+    m.link(SRC, COPY, merged=2)
+    m.link(other, COPY, merged=2)
+    assert m.copies(SRC) == [(COPY, 2)]
+    assert m.copies(other) == [(COPY, 2)]
+    m.close()
+
+
+def test_links_survive_restart(path):
+    m = MessageMap(path)
+    m.link(SRC, COPY)
+    m.close()
+
+    m = MessageMap(path)
+    assert m.copies(SRC) == [(COPY, 1)]
+    assert m.misses == 1  # пришло из базы, а не из кэша
+    m.close()
+
+
+def test_eviction_keeps_unsaved_links_without_flushing(path):
+    m = MessageMap(path, cache_size=16, flush_every=1000)
+    for i in range(40):
+        m.link(("telegram", -100, i), ("discord", 200, 1000 + i))
+    assert m.stats()["cached"] == 16
+    assert m.stats()["pending"] == 40  # вытеснение не ходит в базу
+    assert m.copies(("telegram", -100, 0)) == [(("discord", 200, 1000), 1)]
+    m.close()
+
+
+def test_forget_drops_cached_pending_and_saved_links(path):
+    m = MessageMap(path)
+    saved = ("telegram", -100, 2)
+    m.link(saved, ("discord", 200, 902))
+    m.flush()
+    m.link(SRC, COPY)  # ещё не записана
+    m.forget(SRC)
+    m.forget(saved)
+    assert m.copies(SRC) == [] and m.copies(saved) == []
+    m.close()
+
+    m = MessageMap(path)
+    assert m.copies(SRC) == [] and m.copies(saved) == []
+    m.close()
+
+
+def test_prune_removes_links_older_than_ttl(path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(msgmap.time, "time", lambda: now[0])
+
+    m = MessageMap(path, ttl_days=1)
+    m.link(SRC, COPY)
+    m.flush()
+    now[0] += 2 * 86400
+    fresh = ("telegram", -100, 2)
+    m.link(fresh, ("discord", 200, 902))
+    m.flush()
+    m.prune()
+    m.close()
+
+    m = MessageMap(path, ttl_days=1)
+    assert m.copies(SRC) == []
+    assert m.copies(fresh) == [(("discord", 200, 902), 1)]
+    m.close()
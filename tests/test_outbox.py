@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from bot.outbox import Outbox
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "outbox.log")
+
+
+def test_unacked_messages_are_replayed_after_restart(path):
+    async def first_run():
+        ob = Outbox(path, commit_interval=0)
+        k1 = await ob.put("to_discord", 1, "delivered", ("telegram", 5, 1))
+        await ob.put("to_discord", 1, "lost", ("telegram", 5, 2))
+        ob.ack([k1])
+        await ob.close()
+
+    async def second_run():
+        ob = Outbox(path, commit_interval=0)
+        pending = ob.pending()
+        await ob.close()
+        return pending
+
+    _run(first_run())
+    pending = _run(second_run())
+    assert [(r.queue, r.dest, r.text, r.ref) for r in pending] == [("to_discord", 1, "lost", ("telegram", 5, 2))]
+
+
+def test_same_source_and_destination_is_written_once(path):
+    async def scenario():
+        ob = Outbox(path, commit_interval=0)
+        ref = ("discord", 7, 100)
+        key = await ob.put("to_telegram", -1, "hi", ref)
+        again = await ob.put("to_telegram", -1, "hi", ref)
+        other_dest = await ob.put("to_telegram", -2, "hi", ref)
+        ob.ack([key])
+        after_ack = await ob.put("to_telegram", -1, "hi", ref)
+        await ob.close()
+        return key, again, other_dest, after_ack, ob
+
+    key, again, other_dest, after_ack, ob = _run(scenario())
+    assert key is not None
+    assert again is None and after_ack is None
+    assert other_dest is not None and other_dest != key
+    assert ob.duplicates == 2
+
+
+def test_messages_without_ref_are_never_deduplicated(path):
+    async def scenario():
+        ob = Outbox(path, commit_interval=0)
+        keys = [await ob.put("to_discord", 1, "same text") for _ in range(2)]
+        await ob.close()
+        return keys
+
+    k1, k2 = _run(scenario())
+    assert k1 and k2 and k1 != k2
+
+
+def test_gives_up_after_max_attempts_across_restarts(path):
+    async def run(first: bool):
+        ob = Outbox(path, commit_interval=0, max_attempts=2)
+        if first:
+            await ob.put("to_discord", 1, "broken", ("telegram", 5, 1))
+        pending = [r.key for r in ob.pending()]
+        ob.fail(pending)
+        await ob.close()
+        return pending, ob.given_up
+
+    assert _run(run(first=True)) == (["to_discord:1:telegram:5:1"], 0)
+    # одна неудача уже в журнале, вторая — после рестарта: сообщение выброшено
+    assert _run(run(first=False)) == (["to_discord:1:telegram:5:1"], 1)
+    assert _run(run(first=False)) == ([], 0)
+
+
+def test_failed_commit_does_not_leave_a_replayable_record(path, monkeypatch):
+    async def scenario():
+        ob = Outbox(path, commit_interval=0)
+
+        def broken_write(data, snapshot):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(ob, "_write", broken_write)
+        with pytest.raises(OSError):
+            await ob.put("to_discord", 1, "hi", ("telegram", 5, 1))
+        pending = ob.pending()
+        monkeypatch.undo()
+        await ob.close()
+        return pending
+
+    assert _run(scenario()) == []
+
+
+def test_put_after_close_raises(path):
+    async def scenario():
+        ob = Outbox(path, commit_interval=0)
+        await ob.close()
+        with pytest.raises(RuntimeError):
+            await ob.put("to_discord", 1, "late")
+
+    _run(scenario())
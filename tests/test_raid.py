@@ -0,0 +1,64 @@
+import pytest
+
+from bot import shared
+from bot.shared import RAID, SUSPECT, RaidDetector
+
+BENIGN = "всем привет, го катку ребята!"
+LINK_RAID = "FREE NITRO 👉 https://discord-gift.example/claim?u={} 👈 заходи быстрее"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_benign_repeat_is_never_a_raid(clock):
+    r = RaidDetector(min_users=4, mass_users=15)
+    verdicts = [r.hit(BENIGN, uid) for uid in range(14)]
+    assert verdicts == [None] * 14
+
+
+def test_mass_benign_repeat_is_reported_once(clock):
+    r = RaidDetector(min_users=4, mass_users=15)
+    verdicts = [r.hit(BENIGN, uid) for uid in range(30)]
+    assert verdicts.count(SUSPECT) == 1
+    assert verdicts.index(SUSPECT) == 14
+    assert RAID not in verdicts
+
+
+def test_link_raid_from_many_accounts(clock):
+    r = RaidDetector(min_users=4)
+    # хвост ссылки у каждого свой — кластер всё равно один
+    verdicts = [r.hit(LINK_RAID.format(uid), 900 + uid) for uid in range(6)]
+    assert verdicts == [None, None, None, RAID, RAID, RAID]
+
+
+def test_same_user_repeating_is_not_a_raid(clock):
+    r = RaidDetector(min_users=4)
+    assert [r.hit(LINK_RAID.format(1), 7) for _ in range(10)] == [None] * 10
+
+
+def test_newcomers_without_links(clock):
+    r = RaidDetector(min_users=4)
+    verdicts = [r.hit(BENIGN, 900 + uid, newcomer=True) for uid in range(4)]
+    assert verdicts[-1] == RAID
+    # старожил, написавший ту же безобидную фразу, не наказывается
+    assert r.hit(BENIGN, 1) is None
+    assert r.hit(BENIGN, 900 + 10, newcomer=True) == RAID
+
+
+def test_window_expiry_resets_cluster(clock):
+    r = RaidDetector(min_users=4, window_sec=60)
+    for uid in range(3):
+        assert r.hit(LINK_RAID.format(uid), uid) is None
+        clock[0] += 30
+    # первые двое уже вне окна — в кластере остаётся меньше min_users
+    assert r.hit(LINK_RAID.format(9), 9) is None
+    assert r.stats()["flagged"] == 0
+
+
+def test_short_messages_ignored(clock):
+    r = RaidDetector(min_users=2)
+    assert [r.hit("gg", uid) for uid in range(10)] == [None] * 10
@@ -0,0 +1,153 @@
+import asyncio
+
+from bot.relay import RelayPool, RelayQueue
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _noop_send(text):
+    return None
+
+
+def _texts(q):
+    return [item.text for item in q._items]
+
+
+def test_drop_oldest_settles_dropped_as_delivered():
+    settled = []
+
+    async def scenario():
+        q = RelayQueue("t:drop", _noop_send, maxsize=2, on_settled=lambda keys, ok: settled.append((keys, ok)))
+        for i in range(3):
+            assert await q.put(f"m{i}", key=f"k{i}")
+        return q
+
+    q = _run(scenario())
+    assert _texts(q) == ["m1", "m2"]
+    assert q.dropped == 1
+    # выброшенное намеренно не должно переигрываться из outbox
+    assert settled == [(["k0"], True)]
+
+
+def test_overflow_coalesce_appends_to_tail():
+    async def scenario():
+        q = RelayQueue("t:coalesce", _noop_send, maxsize=1, overflow="coalesce")
+        await q.put("a", ref=("discord", 1, 1), key="k1")
+        await q.put("b", ref=("discord", 1, 2), key="k2")
+        return q
+
+    q = _run(scenario())
+    assert _texts(q) == ["a\nb"]
+    assert q._items[0].refs == [("discord", 1, 1), ("discord", 1, 2)]
+    assert q._items[0].keys == ["k1", "k2"]
+    assert q.coalesced == 1
+
+
+def test_overflow_coalesce_respects_max_len():
+    async def scenario():
+        q = RelayQueue("t:coalesce-len", _noop_send, maxsize=1, overflow="coalesce", max_len=5)
+        await q.put("abc")
+        await q.put("def")
+        return q
+
+    q = _run(scenario())
+    # не влезает — как drop_oldest
+    assert _texts(q) == ["def"]
+    assert q.dropped == 1
+
+
+def test_overflow_coalesce_keeps_refs_apart_without_merge_refs():
+    async def scenario():
+        q = RelayQueue("t:coalesce-refs", _noop_send, maxsize=1, overflow="coalesce", merge_refs=False)
+        await q.put("a", ref=("discord", 1, 1))
+        await q.put("b", ref=("discord", 1, 2))
+        return q
+
+    q = _run(scenario())
+    assert _texts(q) == ["b"]
+    assert q.dropped == 1
+
+
+def test_worker_coalesces_backlog_into_one_send():
+    sent, linked = [], []
+
+    async def send(text):
+        sent.append(text)
+        return 42
+
+    async def scenario():
+        q = RelayQueue("t:batch", send, on_sent=lambda refs, result: linked.append((refs, result)))
+        for i in range(3):
+            await q.put(f"m{i}", ref=("telegram", 5, i))
+        await q.start()
+        await q.stop()
+        return q
+
+    q = _run(scenario())
+    assert sent == ["m0\nm1\nm2"]
+    assert linked == [([("telegram", 5, 0), ("telegram", 5, 1), ("telegram", 5, 2)], 42)]
+    assert q.coalesced == 2 and q.batches == 1
+
+
+def test_worker_sends_refs_one_by_one_without_merge_refs():
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    async def scenario():
+        q = RelayQueue("t:no-merge", send, coalesce_window=5.0, merge_refs=False)
+        await q.put("m0", ref=("telegram", 5, 0))
+        await q.put("m1", ref=("telegram", 5, 1))
+        await q.start()
+        # окно склейки для сообщений с ref не ждём
+        await asyncio.wait_for(q.stop(), timeout=1.0)
+
+    _run(scenario())
+    assert sent == ["m0", "m1"]
+
+
+def test_block_waits_for_free_slot():
+    sent = []
+
+    async def send(text):
+        sent.append(text)
+
+    async def scenario():
+        q = RelayQueue("t:block", send, maxsize=1, overflow="block", max_len=1)
+        await q.put("a")
+        blocked = asyncio.create_task(q.put("b"))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        await q.start()
+        assert await asyncio.wait_for(blocked, timeout=1.0)
+        await q.stop()
+        return q
+
+    q = _run(scenario())
+    assert sent == ["a", "b"]
+    assert q.dropped == 0
+
+
+def test_pool_routes_per_destination():
+    sent, linked = [], []
+
+    async def send(dest, text):
+        sent.append((dest, text))
+        return dest * 10
+
+    async def scenario():
+        pool = RelayPool("t:pool", send, on_sent=lambda refs, dest, result: linked.append((refs, dest, result)))
+        await pool.start()
+        await pool.put(1, "to one", ref=("discord", 9, 1))
+        await pool.put(2, "to two")
+        await pool.stop()
+        return pool
+
+    pool = _run(scenario())
+    assert sorted(pool.queues) == [1, 2]
+    assert sorted(sent) == [(1, "to one"), (2, "to two")]
+    # on_sent только для сообщений с ref
+    assert linked == [([("discord", 9, 1)], 1, 10)]